@@ -14,7 +14,6 @@
 #              matching of deleted pages to tables only based on column count
 #
 #              output is not really nice
-#              pointer maps are not handled correctly
 #
 # Requires:    Python 3
 #
@@ -24,9 +23,26 @@
 
 __author__ = 'grisomg'
 
-from struct import unpack
-from optparse import OptionParser, OptionGroup
-import sys, tempfile, hashlib
+from struct import unpack, error, Struct
+from optparse import OptionParser, OptionGroup, Values
+from multiprocessing import Pool
+import sys, os, re, mmap, tempfile, hashlib, threading, queue
+from array import array
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+import csv, json, sqlite3, marshal, zlib
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 VERSION = '0.9'
 BUILD = '20151112'
@@ -67,8 +83,395 @@ LEAF_TABLE_BTREE_PAGE = 13
 INTERIOR_OFFSET = 12
 LEAF_OFFSET = 8
 
+#pointer map entry types
+PTRMAP_ROOTPAGE = 1     #b-tree root page, no parent
+PTRMAP_FREEPAGE = 2     #free page, no parent
+PTRMAP_OVERFLOW1 = 3    #first page of an overflow chain, parent is the b-tree page of the cell
+PTRMAP_OVERFLOW2 = 4    #other overflow page, parent is the previous page of the chain
+PTRMAP_BTREE = 5        #non-root b-tree page, parent is the parent b-tree page
+PTRMAP_TYPES = {PTRMAP_ROOTPAGE: 'root page', PTRMAP_FREEPAGE: 'free page', PTRMAP_OVERFLOW1: 'overflow page 1',
+                PTRMAP_OVERFLOW2: 'overflow page 2', PTRMAP_BTREE: 'b-tree page'}
+
 sql_type = ('table', 'trigger', 'index', 'view')
 
+#upper bound for the reassembled overflow payloads kept in memory
+OVERFLOW_CACHE_SIZE = 64 * 1024 * 1024
+
+#record format serial types -> (name, content size, struct format)
+#serial types >= 12 are BLOB (even) and TEXT (odd) with a variable size
+SERIAL_TYPES = {0: ("NULL", 0, ''),
+                1: ("ST_INT8", 1, 'b'),
+                2: ("ST_INT16", 2, 'h'),
+                3: ("ST_INT24", 3, '3s'),
+                4: ("ST_INT32", 4, 'i'),
+                5: ("ST_INT48", 6, '6s'),
+                6: ("ST_INT64", 8, 'q'),
+                7: ("ST_FLOAT", 8, 'd'),
+                8: ("ST_C0", 0, ''),
+                9: ("ST_C1", 0, ''),
+                10: ("Reserved: 10", 0, ''),
+                11: ("Reserved: 11", 0, '')}
+
+#fixed-width serial types -> (content size, struct), e.g. for column by column decoding
+SERIAL_TYPE_STRUCTS = dict((serialtype, (size, Struct('>' + fmt))) for serialtype, (name, size, fmt) in SERIAL_TYPES.items())
+#serial type byte -> record layout byte, TEXT and BLOB of any length become 13 and 12
+SERIAL_TYPE_LAYOUT = bytes(serialtype if serialtype < 12 else 12 + (serialtype & 1) for serialtype in range(256))
+
+TEXT_ENCODINGS = {1: 'utf-8', 2: 'utf-16-le', 3: 'utf-16-be'}
+
+#storage classes of serial types as bit masks, used to match records to tables
+CLASS_NULL = 1
+CLASS_INT = 2
+CLASS_REAL = 4
+CLASS_TEXT = 8
+CLASS_BLOB = 16
+SERIAL_TYPE_CLASSES = (CLASS_NULL, CLASS_INT, CLASS_INT, CLASS_INT, CLASS_INT, CLASS_INT, CLASS_INT,
+                       CLASS_REAL, CLASS_INT, CLASS_INT, 0, 0)
+
+#storage classes expected in a column of the given affinity, a REAL value
+#without fraction is stored as integer
+AFFINITY_CLASSES = {'INTEGER': CLASS_NULL | CLASS_INT,
+                    'REAL': CLASS_NULL | CLASS_INT | CLASS_REAL,
+                    'NUMERIC': CLASS_NULL | CLASS_INT | CLASS_REAL,
+                    'TEXT': CLASS_NULL | CLASS_TEXT,
+                    'BLOB': CLASS_NULL | CLASS_INT | CLASS_REAL | CLASS_TEXT | CLASS_BLOB}
+#sqlite_master (type, name, tbl_name, rootpage, sql) is not in the schema
+SQLITE_MASTER_SIGNATURE = (AFFINITY_CLASSES['TEXT'], AFFINITY_CLASSES['TEXT'], AFFINITY_CLASSES['TEXT'],
+                           AFFINITY_CLASSES['INTEGER'], AFFINITY_CLASSES['TEXT'])
+
+#a recovered record: kind is C (cell), FC (freeblock), F/U (raw freeblock/unallocated
+#bytes), prefixed with D for pages which are not part of any b-tree, with J for
+#page images from a rollback journal and with W for older page images in a WAL
+RowRecord = namedtuple('RowRecord', ['pageNr', 'kind', 'rownum', 'offset', 'rowid', 'values'])
+RAW_KINDS = ('F', 'U', 'DF', 'DU', 'JF', 'JU', 'WF', 'WU')
+
+#frame of a write-ahead log, offset is the file offset of the page data
+WALFrame = namedtuple('WALFrame', ['frameNr', 'pageNr', 'offset', 'commit', 'salt1', 'salt2', 'valid'])
+WAL_MAGIC = (0x377f0682, 0x377f0683)
+
+#page record of a rollback journal, offset is the file offset of the record
+JournalRecord = namedtuple('JournalRecord', ['offset', 'pageNr', 'page', 'checksum', 'valid'])
+JOURNAL_MAGIC = b'\xd9\xd5\x05\xf9\x20\xa1\x63\xd7'
+
+#bytes dropped when unallocated space and freeblocks are printed as text
+NON_PRINTABLE = bytes([ch for ch in range(256) if not (31 < ch < 126 or ch == 9)])
+#runs of printable bytes reported by the page map
+PRINTABLE_RUN = re.compile(rb'[\t\x20-\x7d]{4,}')
+
+#file signatures recognized in BLOBs and carved from free space as (kind, magic)
+FILE_SIGNATURES = (('jpg', JPGHEADER), ('jpg', EXIFHEADER), ('ma4', MA4HEADER), ('mov', MOVHEADER),
+                   ('bplist', BPLISTHEADER), ('mp3', MP3HEADER))
+
+#a carved hit: area is U (unallocated), F (freeblock) or P (freelist page), kind
+#is the kind of the signature or text for a run of printable bytes
+CarvedHit = namedtuple('CarvedHit', ['pageNr', 'offset', 'length', 'kind', 'area'])
+
+def parseSignature(spec):
+    '''
+    Parses an extra file signature given as KIND:HEX, e.g. pdf:255044462d.
+    Returns (kind, magic) and raises ValueError for an invalid spec.
+    '''
+    kind, sep, magic = spec.partition(':')
+    if not sep or not kind or not magic:
+        raise ValueError("signature %s is not KIND:HEX" %spec)
+    return kind, bytes.fromhex(magic)
+
+def readVarint(data, offset):
+    '''
+    Decodes the SQLite varint at offset in one pass. Bytes 1-8 hold 7 bits
+    each and have the high bit set if another byte follows, a 9th byte holds
+    8 bits. Returns (value, length).
+    '''
+    byte = data[offset]
+    if byte < 0x80:
+        return byte, 1
+    value = byte & 0x7f
+    for i in range(1, 8):
+        byte = data[offset + i]
+        if byte < 0x80:
+            return (value << 7) | byte, i + 1
+        value = (value << 7) | (byte & 0x7f)
+    value = (value << 8) | data[offset + 8]
+    #9 byte varints are 64 bit two's complement, e.g. negative rowids
+    if value >= 0x8000000000000000:
+        value -= 0x10000000000000000
+    return value, 9
+
+def readSerialTypes(data, offset, end):
+    '''
+    Decodes all serial types of a record header between offset and end.
+    Returns (serial types, offset of the record content). The serial types
+    are an array('B') if they all fit into one byte, array('q') otherwise.
+    '''
+    if end > len(data):
+        raise IndexError("record header exceeds the page")
+    header = bytes(data[offset:end])
+    if header.isascii():
+        #no byte has the high bit set, every byte is a serial type
+        return array('B', header), end
+    serialtypes = array('q')
+    while offset < end:
+        byte = data[offset]
+        if byte < 0x80:
+            serialtypes.append(byte)
+            offset += 1
+        else:
+            serialtype, length = readVarint(data, offset)
+            serialtypes.append(serialtype)
+            offset += length
+    return serialtypes, offset
+
+def serialTypeInfo(serialtype):
+    '''
+    Returns (name, content size) of a record serial type.
+    '''
+    if serialtype >= 12:
+        if serialtype % 2 == 0:
+            return "ST_BLOB", (serialtype - 12) // 2
+        return "ST_TEXT", (serialtype - 13) // 2
+    name, size, fmt = SERIAL_TYPES[serialtype]
+    return name, size
+
+def serialTypeClass(serialtype):
+    if serialtype >= 12:
+        if serialtype % 2 == 0:
+            return CLASS_BLOB
+        return CLASS_TEXT
+    return SERIAL_TYPE_CLASSES[serialtype]
+
+def columnAffinity(columntype):
+    '''
+    Returns the affinity of a declared column type, see "Determination of
+    column affinity" in the SQLite documentation.
+    '''
+    columntype = str(columntype).upper()
+    if 'INT' in columntype:
+        return 'INTEGER'
+    if 'CHAR' in columntype or 'CLOB' in columntype or 'TEXT' in columntype:
+        return 'TEXT'
+    if 'BLOB' in columntype or columntype == '':
+        return 'BLOB'
+    if 'REAL' in columntype or 'FLOA' in columntype or 'DOUB' in columntype:
+        return 'REAL'
+    return 'NUMERIC'
+
+#tokens of the CREATE TABLE statements stored in sqlite_master
+SQL_TOKENS = re.compile(r'''
+      (?P<space>\s+|--[^\n]*|/\*.*?(?:\*/|$))
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<name>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    | (?P<number>0[xX][0-9a-fA-F]+|(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?)
+    | (?P<word>[^\W\d]\w*)
+    | (?P<op>.)''', re.S | re.X)
+
+#keywords that end the type name of a column definition
+COLUMN_CONSTRAINTS = ('CONSTRAINT', 'PRIMARY', 'NOT', 'NULL', 'UNIQUE', 'CHECK', 'DEFAULT', 'COLLATE',
+                      'REFERENCES', 'GENERATED', 'AS')
+TABLE_CONSTRAINTS = ('CONSTRAINT', 'PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN')
+
+#result of parseCreateTable; primaryKey and the keys of uniqueKeys are column names
+CreateTable = namedtuple('CreateTable', ['columns', 'rowidAlias', 'withoutRowid', 'primaryKey', 'uniqueKeys'])
+
+#statements parsed by parseCreateTable and parseCreateIndex kept each
+SCHEMA_CACHE_SIZE = 1024
+
+def tokenizeSQL(sql):
+    '''
+    Splits sql into a list of (kind, value) tokens in one pass. Comments and
+    white space are dropped, quoted names are returned without quotes.
+    '''
+    tokens = list()
+    for match in SQL_TOKENS.finditer(sql):
+        kind = match.lastgroup
+        if kind == 'space':
+            continue
+        value = match.group()
+        if kind == 'name':
+            if value[0] == '[':
+                value = value[1:-1]
+            else:
+                value = value[1:-1].replace(value[0] * 2, value[0])
+        elif kind == 'string':
+            value = value[1:-1].replace("''", "'")
+        tokens.append((kind, value))
+    return tokens
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def parseCreateTable(sql):
+    '''
+    Parses a CREATE TABLE statement as stored in sqlite_master into a
+    CreateTable: columns is a tuple of (name, declared type), rowidAlias the
+    index of the INTEGER PRIMARY KEY column or None. uniqueKeys lists the
+    PRIMARY KEY and UNIQUE constraints that have an automatic index, in the
+    order sqlite numbers them. Results are cached by the SQL text.
+    '''
+    return _parseCreateTable(sql)
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def parseCreateIndex(sql):
+    '''
+    Returns the indexed columns of a CREATE INDEX statement as a tuple of
+    names, expressions are returned as their SQL text. Results are cached by
+    the SQL text.
+    '''
+    return tuple(_parseCreateIndex(sql))
+
+def _splitDefinitions(tokens):
+    #the token lists between the outer parentheses split at top level commas
+    #and the position after the closing parenthesis
+    definitions = list()
+    current = None
+    depth = 0
+    for i, (kind, value) in enumerate(tokens):
+        if kind == 'op' and value == '(':
+            depth += 1
+            if depth == 1:
+                current = list()
+                continue
+        elif kind == 'op' and value == ')':
+            depth -= 1
+            if depth == 0:
+                definitions.append(current)
+                return definitions, i + 1
+        elif kind == 'op' and value == ',' and depth == 1:
+            definitions.append(current)
+            current = list()
+            continue
+        if current is not None:
+            current.append((kind, value))
+    if current is not None:
+        definitions.append(current)
+    return definitions, len(tokens)
+
+def _parseCreateTable(sql):
+    tokens = tokenizeSQL(sql)
+    words = [value.upper() for kind, value in tokens[:3] if kind == 'word']
+    if 'VIRTUAL' in words:
+        #the arguments of a virtual table are not column definitions
+        return CreateTable((), None, False, (), ())
+    for kind, value in tokens:
+        if kind == 'op' and value == '(':
+            break
+        if kind == 'word' and value.upper() == 'AS':
+            #CREATE TABLE ... AS SELECT
+            return CreateTable((), None, False, (), ())
+
+    definitions, end = _splitDefinitions(tokens)
+    columns = list()
+    primarykey = None
+    primarydesc = False
+    keys = list()
+    for definition in definitions:
+        if not definition:
+            continue
+        kind, value = definition[0]
+        if kind == 'word' and value.upper() in TABLE_CONSTRAINTS:
+            keyword, names = _constraintColumns(definition)
+            if keyword == 'PRIMARY':
+                primarykey = names
+                keys.append(names)
+            elif keyword == 'UNIQUE':
+                keys.append(names)
+            continue
+        name = value
+        typename = list()
+        i = 1
+        depth = 0
+        while i < len(definition):
+            kind, value = definition[i]
+            if depth == 0 and kind == 'word' and value.upper() in COLUMN_CONSTRAINTS:
+                break
+            if value == '(' and kind == 'op':
+                depth += 1
+            elif value == ')' and kind == 'op':
+                depth -= 1
+            if typename and kind == 'word' and typename[-1] not in ('(', ','):
+                typename.append(' ')
+            typename.append(value)
+            i += 1
+        constraints = [value.upper() for kind, value in definition[i:] if kind == 'word']
+        for j in range(len(constraints)):
+            if constraints[j] == 'PRIMARY' and constraints[j + 1:j + 2] == ['KEY']:
+                primarykey = [name]
+                #INTEGER PRIMARY KEY DESC is not an alias for the rowid
+                primarydesc = constraints[j + 2:j + 3] == ['DESC']
+                keys.append(primarykey)
+            elif constraints[j] == 'UNIQUE':
+                keys.append([name])
+        columns.append((name, ''.join(typename)))
+
+    withoutRowid = False
+    trailer = [value.upper() for kind, value in tokens[end:] if kind == 'word']
+    for j in range(len(trailer) - 1):
+        if trailer[j] == 'WITHOUT' and trailer[j + 1] == 'ROWID':
+            withoutRowid = True
+
+    rowidAlias = None
+    if not withoutRowid and not primarydesc and primarykey is not None and len(primarykey) == 1:
+        for i, (name, typename) in enumerate(columns):
+            if name.upper() == primarykey[0].upper() and typename.upper() == 'INTEGER':
+                rowidAlias = i
+                break
+
+    #the rowid alias and the primary key of a WITHOUT ROWID table have no
+    #index of their own, repeated constraints share one index
+    uniqueKeys = list()
+    for key in keys:
+        if key is primarykey and (rowidAlias is not None or withoutRowid):
+            continue
+        key = tuple(key)
+        if key not in uniqueKeys:
+            uniqueKeys.append(key)
+    if primarykey is None:
+        primarykey = ()
+    return CreateTable(tuple(columns), rowidAlias, withoutRowid, tuple(primarykey), tuple(uniqueKeys))
+
+def _constraintColumns(definition):
+    #keyword (PRIMARY, UNIQUE, ...) and column names of a table constraint
+    keyword = None
+    names = list()
+    depth = 0
+    expectName = False
+    for kind, value in definition:
+        if keyword is None:
+            if kind == 'word' and value.upper() in ('PRIMARY', 'UNIQUE', 'CHECK', 'FOREIGN'):
+                keyword = value.upper()
+            continue
+        if kind == 'op' and value == '(':
+            depth += 1
+            expectName = depth == 1
+        elif kind == 'op' and value == ')':
+            depth -= 1
+            if depth == 0:
+                break
+        elif kind == 'op' and value == ',' and depth == 1:
+            expectName = True
+        elif expectName:
+            names.append(value)
+            expectName = False
+    return keyword, names
+
+def _parseCreateIndex(sql):
+    tokens = tokenizeSQL(sql)
+    for i, (kind, value) in enumerate(tokens):
+        if kind == 'word' and value.upper() == 'ON':
+            break
+    else:
+        return []
+    definitions, end = _splitDefinitions(tokens[i:])
+    columns = list()
+    for definition in definitions:
+        #drop the sort order and collation of a column
+        while definition and definition[-1][0] == 'word' and definition[-1][1].upper() in ('ASC', 'DESC'):
+            definition = definition[:-1]
+        if len(definition) > 2 and definition[-2][0] == 'word' and definition[-2][1].upper() == 'COLLATE':
+            definition = definition[:-2]
+        if len(definition) == 1:
+            columns.append(definition[0][1])
+        elif definition:
+            columns.append(''.join([value for kind, value in definition]))
+    return columns
+
 class CellContent:
     LEFT_CHILD_PAGE_NUM = "left child page num"
     PAYLOAD_SIZE = "payload size"
@@ -76,6 +479,1770 @@ class CellContent:
     PAYLOAD = "payload"
     OVERFLOW_PAGE_HEAD = "overflow page head"
 
+#######################################################################################
+#
+# class RecordDecoder
+#
+#######################################################################################
+class RecordDecoder:
+    '''
+    Decodes record payloads from their list of serial types. Records are
+    compiled by their layout, that is the serial types with TEXT and BLOB
+    columns of any length folded into one type each, so records which only
+    differ in their string lengths share a plan. A plan unpacks the
+    fixed-width columns between two TEXT or BLOB columns with one
+    unpack_from call and slices the TEXT and BLOB columns by the size of
+    their serial type.
+    '''
+    #compiled layouts kept before the cache is flushed
+    MAX_PLANS = 4096
+
+    def __init__(self, encoding='utf-8'):
+        self.encoding = encoding
+        self._plans = dict()
+
+    def decode(self, serialtypes, data, offset=0, nullvalue=None):
+        '''
+        Returns the column values of the record whose content starts at offset.
+        NULL columns are returned as nullvalue.
+        '''
+        if getattr(serialtypes, 'typecode', None) == 'B':
+            key = bytes(serialtypes).translate(SERIAL_TYPE_LAYOUT)
+        else:
+            #serial types of strings longer than 121 bytes
+            key = bytes([serialtype if serialtype < 12 else 12 + (serialtype & 1) for serialtype in serialtypes])
+        try:
+            runs, texts, ints, consts, nulls = self._plans[key]
+        except KeyError:
+            if len(self._plans) >= self.MAX_PLANS:
+                self._plans.clear()
+            runs, texts, ints, consts, nulls = self._plans[key] = self._compile(key)
+
+        start = offset
+        end = len(data)
+        celldatalist = list()
+        try:
+            for record, column in runs:
+                celldatalist += record.unpack_from(data, offset)
+                offset += record.size
+                if column >= 0:
+                    size = (serialtypes[column] - 12) >> 1
+                    if offset + size > end:
+                        raise error("string exceeds the record")
+                    celldatalist.append(bytes(data[offset:offset + size]))
+                    offset += size
+        except error:
+            #truncated record, e.g. carved from freespace
+            return self._decodePartial(serialtypes, data, start, nullvalue)
+
+        for i in texts:
+            celldatalist[i] = self._text(celldatalist[i])
+        for i in ints:
+            celldatalist[i] = int.from_bytes(celldatalist[i], byteorder='big', signed=True)
+        for i, value in consts:
+            celldatalist[i] = value
+        for i in nulls:
+            celldatalist[i] = nullvalue
+        return celldatalist
+
+    def _compile(self, layout):
+        #runs of (struct of the fixed-width columns, index of the TEXT or BLOB
+        #column after them or -1) and the columns converted after unpacking
+        runs = list()
+        texts = list()
+        ints = list()
+        consts = list()
+        nulls = list()
+        fmt = '>'
+        for i, serialtype in enumerate(layout):
+            if serialtype >= 12:
+                runs.append((Struct(fmt), i))
+                fmt = '>'
+                if serialtype == 13:
+                    texts.append(i)
+                continue
+            fmt += SERIAL_TYPES[serialtype][2] or '0s'
+            if serialtype == 0:
+                nulls.append(i)
+            elif serialtype in (3, 5):
+                ints.append(i)
+            elif serialtype == 8:
+                consts.append((i, 0))
+            elif serialtype == 9:
+                consts.append((i, 1))
+            elif serialtype in (10, 11):
+                consts.append((i, None))
+        runs.append((Struct(fmt), -1))
+        return runs, texts, ints, consts, nulls
+
+    def _decodePartial(self, serialtypes, data, offset, nullvalue):
+        #column by column, stops at the first number which is cut off
+        celldatalist = list()
+        end = len(data)
+        for serialtype in serialtypes:
+            if serialtype >= 12:
+                size = (serialtype - 12) >> 1
+                value = bytes(data[offset:offset + size])
+                celldatalist.append(self._text(value) if serialtype & 1 else value)
+                offset += size
+                continue
+            size, record = SERIAL_TYPE_STRUCTS[serialtype]
+            if serialtype == 0:
+                celldatalist.append(nullvalue)
+            elif serialtype in (8, 9):
+                celldatalist.append(serialtype - 8)
+            elif serialtype in (10, 11):
+                celldatalist.append(None)
+            elif offset + size > end:
+                break
+            elif serialtype in (3, 5):
+                celldatalist.append(int.from_bytes(data[offset:offset + size], byteorder='big', signed=True))
+            else:
+                celldatalist.append(record.unpack_from(data, offset)[0])
+            offset += size
+        return celldatalist
+
+    def _text(self, value):
+        try:
+            return str(value, self.encoding)
+        except UnicodeDecodeError:
+            return str(value)
+
+#######################################################################################
+#
+# class FreeblockCarver
+#
+#######################################################################################
+class FreeblockCarver:
+    '''
+    Carves deleted records from the freeblocks of leaf pages. Freeing a cell
+    overwrites its first 4 bytes with the freeblock header, that is the
+    payload length, the rowid and often the header length and the first
+    serial types. Each record start is tried with a few candidate header
+    positions and the serial types are checked against the column classes of
+    the table signatures one by one, so a candidate is dropped at the first
+    column that does not fit.
+    '''
+    #the payload length and rowid varints in front of a header take at most 18 bytes
+    MAX_HEADER_START = 18
+    #content size -> integer serial type
+    INT_SERIAL_TYPES = {1: 1, 2: 2, 3: 3, 4: 4, 6: 5, 8: 6}
+
+    def __init__(self, decoder, signatures, index=False):
+        self.decoder = decoder
+        self.signatures = signatures
+        self.index = index
+        #serial types lost with the freeblock header besides the header length
+        self.maxLost = 2 if index else 1
+
+    def carve(self, block):
+        '''
+        Returns the records of a freeblock, including its 4 byte header, as a
+        list of (offset, rowid, values). The rowid is None if it was
+        overwritten.
+        '''
+        best = None
+        for masks in self.signatures:
+            candidate = self._carveAt(block, 0, masks)
+            if candidate is not None and (best is None or candidate[0] > best[0]):
+                best = candidate + (masks,)
+        if best is None:
+            return list()
+
+        score, offset, end, rowid, values, masks = best
+        records = [(offset, rowid, values)]
+        #cells freed next to each other are merged into one freeblock
+        while end < len(block):
+            candidate = self._carveAt(block, end, masks)
+            if candidate is None:
+                break
+            score, offset, end, rowid, values = candidate
+            records.append((offset, rowid, values))
+        return records
+
+    def _carveAt(self, block, start, masks):
+        #best (score, offset, end, rowid, values) of a record starting at start
+        n = len(masks)
+        size = len(block)
+        best = None
+
+        cell = self._readCell(block, start, masks)
+        if cell is not None:
+            end, rowid, types, content = cell
+            best = (4 * n, start, end, rowid, self.decoder.decode(types, block, content))
+
+        #the header is intact if the varints in front of it took 4 bytes or more
+        for headerStart in range(start + 4, min(start + self.MAX_HEADER_START, size)):
+            if best is not None and best[0] >= 3 * n:
+                break
+            try:
+                headerlen, length = readVarint(block, headerStart)
+            except IndexError:
+                break
+            parsed = self._readTypes(block, headerStart + length, headerStart + headerlen, masks, 0)
+            if parsed is None:
+                continue
+            types, content, contentsize = parsed
+            end = content + contentsize
+            if end > size:
+                continue
+            score = 2 * n
+            if self._fits(block, end, masks):
+                score += n
+            if best is None or score > best[0]:
+                best = (score, start, end, None, self.decoder.decode(types, block, content))
+
+        #the header length and up to maxLost serial types are overwritten
+        for lost in range(self.maxLost + 1):
+            if lost >= n or (best is not None and best[0] >= n):
+                break
+            parsed = self._readTypes(block, start + 4, None, masks, lost)
+            if parsed is None:
+                continue
+            types, content, contentsize = parsed
+            rest = size - content - contentsize
+            if rest < 0:
+                continue
+            if lost == 0:
+                end = content + contentsize
+                score = n - 1
+                if self._fits(block, end, masks):
+                    score += n + 1
+                values = self.decoder.decode(types, block, content)
+            elif lost == 1:
+                #the lost column fills the rest of the freeblock
+                serialtype = self._lostSerialType(rest, masks[0])
+                if serialtype is None:
+                    continue
+                end = size
+                score = n - lost
+                values = self.decoder.decode([serialtype] + list(types), block, content)
+            else:
+                end = size
+                score = n - lost
+                values = [None] * lost + self.decoder.decode(types, block, content + rest)
+            if best is None or score > best[0]:
+                best = (score, start, end, None, values)
+
+        if best is None or all(value is None for value in best[4]):
+            return None
+        return best
+
+    def _readCell(self, block, offset, masks):
+        #(end, rowid, serial types, content offset) of an intact cell
+        try:
+            payloadlen, length = readVarint(block, offset)
+            pos = offset + length
+            rowid = None
+            if not self.index:
+                rowid, length = readVarint(block, pos)
+                pos += length
+            headerlen, length = readVarint(block, pos)
+        except IndexError:
+            return None
+        parsed = self._readTypes(block, pos + length, pos + headerlen, masks, 0)
+        if parsed is None:
+            return None
+        types, content, contentsize = parsed
+        end = content + contentsize
+        if payloadlen != headerlen + contentsize or end > len(block):
+            return None
+        return end, rowid, types, content
+
+    def _fits(self, block, end, masks):
+        #the record ends with the freeblock or another cell follows
+        return end == len(block) or self._readCell(block, end, masks) is not None
+
+    def _readTypes(self, block, pos, end, masks, first):
+        '''
+        Reads the serial types of the columns first.. of masks from pos up to
+        the header end, or just the number of columns if end is None. Returns
+        (serial types, content offset, content size) or None at the first
+        serial type which does not fit its column or the freeblock.
+        '''
+        size = len(block)
+        if end is not None and (end > size or end - pos < len(masks) - first):
+            return None
+        types = list()
+        contentsize = 0
+        for mask in masks[first:]:
+            if pos >= size or (end is not None and pos >= end):
+                return None
+            try:
+                serialtype, length = readVarint(block, pos)
+            except IndexError:
+                return None
+            pos += length
+            if serialtype < 0 or not serialTypeClass(serialtype) & mask:
+                return None
+            if serialtype >= 12:
+                contentsize += (serialtype - 12) // 2
+            else:
+                contentsize += SERIAL_TYPES[serialtype][1]
+            if contentsize > size:
+                return None
+            types.append(serialtype)
+        if end is not None and pos != end:
+            return None
+        return types, pos, contentsize
+
+    def _lostSerialType(self, size, mask):
+        #serial type of a lost column with the given content size, NULL, 0 and 1 have no content
+        if size == 0:
+            return 0 if mask & CLASS_NULL else None
+        if mask & CLASS_TEXT:
+            return 13 + 2 * size
+        if mask & CLASS_INT and size in self.INT_SERIAL_TYPES:
+            return self.INT_SERIAL_TYPES[size]
+        if mask & CLASS_REAL and size == 8:
+            return 7
+        if mask & CLASS_BLOB:
+            return 12 + 2 * size
+        return None
+
+#######################################################################################
+#
+# class RowWriter
+#
+#######################################################################################
+class RowWriter:
+    '''
+    Buffered line writer for the table output. Lines are collected and
+    written to the stream in large blocks instead of one print per row.
+    '''
+
+    def __init__(self, stream=None, bufferSize=1024 * 1024):
+        self.stream = stream
+        self.bufferSize = bufferSize
+        self._lines = list()
+        self._size = 0
+
+    def write(self, line):
+        if line is None:
+            return
+        self._lines.append(line)
+        self._size += len(line) + 1
+        if self._size >= self.bufferSize:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            stream = self.stream if self.stream is not None else sys.stdout
+            self._lines.append('')
+            stream.write('\n'.join(self._lines))
+            self._lines = list()
+            self._size = 0
+
+#######################################################################################
+#
+# class BlobWriter
+#
+#######################################################################################
+class BlobWriter:
+    '''
+    Writes BLOBs to outdir in background threads fed by a bounded queue, the
+    producer waits while the threads are behind. Files are named by the
+    SHA-256 of their content, a BLOB found in several rows is written once
+    and typed once. manifest.csv maps every row field to its file.
+    '''
+    MANIFEST = 'manifest.csv'
+    MANIFEST_HEADER = ('table', 'page', 'kind', 'rownum', 'column', 'sha256', 'file', 'size')
+
+    def __init__(self, outdir, filetype, threads=4, queueSize=64):
+        self.outdir = outdir
+        self.filetype = filetype
+        self.queue = queue.Queue(queueSize)
+        self.files = dict()
+        self.manifest = list()
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._run, daemon=True) for i in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def write(self, row, data):
+        '''
+        Queues data unless a BLOB with the same content was queued before and
+        returns the path of its file. row is (table, page, kind, rownum,
+        column) of the field in the manifest.
+        '''
+        digest = hashlib.sha256(data).hexdigest()
+        filename = self.files.get(digest)
+        if filename is None:
+            filename = self.files[digest] = digest + "." + self.filetype(data[0:12])
+            self.queue.put((os.path.join(self.outdir, filename), data, tuple(row)))
+        self.manifest.append(tuple(row) + (digest, filename, len(data)))
+        return os.path.join(self.outdir, filename)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, data, row = item
+            try:
+                with open(path, 'wb') as output_file:
+                    output_file.write(data)
+            except OSError as e:
+                with self._lock:
+                    self.errors += 1
+                    print("BLOB of table %s page %s %s row %s column %s not written: %s" %(row + (str(e),)), file=sys.stderr)
+
+    def close(self):
+        '''
+        Waits until all queued BLOBs are written and writes the manifest.
+        '''
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        with open(os.path.join(self.outdir, self.MANIFEST), 'w', newline='') as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(self.MANIFEST_HEADER)
+            writer.writerows(self.manifest)
+
+#######################################################################################
+#
+# class TableExporter
+#
+#######################################################################################
+class TableExporter:
+    '''
+    Writes the recovered rows of each table to its own file in outdir.
+    Every row starts with the provenance columns page, kind and offset,
+    followed by the table columns. Subclasses implement the file format.
+    '''
+    extension = ''
+    PROVENANCE = ('page', 'kind', 'offset')
+
+    def __init__(self, outdir, infile=None):
+        self.outdir = outdir
+        self.infile = infile
+        self.files = list()
+        self.columns = list()
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir)
+
+    def open(self, tblname, schema):
+        self.tblname = str(tblname)
+        self.columns = [column[0] for column in schema]
+        self.blobs = [column[1] == "BLOB" for column in schema]
+        self._open()
+
+    def fileName(self, name):
+        name = ''.join([ch if ch.isalnum() or ch in '-_.' else '_' for ch in name])
+        filename = os.path.join(self.outdir, name + "." + self.extension)
+        self.files.append(filename)
+        return filename
+
+    def columnName(self, i):
+        if i < len(self.columns):
+            return self.columns[i]
+        return "col" + str(i)
+
+    def write(self, record):
+        pass
+
+    def close(self):
+        pass
+
+    def finish(self):
+        pass
+
+    def _open(self):
+        pass
+
+class CSVExporter(TableExporter):
+    '''
+    CSV with a header line, BLOB values are written hex encoded.
+    '''
+    extension = 'csv'
+
+    def _open(self):
+        self._file = open(self.fileName(self.tblname), 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(list(self.PROVENANCE) + self.columns)
+
+    def write(self, record):
+        row = [record.pageNr, record.kind, record.offset]
+        for value in record.values:
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = bytes(value).hex()
+            row.append(value)
+        self._writer.writerow(row)
+
+    def close(self):
+        self._file.close()
+
+class JSONLinesExporter(TableExporter):
+    '''
+    One JSON object per row, BLOB values are written hex encoded. Values
+    without a column in the schema are named col<N>.
+    '''
+    extension = 'jsonl'
+
+    def _open(self):
+        self._file = open(self.fileName(self.tblname), 'w', encoding='utf-8')
+        self._writer = RowWriter(self._file)
+
+    def write(self, record):
+        row = OrderedDict(zip(self.PROVENANCE, (record.pageNr, record.kind, record.offset)))
+        i = 0
+        for value in record.values:
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = bytes(value).hex()
+            row[self.columnName(i)] = value
+            i += 1
+        self._writer.write(json.dumps(row, ensure_ascii=False))
+
+    def close(self):
+        self._writer.flush()
+        self._file.close()
+
+class ArrowExporter(TableExporter):
+    '''
+    Arrow IPC file written in record batches. Requires pyarrow.
+    Table columns are stored as strings, columns declared BLOB as binary,
+    as the values of a SQLite column do not need to share one type. Values
+    without a column in the schema are stored in string columns named
+    col<N>.
+    '''
+    extension = 'arrow'
+    BATCH_SIZE = 65536
+
+    def __init__(self, outdir, infile=None):
+        if pyarrow is None:
+            raise ImportError("export format %s requires pyarrow" %self.extension)
+        TableExporter.__init__(self, outdir, infile)
+
+    def _open(self):
+        fields = [pyarrow.field('page', pyarrow.int64()), pyarrow.field('kind', pyarrow.string()), pyarrow.field('offset', pyarrow.int64())]
+        for name, isblob in zip(self.columns, self.blobs):
+            fields.append(pyarrow.field(name, pyarrow.binary() if isblob else pyarrow.string()))
+        self._schema = pyarrow.schema(fields)
+        self._batch = [list() for field in fields]
+        self._filename = self.fileName(self.tblname)
+        self._writer = self._newWriter(self._filename)
+
+    def _newWriter(self, filename):
+        return pyarrow.ipc.new_file(filename, self._schema)
+
+    def _readTable(self, filename):
+        with pyarrow.OSFile(filename) as source:
+            return pyarrow.ipc.open_file(source).read_all()
+
+    def _addColumns(self, width):
+        #the schema of an open file is fixed, the rows written so far are read
+        #back and written again with NULL in the new columns
+        self._flush()
+        self._writer.close()
+        table = self._readTable(self._filename)
+        fields = list(self._schema)
+        while len(fields) - len(self.PROVENANCE) < width:
+            field = pyarrow.field(self.columnName(len(fields) - len(self.PROVENANCE)), pyarrow.string())
+            table = table.append_column(field, pyarrow.nulls(len(table), field.type))
+            fields.append(field)
+            self.blobs.append(False)
+            self._batch.append(list())
+        self._schema = pyarrow.schema(fields)
+        self._writer = self._newWriter(self._filename)
+        if len(table) > 0:
+            self._writer.write_table(pyarrow.Table.from_arrays(table.columns, schema=self._schema))
+
+    def write(self, record):
+        if len(record.values) > len(self._batch) - len(self.PROVENANCE):
+            self._addColumns(len(record.values))
+        batch = self._batch
+        batch[0].append(record.pageNr)
+        batch[1].append(record.kind)
+        batch[2].append(record.offset)
+        i = 0
+        for column, isblob in zip(batch[3:], self.blobs):
+            value = record.values[i] if i < len(record.values) else None
+            if value is None:
+                column.append(None)
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                column.append(bytes(value) if isblob else bytes(value).hex())
+            elif isblob:
+                column.append(str(value).encode('utf-8'))
+            else:
+                column.append(str(value))
+            i += 1
+        if len(batch[0]) >= self.BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if self._batch[0]:
+            self._writer.write_batch(pyarrow.record_batch(self._batch, schema=self._schema))
+            self._batch = [list() for column in self._batch]
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+class ParquetExporter(ArrowExporter):
+    '''
+    Parquet file written in row groups of BATCH_SIZE rows. Requires pyarrow.
+    '''
+    extension = 'parquet'
+
+    def _newWriter(self, filename):
+        return pyarrow.parquet.ParquetWriter(filename, self._schema)
+
+    def _readTable(self, filename):
+        return pyarrow.parquet.read_table(filename)
+
+class SQLiteExporter(TableExporter):
+    '''
+    One output database per evidence file. Live rows go to a table with the
+    name of the source table, freeblock records to freespace_<name> and
+    records of deleted pages to deleted_<name>. Every row references its
+    page, kind, offset and MD5 hash in the _provenance table.
+    Rows are inserted with executemany in one transaction, without journal.
+    '''
+    extension = 'sqlite'
+    BATCH_SIZE = 10000
+    TARGETS = {'C': '', 'FC': 'freespace_', 'DC': 'deleted_', 'DFC': 'deleted_'}
+
+    def __init__(self, outdir, infile=None):
+        TableExporter.__init__(self, outdir, infile)
+        self._db = None
+        self._provenanceId = 0
+        self._provenance = list()
+        self._tables = dict()
+        self._batches = dict()
+
+    def _open(self):
+        if self._db is None:
+            self._connect()
+
+    def _connect(self):
+        filename = self.fileName(os.path.basename(self.infile or 'sqlitedbparser') + ".recovered")
+        if os.path.exists(filename):
+            os.remove(filename)
+        self._db = sqlite3.connect(filename, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE _provenance (id INTEGER PRIMARY KEY, tbl TEXT, page INTEGER, kind TEXT, offset INTEGER, md5 TEXT)")
+        self._db.execute("BEGIN")
+
+    def _quote(self, name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _createTable(self, name):
+        columns = list()
+        for column in self.columns:
+            column = str(column)
+            while column in columns or column == '_provenance_id':
+                column += '_'
+            columns.append(column)
+        definition = ["_provenance_id INTEGER"] + [self._quote(column) for column in columns]
+        self._db.execute("CREATE TABLE %s (%s)" %(self._quote(name), ", ".join(definition)))
+        self._tables[name] = columns
+        self._batches[name] = list()
+
+    def _addColumns(self, name, width):
+        columns = self._tables[name]
+        self._flushTable(name)
+        while len(columns) < width:
+            column = "col" + str(len(columns))
+            while column in columns:
+                column += '_'
+            self._db.execute("ALTER TABLE %s ADD COLUMN %s" %(self._quote(name), self._quote(column)))
+            columns.append(column)
+
+    def write(self, record):
+        name = self.TARGETS.get(record.kind, '') + self.tblname
+        if name not in self._tables:
+            self._createTable(name)
+        values = [bytes(value) if isinstance(value, (bytearray, memoryview)) else value for value in record.values]
+        if len(values) > len(self._tables[name]):
+            self._addColumns(name, len(values))
+        values.extend([None] * (len(self._tables[name]) - len(values)))
+
+        self._provenanceId += 1
+        md5 = hashlib.md5(''.join([str(value) for value in record.values]).encode('utf-8')).hexdigest()
+        self._provenance.append((self._provenanceId, self.tblname, record.pageNr, record.kind, record.offset, md5))
+        batch = self._batches[name]
+        batch.append([self._provenanceId] + values)
+        if len(batch) >= self.BATCH_SIZE:
+            self._flushTable(name)
+
+    def _flushTable(self, name):
+        batch = self._batches[name]
+        if batch:
+            self._db.executemany("INSERT INTO %s VALUES (%s)" %(self._quote(name), ", ".join(["?"] * len(batch[0]))), batch)
+            self._batches[name] = list()
+        if self._provenance:
+            self._db.executemany("INSERT INTO _provenance VALUES (?, ?, ?, ?, ?, ?)", self._provenance)
+            self._provenance = list()
+
+    def close(self):
+        for name in self._batches:
+            self._flushTable(name)
+
+    def finish(self):
+        if self._db is not None:
+            self._db.execute("COMMIT")
+            self._db.close()
+            self._db = None
+
+EXPORT_FORMATS = {'csv': CSVExporter, 'jsonl': JSONLinesExporter, 'arrow': ArrowExporter, 'parquet': ParquetExporter, 'sqlite': SQLiteExporter}
+
+#######################################################################################
+#
+# class DBPageSource
+#
+#######################################################################################
+class DBPageSource:
+    '''
+    Read-only page source backed by a memory mapping of the database image.
+    Pages are handed out as memoryview slices of the mapping, so nothing is
+    copied and the OS only pages in what is actually touched.
+    '''
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = 0
+        self.pageSize = 0
+        self.usableSize = 0
+        self._file = None
+        self._map = None
+        self._view = memoryview(b'')
+
+        self._file = open(filename, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def setPageSize(self, pageSize, reserved=0):
+        #a page size of 1 in the db header means 65536
+        if pageSize == 1:
+            pageSize = 65536
+        self.pageSize = pageSize
+        self.usableSize = pageSize - reserved
+
+    def pageCount(self):
+        if self.pageSize <= 0:
+            return 0
+        return self.size // self.pageSize
+
+    def pageOffset(self, pageNr):
+        return (pageNr - 1) * self.pageSize
+
+    def page(self, pageNr):
+        offset = (pageNr - 1) * self.pageSize
+        return self._view[offset: offset + self.pageSize]
+
+    def read(self, offset, length):
+        return self._view[offset: offset + length]
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                #pages are still referenced, the mapping is released with them
+                pass
+        if self._file is not None:
+            self._file.close()
+
+#######################################################################################
+#
+# class PageScanner
+#
+#######################################################################################
+class PageScanner:
+    '''
+    Bulk scan of all pages of a page source with NumPy. The image is viewed
+    chunk by chunk as a (pages, pageSize) uint8 array, the b-tree headers of
+    all pages of a chunk are decoded with a few array operations and the
+    printable runs in unallocated space are found with a mask and its diff.
+    '''
+    #bytes per chunk, bounds the temporary arrays of a scan
+    CHUNK_SIZE = 16 * 1024 * 1024
+    BTREE_PAGE_TYPES = (INTERIOR_INDEX_BTREE_PAGE, INTERIOR_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE, LEAF_TABLE_BTREE_PAGE)
+
+    def __init__(self, source, minRun=4):
+        if numpy is None:
+            raise ImportError("the page scanner requires numpy")
+        self.source = source
+        self.minRun = minRun
+        self.pageSize = source.pageSize
+        self.pageCount = source.pageCount()
+
+    def chunks(self):
+        '''
+        Yields (first page number, uint8 array of shape (pages, pageSize)).
+        '''
+        pages = max(1, self.CHUNK_SIZE // self.pageSize)
+        for first in range(1, self.pageCount + 1, pages):
+            count = min(pages, self.pageCount - first + 1)
+            data = self.source.read((first - 1) * self.pageSize, count * self.pageSize)
+            yield first, numpy.frombuffer(data, dtype=numpy.uint8).reshape(count, self.pageSize)
+
+    def hashes(self):
+        '''
+        Returns a 64 bit hash of every page as uint64 array: the sum of the
+        little endian 8 byte words of the page times odd weights, one per
+        word position, modulo 2**64. A change of one word always changes it.
+        '''
+        weights = (numpy.arange(1, self.pageSize // 8 + 1, dtype=numpy.uint64) * numpy.uint64(0x9E3779B97F4A7C15)) | numpy.uint64(1)
+        hashes = [(pages.view('<u8') * weights).sum(axis=1, dtype=numpy.uint64) for first, pages in self.chunks()]
+        if not hashes:
+            return numpy.zeros(0, dtype=numpy.uint64)
+        return numpy.concatenate(hashes)
+
+    def scan(self):
+        '''
+        Returns a dict of arrays indexed by page number - 1: pageByte,
+        cellQty, fbOffset, freebytes, rmpointer, isBTree, unallocatedStart,
+        unallocatedEnd and printable, the number of bytes in printable runs of
+        the unallocated area, and the list of runs as (page, offset, length).
+        '''
+        fields = dict()
+        runs = list()
+        for first, pages in self.chunks():
+            header = self._headers(first, pages)
+            for name, values in header.items():
+                fields.setdefault(name, []).append(values)
+            pageruns, printable = self._printableRuns(first, pages, header)
+            runs.extend(pageruns)
+            fields.setdefault('printable', []).append(printable)
+        result = dict([(name, numpy.concatenate(values)) for name, values in fields.items()])
+        result['runs'] = runs
+        return result
+
+    def _headers(self, first, pages):
+        count = len(pages)
+        rows = numpy.arange(count)
+        #the b-tree header of page 1 follows the database header
+        base = numpy.zeros(count, dtype=numpy.intp)
+        if first == 1:
+            base[0] = 100
+
+        def field(offset):
+            return pages[rows, base + offset].astype(numpy.uint32)
+
+        pageByte = field(0)
+        isBTree = numpy.isin(pageByte, self.BTREE_PAGE_TYPES)
+        interior = (pageByte == INTERIOR_INDEX_BTREE_PAGE) | (pageByte == INTERIOR_TABLE_BTREE_PAGE)
+        cellQty = (field(3) << 8) | field(4)
+        cellOffset = (field(5) << 8) | field(6)
+        #a cell content offset of 0 means 65536
+        cellOffset[cellOffset == 0] = 65536
+        rmpointer = (field(8) << 24) | (field(9) << 16) | (field(10) << 8) | field(11)
+        start = base + numpy.where(interior, INTERIOR_OFFSET, LEAF_OFFSET) + 2 * cellQty
+        end = numpy.minimum(cellOffset, self.source.usableSize)
+        end = numpy.maximum(end, start)
+        return {'pageByte': pageByte,
+                'isBTree': isBTree,
+                'cellQty': numpy.where(isBTree, cellQty, 0),
+                'fbOffset': numpy.where(isBTree, (field(1) << 8) | field(2), 0),
+                'freebytes': numpy.where(isBTree, field(7), 0),
+                'rmpointer': numpy.where(interior, rmpointer, 0),
+                'unallocatedStart': numpy.where(isBTree, start, 0),
+                'unallocatedEnd': numpy.where(isBTree, end, 0)}
+
+    def _printableRuns(self, first, pages, header):
+        #only the unallocated bytes of the pages are gathered and classified
+        count = len(pages)
+        start = header['unallocatedStart'].astype(numpy.int64)
+        lengths = header['unallocatedEnd'].astype(numpy.int64) - start
+        total = int(lengths.sum())
+        if total == 0:
+            return list(), numpy.zeros(count, dtype=numpy.int64)
+        segment = numpy.cumsum(lengths) - lengths
+        pagestart = numpy.arange(count) * self.pageSize + start
+        data = pages.ravel()[numpy.arange(total) + numpy.repeat(pagestart - segment, lengths)]
+        #printable bytes are the ones kept by _remove_non_printable
+        printable = ((data - numpy.uint8(32)) < 94) | (data == 9)
+
+        #one False behind the bytes of every page, so no run continues into the next page
+        position = segment + numpy.arange(count)
+        mask = numpy.zeros(total + count, dtype=bool)
+        mask[numpy.arange(total) + numpy.repeat(numpy.arange(count), lengths)] = printable
+        edges = numpy.flatnonzero(mask[1:] != mask[:-1]) + 1
+        if mask[0]:
+            edges = numpy.concatenate(([0], edges))
+        starts = edges[0::2]
+        runlengths = edges[1::2] - starts
+        keep = runlengths >= self.minRun
+        starts, runlengths = starts[keep], runlengths[keep]
+
+        rows = numpy.searchsorted(position, starts, side='right') - 1
+        offsets = starts - position[rows] + start[rows]
+        perpage = numpy.bincount(rows, weights=runlengths, minlength=count).astype(numpy.int64)
+        runs = list(zip((rows + first).tolist(), offsets.tolist(), runlengths.tolist()))
+        return runs, perpage
+
+#######################################################################################
+#
+# class SignatureMatcher
+#
+#######################################################################################
+class SignatureMatcher:
+    '''
+    Matches file signatures with patterns compiled once. A header is matched
+    by one alternation, every magic is a group of it and the index of the
+    matching group gives its kind. Data is searched with one literal pattern
+    per magic, re tries every branch of an alternation at every byte but
+    skips ahead to a literal.
+    '''
+    def __init__(self, signatures=FILE_SIGNATURES):
+        self.kinds = [kind for kind, magic in signatures]
+        self.scanners = [(kind, re.compile(re.escape(magic))) for kind, magic in signatures]
+        if signatures:
+            self.pattern = re.compile(b'|'.join([b'(' + re.escape(magic) + b')' for kind, magic in signatures]))
+        else:
+            self.pattern = re.compile(b'(?!)')
+
+    def kind(self, header):
+        '''
+        Returns the kind of the signature at the start of header or None.
+        '''
+        match = self.pattern.match(header)
+        if match is None:
+            return None
+        return self.kinds[match.lastindex - 1]
+
+    def search(self, data, start, end):
+        '''
+        Returns (offset, kind) of all signatures in data[start:end] ordered by
+        offset.
+        '''
+        hits = [(match.start(), kind) for kind, scanner in self.scanners for match in scanner.finditer(data, start, end)]
+        hits.sort()
+        return hits
+
+#######################################################################################
+#
+# class SignatureCarver
+#
+#######################################################################################
+class SignatureCarver:
+    '''
+    Carves file signatures and printable strings from a free area of a page.
+    Both are found by compiled patterns, the hits are ordered by offset. A
+    signature hit extends to the end of its area, the size of the carved
+    file is not known.
+    '''
+    def __init__(self, matcher, minRun=4):
+        self.matcher = matcher
+        self.textRun = re.compile(rb'[\t\x20-\x7d]{%i,}' %minRun)
+
+    def carve(self, pageNr, area, page, start, end):
+        '''
+        Yields the CarvedHit of page[start:end] ordered by offset.
+        '''
+        hits = [(offset, end - offset, kind) for offset, kind in self.matcher.search(page, start, end)]
+        hits.extend([(match.start(), match.end() - match.start(), 'text') for match in self.textRun.finditer(page, start, end)])
+        hits.sort()
+        for offset, length, kind in hits:
+            yield CarvedHit(pageNr, offset, length, kind, area)
+
+#######################################################################################
+#
+# class WALFile
+#
+#######################################################################################
+class WALFile:
+    '''
+    Frame index of a write-ahead log (-wal) file. The file is memory mapped
+    and the frame headers are read in one pass. The page data stay in the
+    mapping until a page version is requested.
+
+    A frame is valid while its salts match the WAL header, as in SQLite the
+    frames after the first mismatch belong to an older generation of the log.
+    These frames are indexed as well, they may hold older page versions.
+    The checksums are not verified.
+    '''
+    _walhdrfrmt = Struct('>IIIIIIII')
+    _framehdrfrmt = Struct('>IIIIII')
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.frames = list()
+        self.pageFrames = dict()
+        self.lastCommit = 0
+
+        self.source = DBPageSource(filename)
+        if self.source.size < self._walhdrfrmt.size:
+            self.source.close()
+            raise ValueError("%s is not a WAL file" %str(filename))
+        (self.magic, self.version, self.pageSize, self.checkpoint,
+         self.salt1, self.salt2, self.checksum1, self.checksum2) = self._walhdrfrmt.unpack_from(self.source.read(0, self._walhdrfrmt.size))
+        if self.magic not in WAL_MAGIC or self.pageSize < 512:
+            self.source.close()
+            raise ValueError("%s is not a WAL file" %str(filename))
+        self._indexFrames()
+
+    def _indexFrames(self):
+        view = self.source.read(0, self.source.size)
+        unpackFrame = self._framehdrfrmt.unpack_from
+        frameSize = self._framehdrfrmt.size + self.pageSize
+        salts = (self.salt1, self.salt2)
+        offset = self._walhdrfrmt.size
+        frameNr = 0
+        valid = True
+        while offset + frameSize <= self.source.size:
+            pageNr, commit, salt1, salt2, checksum1, checksum2 = unpackFrame(view, offset)
+            frameNr += 1
+            valid = valid and pageNr > 0 and (salt1, salt2) == salts
+            frame = WALFrame(frameNr, pageNr, offset + self._framehdrfrmt.size, commit, salt1, salt2, valid)
+            self.frames.append(frame)
+            self.pageFrames.setdefault(pageNr, []).append(frame)
+            if valid and commit > 0:
+                self.lastCommit = frameNr
+            offset += frameSize
+
+    def versions(self, pageNr):
+        '''
+        Returns all frames of pageNr, oldest first.
+        '''
+        return self.pageFrames.get(pageNr, [])
+
+    def commits(self):
+        '''
+        Returns the frame numbers of the valid commit frames.
+        '''
+        return [frame.frameNr for frame in self.frames if frame.valid and frame.commit > 0]
+
+    def frameData(self, frame):
+        return self.source.read(frame.offset, self.pageSize)
+
+    def close(self):
+        self.source.close()
+
+#######################################################################################
+#
+# class WALOverlaySource
+#
+#######################################################################################
+class WALOverlaySource:
+    '''
+    Page source of the database as of the last commit frame of the WAL:
+    pages written up to that frame are read from the WAL, all other pages
+    from the database file. Provides the same interface as DBPageSource.
+    '''
+
+    def __init__(self, base, wal):
+        self.base = base
+        self.wal = wal
+        self.filename = base.filename
+        self.lastFrame = wal.lastCommit
+        self.pageSize = wal.pageSize
+        self.usableSize = wal.pageSize
+        self.dbSize = 0
+        self.walPages = dict()
+
+        for frame in wal.frames[:self.lastFrame]:
+            if frame.valid:
+                self.walPages[frame.pageNr] = frame
+        if self.lastFrame > 0:
+            self.dbSize = wal.frames[self.lastFrame - 1].commit
+        self.size = max(base.size, self.dbSize * self.pageSize)
+
+    def setPageSize(self, pageSize, reserved=0):
+        self.base.setPageSize(pageSize, reserved)
+        self.pageSize = self.base.pageSize
+        self.usableSize = self.base.usableSize
+
+    def pageCount(self):
+        #pages behind the committed size are kept, they may still hold data
+        return max(self.dbSize, self.base.pageCount())
+
+    def pageOffset(self, pageNr):
+        return self.base.pageOffset(pageNr)
+
+    def page(self, pageNr):
+        frame = self.walPages.get(pageNr)
+        if frame is not None:
+            return self.wal.frameData(frame)
+        return self.base.page(pageNr)
+
+    def read(self, offset, length):
+        pageNr = offset // self.pageSize + 1
+        start = offset - (pageNr - 1) * self.pageSize
+        if start + length <= self.pageSize:
+            return self.page(pageNr)[start: start + length]
+        data = list()
+        while length > 0:
+            chunk = self.page(pageNr)[start: start + length]
+            if len(chunk) == 0:
+                break
+            data.append(chunk)
+            length -= len(chunk)
+            pageNr += 1
+            start = 0
+        return memoryview(b''.join(data))
+
+    def close(self):
+        self.wal.close()
+        self.base.close()
+
+#######################################################################################
+#
+# class JournalFile
+#
+#######################################################################################
+class JournalFile:
+    '''
+    Reader for rollback journal (-journal) files. The journal consists of
+    segments, each a header padded to the sector size followed by page
+    records (page number, page image, checksum). The records are streamed
+    from the memory mapped file.
+
+    In persistent journal mode the header is zeroed after a commit, the page
+    records stay in place. Such a journal is read as one segment with the
+    page size of the database and 512 byte sectors. The nonce is lost with
+    the header, so the checksums of these records do not verify.
+    '''
+    _jrnhdrfrmt = Struct('>8sIIIII')
+    _pagenrfrmt = Struct('>I')
+
+    def __init__(self, filename, pageSize):
+        self.filename = filename
+        self.source = DBPageSource(filename)
+        self.zeroed = False
+
+        header = self.source.read(0, self._jrnhdrfrmt.size)
+        if len(header) < self._jrnhdrfrmt.size:
+            self.source.close()
+            raise ValueError("%s is not a journal file" %str(filename))
+        magic, pageCount, self.nonce, self.initialSize, self.sectorSize, self.pageSize = self._jrnhdrfrmt.unpack_from(header)
+        if magic != JOURNAL_MAGIC:
+            if bytes(header) != bytes(len(header)):
+                self.source.close()
+                raise ValueError("%s is not a journal file" %str(filename))
+            self.zeroed = True
+            self.sectorSize = 512
+            self.pageSize = pageSize
+        if self.sectorSize < 512 or self.pageSize < 512:
+            self.source.close()
+            raise ValueError("%s has an invalid journal header" %str(filename))
+
+    def records(self):
+        '''
+        Yields the JournalRecords of all segments in file order.
+        '''
+        view = self.source.read(0, self.source.size)
+        size = self.source.size
+        recordSize = self.pageSize + 8
+        offset = 0
+        while offset + self._jrnhdrfrmt.size <= size:
+            magic, pageCount, nonce = self._jrnhdrfrmt.unpack_from(view, offset)[:3]
+            if magic != JOURNAL_MAGIC and not (offset == 0 and self.zeroed):
+                break
+            start = offset + self.sectorSize
+            if self.zeroed or pageCount in (0, 0xffffffff):
+                #the record count was not written, read up to the end of the file
+                pageCount = (size - start) // recordSize
+            for i in range(pageCount):
+                recordOffset = start + i * recordSize
+                if recordOffset + recordSize > size:
+                    return
+                pageNr = self._pagenrfrmt.unpack_from(view, recordOffset)[0]
+                page = view[recordOffset + 4: recordOffset + 4 + self.pageSize]
+                checksum = self._pagenrfrmt.unpack_from(view, recordOffset + 4 + self.pageSize)[0]
+                yield JournalRecord(recordOffset, pageNr, page, checksum, checksum == self._checksum(nonce, page))
+            end = start + pageCount * recordSize
+            offset = end + (-end % self.sectorSize)
+
+    def _checksum(self, nonce, page):
+        #nonce plus every 200th byte of the page, counted from the end
+        return (nonce + sum(page[self.pageSize - 200:0:-200])) & 0xffffffff
+
+    def close(self):
+        self.source.close()
+
+#######################################################################################
+#
+# class DBPage
+#
+#######################################################################################
+class PageHeader:
+    '''
+    B-tree page header. The fields can be read as attributes or by key.
+    '''
+    __slots__ = ('pageByte', 'fbOffset', 'cellQty', 'cellOffset', 'freebytes', 'rmpointer')
+
+    def __init__(self, pageByte=0, fbOffset=0, cellQty=0, cellOffset=0, freebytes=0, rmpointer=None):
+        self.pageByte = pageByte
+        self.fbOffset = fbOffset
+        self.cellQty = cellQty
+        self.cellOffset = cellOffset
+        self.freebytes = freebytes
+        self.rmpointer = rmpointer
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+#######################################################################################
+#
+# class CellList
+#
+#######################################################################################
+class CellList:
+    '''
+    Records of the cells of a page. Only the page and its cell pointers are
+    kept, the records are decoded from the page each time they are read.
+    Cells that can not be decoded are skipped.
+    '''
+    __slots__ = ('_parser', '_page', '_pageByte', '_cellPointer')
+
+    def __init__(self, parser, page, pageByte, cellPointer):
+        self._parser = parser
+        self._page = page
+        self._pageByte = pageByte
+        self._cellPointer = cellPointer
+
+    def __iter__(self):
+        for cellp in self._cellPointer:
+            try:
+                row, payloadlen = self._parser._parseCell(self._page, cellp, self._pageByte)
+            except (IndexError, ValueError, error):
+                #cell runs past the end of the page, e.g. on a reused or damaged page
+                continue
+            yield row
+
+    def __len__(self):
+        return len(self._cellPointer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        row, payloadlen = self._parser._parseCell(self._page, self._cellPointer[index], self._pageByte)
+        return row
+
+#######################################################################################
+#
+# class DBPage
+#
+#######################################################################################
+class DBPage:
+    '''
+    Entry of SQLiteDBParser.dbPages. The page header is decoded when the page is
+    created, cells, freespace and unallocated area are decoded the first time
+    one of their keys is looked up. The page is a view of the mapped file and
+    the fields are slots, so a page costs a few hundred bytes until decoded.
+    '''
+    __slots__ = ('_parser', 'page', 'pageNr', 'pageOffset', 'pageHeader', 'pageType', 'isRootPage', 'cellPointer',
+                 'celldata', 'leafpages', 'hasLeafPages', 'freespace', 'fs_celldata', 'fs_offsets', 'unallocated',
+                 'schema', 'deletedpages')
+    _stages = {"celldata": "_readDBPageCells",
+               "leafpages": "_readDBPageLeafPages",
+               "hasLeafPages": "_readDBPageLeafPages",
+               "freespace": "_readDBPageFreeSpace",
+               "fs_celldata": "_readDBPageFreeSpace",
+               "fs_offsets": "_readDBPageFreeSpace",
+               "unallocated": "_readDBPageUnallocated"}
+
+    def __init__(self, parser, pageNr, page):
+        self._parser = parser
+        parser._readDBPageHeader(self, pageNr, page)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            pass
+        except TypeError:
+            raise KeyError(key)
+        stage = self._stages.get(key)
+        if stage is None:
+            raise KeyError(key)
+        getattr(self._parser, stage)(self)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            #the stage does not apply to this page type
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def isLoaded(self, key):
+        #True if key is set, without running its decode stage
+        return isinstance(key, str) and hasattr(self, key)
+
+#######################################################################################
+#
+# class DBPageCache
+#
+#######################################################################################
+class DBPageCache:
+    '''
+    Lazy replacement for the dbPages dict. Pages are numbered 1..pageCount and
+    are only decoded on first access.
+    '''
+
+    def __init__(self, parser, pageCount):
+        self._parser = parser
+        self._pageCount = pageCount
+        self._pages = dict()
+
+    def __getitem__(self, pageNr):
+        try:
+            return self._pages[pageNr]
+        except KeyError:
+            pass
+        if not isinstance(pageNr, int) or pageNr < 1 or pageNr > self._pageCount:
+            raise KeyError(pageNr)
+        dbpage = self._parser._readDBPage(pageNr)
+        self._pages[pageNr] = dbpage
+        return dbpage
+
+    def __setitem__(self, pageNr, dbpage):
+        self._pages[pageNr] = dbpage
+
+    def __contains__(self, pageNr):
+        return isinstance(pageNr, int) and 0 < pageNr <= self._pageCount
+
+    def __iter__(self):
+        return iter(range(1, self._pageCount + 1))
+
+    def __len__(self):
+        return self._pageCount
+
+    def isLoaded(self, pageNr):
+        return pageNr in self._pages
+
+#######################################################################################
+#
+# class TableBTreeCursor
+#
+#######################################################################################
+class TableBTreeCursor:
+    '''
+    Cursor over a table b-tree starting at rootPage. Leaf pages and rows are
+    yielded in rowid order while walking the tree depth first. Only one entry
+    per tree level is kept on the stack and rows are decoded when they are
+    yielded, so seeking to a rowid only decodes the pages on its path.
+    '''
+    #sqlite b-trees are far less deep, a deeper path means a page loop
+    MAX_DEPTH = 64
+
+    def __init__(self, parser, rootPage):
+        self.parser = parser
+        self.rootPage = rootPage
+
+    def __iter__(self):
+        return self.range()
+
+    def seek(self, rowid):
+        '''
+        Returns (pageNr, cellOffset, rowid, row) of the record with the given
+        rowid or None.
+        '''
+        for record in self.range(rowid, rowid):
+            return record
+        return None
+
+    def range(self, first=None, last=None):
+        '''
+        Yields (pageNr, cellOffset, rowid, row) for all records with
+        first <= rowid <= last. None means unbounded.
+        '''
+        for pageNr in self.leafPages(first, last):
+            for record in self.leafRows(pageNr, first, last):
+                yield record
+
+    def leafPages(self, first=None, last=None):
+        '''
+        Yields the leaf pages of the tree in rowid order, restricted to the
+        pages which may hold rowids between first and last.
+        '''
+        stack = list()
+        pageNr = self.rootPage
+        while True:
+            if pageNr is not None:
+                dbpage = self._getPage(pageNr, stack)
+                if dbpage is not None:
+                    if dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
+                        children = self._readChildren(dbpage)
+                        i = self._findChild(children, first)
+                        stack.append([pageNr, children, i])
+                        pageNr = children[i][0]
+                        continue
+                    if dbpage["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE:
+                        yield pageNr
+
+            # go up until there is a sibling to the right
+            pageNr = None
+            while stack:
+                entry = stack[-1]
+                key = entry[1][entry[2]][1]
+                if last is not None and key is not None and key >= last:
+                    return
+                entry[2] += 1
+                if entry[2] < len(entry[1]):
+                    pageNr = entry[1][entry[2]][0]
+                    break
+                stack.pop()
+            if pageNr is None:
+                return
+
+    def leafRows(self, pageNr, first=None, last=None, dbpage=None):
+        '''
+        Yields (pageNr, cellOffset, rowid, row) for the records of one leaf page.
+        dbpage is the page if it is not read from the database, e.g. a journal
+        page image.
+        '''
+        if dbpage is None:
+            dbpage = self.parser.dbPages[pageNr]
+        page = dbpage["page"]
+        cellPointer = dbpage["cellPointer"]
+        cellQty = len(cellPointer)
+        #rows decoded before, e.g. by the page workers, are not decoded again
+        celldata = None
+        if dbpage.isLoaded("celldata") and isinstance(dbpage["celldata"], list) and len(dbpage["celldata"]) == cellQty:
+            celldata = dbpage["celldata"]
+        start = 0
+        if first is not None:
+            start = self._findCell(page, cellPointer, cellQty, first)
+        for i in range(start, cellQty):
+            cellp = cellPointer[i]
+            try:
+                rowid = self._readRowid(page, cellp)
+                if last is not None and rowid > last:
+                    return
+                if celldata is not None:
+                    row = celldata[i]
+                else:
+                    row, payloadlen = self.parser._parseCell(page, cellp, LEAF_TABLE_BTREE_PAGE)
+            except (IndexError, ValueError, error):
+                continue
+            yield pageNr, cellp, rowid, row
+
+    def _getPage(self, pageNr, stack):
+        if len(stack) >= self.MAX_DEPTH:
+            return None
+        for entry in stack:
+            if entry[0] == pageNr:
+                return None
+        try:
+            return self.parser.dbPages[pageNr]
+        except KeyError:
+            return None
+
+    def _readChildren(self, dbpage):
+        # list of (child page, largest rowid in child), the right most child has no key
+        children = list()
+        page = dbpage["page"]
+        for cellp in dbpage["cellPointer"]:
+            try:
+                child = unpack('>L', page[cellp:cellp+4])[0]
+                key, length = readVarint(page, cellp + 4)
+            except (IndexError, error):
+                continue
+            children.append((child, key))
+        children.append((dbpage["pageHeader"]["rmpointer"], None))
+        return children
+
+    def _findChild(self, children, rowid):
+        if rowid is None:
+            return 0
+        lo = 0
+        hi = len(children) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if children[mid][1] < rowid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _findCell(self, page, cellPointer, cellQty, rowid):
+        lo = 0
+        hi = cellQty
+        while lo < hi:
+            mid = (lo + hi) // 2
+            cellp = cellPointer[mid]
+            try:
+                key = self._readRowid(page, cellp)
+            except (IndexError, error):
+                return lo
+            if key < rowid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _readRowid(self, page, cellp):
+        payloadlen, length = readVarint(page, cellp)
+        rowid, length = readVarint(page, cellp + length)
+        return rowid
+
+#######################################################################################
+#
+# class IndexBTreeCursor
+#
+#######################################################################################
+class IndexBTreeCursor:
+    '''
+    Cursor over an index b-tree, as used by indexes and WITHOUT ROWID tables.
+    Pages are yielded depth first, each interior page before its children,
+    and both interior and leaf cells hold records. Keys whose payload spills
+    are reassembled from their overflow pages.
+    '''
+    MAX_DEPTH = TableBTreeCursor.MAX_DEPTH
+
+    def __init__(self, parser, rootPage):
+        self.parser = parser
+        self.rootPage = rootPage
+
+    def __iter__(self):
+        for pageNr in self.pages():
+            for record in self.pageRows(pageNr):
+                yield record
+
+    def pages(self):
+        '''
+        Yields the interior and leaf pages of the tree.
+        '''
+        stack = [(self.rootPage, 0)]
+        seen = set()
+        while stack:
+            pageNr, depth = stack.pop()
+            if pageNr in seen or depth >= self.MAX_DEPTH:
+                continue
+            seen.add(pageNr)
+            try:
+                dbpage = self.parser.dbPages[pageNr]
+            except KeyError:
+                continue
+            if dbpage["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
+                yield pageNr
+                children = self.parser._readLeafPageList(dbpage)
+                stack.extend([(child, depth + 1) for child in reversed(children)])
+            elif dbpage["pageHeader"]["pageByte"] == LEAF_INDEX_BTREE_PAGE:
+                yield pageNr
+
+    def pageRows(self, pageNr, dbpage=None):
+        '''
+        Yields (pageNr, cellOffset, None, row) for the records of one page.
+        dbpage is the page if it is not read from the database.
+        '''
+        if dbpage is None:
+            dbpage = self.parser.dbPages[pageNr]
+        page = dbpage["page"]
+        pageByte = dbpage["pageHeader"]["pageByte"]
+        cellPointer = dbpage["cellPointer"]
+        #rows decoded before, e.g. by the page workers, are not decoded again
+        celldata = None
+        if dbpage.isLoaded("celldata") and isinstance(dbpage["celldata"], list) and len(dbpage["celldata"]) == len(cellPointer):
+            celldata = dbpage["celldata"]
+        for i in range(len(cellPointer)):
+            cellp = cellPointer[i]
+            if celldata is not None:
+                row = celldata[i]
+            else:
+                try:
+                    row, payloadlen = self.parser._parseCell(page, cellp, pageByte)
+                except (IndexError, ValueError, error):
+                    continue
+            yield pageNr, cellp, None, row
+
+#######################################################################################
+#
+# class ParseCache
+#
+#######################################################################################
+class ParseCache:
+    '''
+    Sidecar SQLite file in cachedir with the decoded pages of a database and
+    the results of the page analysis. The cache is used as is while size and
+    mtime of the file are unchanged. Otherwise every page is hashed, a page
+    is decoded again if its hash or the hash of one of its overflow pages
+    changed, and the analysis is redone if any page changed. Entries are
+    stored with marshal, which only restores plain values.
+    '''
+    VERSION = 3
+
+    def __init__(self, cachedir, infile, wal=None):
+        os.makedirs(cachedir, exist_ok=True)
+        path = os.path.abspath(infile)
+        name = "%s.%s.cache" %(os.path.basename(path), hashlib.sha1(path.encode('utf-8')).hexdigest()[:12])
+        self.path = os.path.join(cachedir, name)
+        self.stamp = repr([self._fileStamp(infile), self._fileStamp(wal) if wal else None])
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages(pageNr INTEGER PRIMARY KEY, hash BLOB, overflow BLOB, data BLOB)")
+        self.meta = dict(self.db.execute("SELECT key, value FROM meta"))
+        self.trusted = False
+        self.hashes = None
+        self.cachedPages = set()
+
+    def _fileStamp(self, path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def pageHashes(self, source):
+        '''
+        Returns the SHA-1 digest of every page, index 0 is page 1.
+        '''
+        return [hashlib.sha1(source.page(pageNr)).digest() for pageNr in range(1, source.pageCount() + 1)]
+
+    def load(self, parser):
+        '''
+        Imports the valid cached pages into parser.dbPages and records their
+        numbers in cachedPages. Returns the cached analysis or None if it has
+        to be redone.
+        '''
+        pageCount = parser.source.pageCount()
+        if self.meta.get('schema') != repr((self.VERSION, parser._schemaKey())):
+            #other page size or schema, the decoded records do not apply
+            self.db.execute("DELETE FROM pages")
+            self.meta = dict()
+        stored = dict(self.db.execute("SELECT pageNr, hash FROM pages"))
+        self.trusted = self.meta.get('stamp') == self.stamp and len(stored) == pageCount
+        if self.trusted:
+            self.hashes = [stored.get(pageNr) for pageNr in range(1, pageCount + 1)]
+        else:
+            self.hashes = self.pageHashes(parser.source)
+        changed = set([pageNr for pageNr in range(1, pageCount + 1) if stored.get(pageNr) != self.hashes[pageNr - 1]])
+
+        for pageNr, overflow, data in self.db.execute("SELECT pageNr, overflow, data FROM pages WHERE data IS NOT NULL"):
+            if pageNr in changed or pageNr > pageCount:
+                continue
+            if changed and not changed.isdisjoint(self._pageList(overflow)):
+                continue
+            parser._importDBPage(parser.dbPages[pageNr], *marshal.loads(data))
+            parser._markOverflowPages(self._pageList(overflow))
+            self.cachedPages.add(pageNr)
+
+        if changed or len(stored) != pageCount or self.meta.get('analysis') is None:
+            return None
+        return marshal.loads(self.meta['analysis'])
+
+    def save(self, parser):
+        '''
+        Stores the hashes of all pages, the leaf pages visited in this run
+        with the overflow pages they depend on and the analysis. The cursors
+        do not keep the rows of a page, those pages are decoded again here.
+        '''
+        pageCount = parser.source.pageCount()
+        if self.hashes is None:
+            self.hashes = self.pageHashes(parser.source)
+        rows = list()
+        for pageNr in range(1, pageCount + 1):
+            if pageNr in self.cachedPages:
+                continue
+            dbpage = parser.dbPages[pageNr] if parser.dbPages.isLoaded(pageNr) else None
+            if dbpage is not None and self._isLeafPage(parser, dbpage):
+                data = marshal.dumps(parser._exportDBPage(dbpage)[1:])
+                overflow = array('I', sorted(parser._pageOverflowPages(dbpage))).tobytes()
+            elif self.trusted:
+                #hash unchanged and nothing decoded
+                continue
+            else:
+                data = overflow = None
+            rows.append((pageNr, self.hashes[pageNr - 1], overflow, data))
+        self.db.executemany("INSERT OR REPLACE INTO pages(pageNr, hash, overflow, data) VALUES (?, ?, ?, ?)", rows)
+        self.db.execute("DELETE FROM pages WHERE pageNr > ?", (pageCount,))
+        meta = {'schema': repr((self.VERSION, parser._schemaKey())), 'stamp': self.stamp, 'analysis': marshal.dumps(parser._exportAnalysis())}
+        self.db.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)", list(meta.items()))
+        self.db.commit()
+
+    def _isLeafPage(self, parser, dbpage):
+        if dbpage["pageNr"] in parser.overflowpages or parser.isPtrMapPage(dbpage["pageNr"]):
+            return False
+        return dbpage["pageHeader"]["pageByte"] in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE)
+
+    def _pageList(self, data):
+        pages = array('I')
+        pages.frombytes(data)
+        return pages
+
+    def close(self):
+        self.db.close()
+
+#######################################################################################
+#
+# class DiffManifest
+#
+#######################################################################################
+class DiffManifest:
+    '''
+    SQLite file written by the diff mode: hash, role and overflow pages of
+    every page and the cell records decoded from it. The role of a page is
+    the table whose records it holds, prefixed with D: for a deleted page.
+    A manifest only applies to runs with the same hash, page size and schema.
+    '''
+    VERSION = 1
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages(pageNr INTEGER PRIMARY KEY, hash INTEGER, role TEXT, overflow BLOB)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS records(pageNr INTEGER, tbl TEXT, kind TEXT, rowid INTEGER, digest TEXT, line TEXT)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS records_page ON records(pageNr)")
+        self.meta = dict(self.db.execute("SELECT key, value FROM meta"))
+
+    def pages(self, key):
+        '''
+        Returns pageNr -> (hash, role, overflow pages) of the previous run, or
+        an empty dict if it was written under another key.
+        '''
+        if self.meta.get('key') != key:
+            return dict()
+        pages = dict()
+        for pageNr, digest, role, overflow in self.db.execute("SELECT pageNr, hash, role, overflow FROM pages"):
+            overflowpages = array('I')
+            if overflow:
+                overflowpages.frombytes(overflow)
+            pages[pageNr] = (digest, role, overflowpages)
+        return pages
+
+    def records(self, pages):
+        '''
+        Returns the records of pages as (pageNr, tbl, kind, rowid, digest, line).
+        '''
+        records = list()
+        pages = sorted(pages)
+        for first in range(0, len(pages), 500):
+            batch = pages[first:first + 500]
+            records.extend(self.db.execute("SELECT pageNr, tbl, kind, rowid, digest, line FROM records WHERE pageNr IN (%s)"
+                                           %",".join("?" * len(batch)), batch))
+        return records
+
+    def save(self, key, pages, replaced, records):
+        '''
+        Replaces the page table with pages, (pageNr, hash, role, overflow), and
+        the records of the replaced pages with records.
+        '''
+        if self.meta.get('key') != key:
+            self.db.execute("DELETE FROM records")
+        else:
+            replaced = sorted(replaced)
+            for first in range(0, len(replaced), 500):
+                batch = replaced[first:first + 500]
+                self.db.execute("DELETE FROM records WHERE pageNr IN (%s)" %",".join("?" * len(batch)), batch)
+        self.db.execute("DELETE FROM pages")
+        self.db.executemany("INSERT INTO pages(pageNr, hash, role, overflow) VALUES (?, ?, ?, ?)", pages)
+        self.db.executemany("INSERT INTO records(pageNr, tbl, kind, rowid, digest, line) VALUES (?, ?, ?, ?, ?, ?)", records)
+        self.db.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('key', ?)", (key,))
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
 #######################################################################################
 #
 # class SQLiteDBParser
@@ -93,11 +2260,9 @@ class SQLiteDBParser:
     #header of a btree table
     _lbtreefrmt = '>bhhhb'  #b-tree header for leaf b-tree pages
     _ibtreefrmt = '>I'      #additional for interior b-tree pages
-    _btreehdrkeys  = ['pageByte', 'fbOffset', 'cellQty', 'cellOffset', 'freebytes', 'rmpointer']
 
-    #header of pointer map
-    _ptrmapfrmt = '>bI'
-    _ptrmaphdrkeys = ['pageType', 'pageNr']
+    #pointer map entry
+    _ptrmapfrmt = 'BI'
 
     def __init__(self, options):
 
@@ -109,45 +2274,192 @@ class SQLiteDBParser:
         self.opt['freespace'] = options.freespace
         self.opt['unallocated'] = options.unallocated
         self.opt['deleted'] = options.deleted
+        self.opt['jobs'] = options.jobs
+        self.opt['wal'] = options.wal
+        self.opt['journal'] = options.journal
+        self.opt['cache'] = options.cache
         self.opt['verbose'] = False # future use :-)
 
-        self.data = b''
-        self.pageOffsets = []
+        self.source = None
+        self.cache = None
+        self.wal = None
+        self.journal = None
         self.dbInfo = dict()
         self.dbHeaderDict = dict()
-        self.ptrMap = list()
+        self.autoVacuum = False
+        #read on first use, see hasPtrMap
+        self.ptrMapPages = None
+        self.ptrMapTypes = array('B')
+        self.ptrMapParents = array('I')
         self.dbSchema = {}
-        self.dbPages = []
+        self.dbPages = {}
+        self.analyzed = False
         self.lPagesWithoutRoot = []
-        self.overflowpages = []
-
+        self.signatureIndex = None
+        self.rootPages = None
+        self.carvers = dict()
+        self.freelistTrunkPages = list()
+        self.freelistLeafPages = list()
+        self.freelistConsistent = False
+        self.parentIndex = dict()
+        self.overflowpages = set()
+        self.overflowComplete = False
+        self.rowWriter = RowWriter()
+        self.signatureMatcher = SignatureMatcher(FILE_SIGNATURES + tuple(options.signatures or ()))
+        self.overflowChains = dict()
+        self.overflowCache = OrderedDict()
+        self.overflowCacheSize = 0
+
+        self.blobWriter = None
         if self.opt['bin2file']:
             self.tmpdir = self._makeTmpDir()
+            if self.tmpdir != "":
+                self.blobWriter = BlobWriter(self.tmpdir, self._filetype)
 
         # 1. read db file, parse header, check if valid sqlite database, parse schema, get page offsets
         self._readDBFile()
+        if self.source is not None and self.opt['wal']:
+            self._readWALFile()
         self._parseDBHeader()
-        if self.isSqliteDB() == False:
+        if self.source is None or self.isSqliteDB() == False:
             return None
 
-#        self.dbSchema = self._parseDBSchema(self.data[:self.dbHeaderDict["pageSize"]])
-        self._getPageOffsets()
+        self.source.setPageSize(self.dbHeaderDict["pageSize"], self.dbHeaderDict["unused_reserved_space"])
+        if self.opt['journal']:
+            self._readJournalFile()
+        #auto-vacuum databases have pointer map pages, the first one is page 2
+        self.autoVacuum = self.dbHeaderDict["largest_root_b_tree"] != 0
 
-        # 2. read all pages
-        self._readallDBPages()
-        self._markOverflowPages()
+        # 2. pages are decoded on first access, only the schema is read up front
+        self.dbPages = DBPageCache(self, self.source.pageCount())
         self.dbSchema = self._parseDBSchema(1)
         self._setSchemaForRootPages()
+        if self.opt['cache']:
+            try:
+                self.cache = ParseCache(self.opt['cache'], self.opt['sqlitedb'], self.opt['wal'])
+            except (OSError, sqlite3.Error) as e:
+                print("Cache not used: %s" %str(e))
 
-        # 3. are all leaf pages assigned to a root page? if not try to find a mapping root page by mapping schema
+    def _analyzeDBPages(self):
+        '''
+        Cross-page analysis needed before printing table data. Runs once, on
+        the first command that needs it.
+        '''
+        if self.analyzed:
+            return
+        self.analyzed = True
+
+        # 3. pages decoded in an earlier run are taken from the cache, with an unchanged file the analysis too
+        if self.cache is not None:
+            analysis = self.cache.load(self)
+            if analysis is not None:
+                self._importAnalysis(*analysis)
+                self._readFreelist()
+                return
+
+        # only page headers are read here, overflow pages are marked as the cells are
+        # decoded or, for commands going through every page, by _collectOverflowPages
+        if self.hasPtrMap():
+            self._collectOverflowPages()
+        self._readFreelist()
+
+        # 4. are all leaf pages assigned to a root page? if not try to find a mapping root page by mapping schema
         self._lPagesWithoutRoot()
 
-    def _markOverflowPages(self):
-
-        for page in self.dbPages:
-            if self.dbPages[page]['pageNr'] in self.overflowpages:
+    def _readFreelist(self):
+        '''
+        Walks the freelist trunk pages starting at first_freelist_trunk_page
+        and tags the trunk and leaf pages in the page cache. The walk is
+        consistent if it ends without invalid or repeated page numbers and
+        finds total_num_freelist_pages pages.
+        '''
+        self.freelistTrunkPages = list()
+        self.freelistLeafPages = list()
+        consistent = True
+        pageCount = self.source.pageCount()
+        maxLeaves = self.source.usableSize // 4 - 2
+        seen = set()
+
+        trunk = self.dbHeaderDict["first_freelist_trunk_page"]
+        while trunk != 0:
+            if trunk < 2 or trunk > pageCount or trunk in seen:
+                consistent = False
+                break
+            seen.add(trunk)
+            self.freelistTrunkPages.append(trunk)
+            page = self.source.page(trunk)
+            nexttrunk, leafQty = unpack('>II', page[0:8])
+            if leafQty > maxLeaves:
+                consistent = False
+                leafQty = maxLeaves
+            for leaf in unpack('>%iI' %leafQty, page[8:8 + 4 * leafQty]):
+                if leaf < 2 or leaf > pageCount or leaf in seen:
+                    consistent = False
+                    continue
+                seen.add(leaf)
+                self.freelistLeafPages.append(leaf)
+            trunk = nexttrunk
+
+        if len(seen) != self.dbHeaderDict["total_num_freelist_pages"]:
+            consistent = False
+        self.freelistConsistent = consistent
+
+        for page in self.freelistTrunkPages:
+            self.dbPages[page]["pageType"] = "freelist trunk page"
+        for page in self.freelistLeafPages:
+            self.dbPages[page]["pageType"] = "freelist leaf page"
+
+    def _markOverflowPages(self, pages):
+        pages = set(pages)
+        self.overflowpages.update(pages)
+        for page in pages:
+            #freed overflow pages are shown as freelist pages
+            if self.dbPages.isLoaded(page) and not self.dbPages[page]['pageType'].startswith('freelist'):
                 self.dbPages[page]['pageType'] = 'Overflow Page'
 
+    def _collectOverflowPages(self):
+        '''
+        Marks the overflow pages of all cells, for the commands that go through
+        every page. They are listed in the pointer map if there is one,
+        otherwise the cell headers of all pages are parsed, in the page
+        workers with --jobs.
+        '''
+        if self.overflowComplete:
+            return
+        self.overflowComplete = True
+        if self.hasPtrMap():
+            types = self.ptrMapTypes
+            self._markOverflowPages([page for page in range(len(types)) if types[page] in (PTRMAP_OVERFLOW1, PTRMAP_OVERFLOW2)])
+            return
+        pages = range(1, self.source.pageCount() + 1)
+        if self.opt['jobs'] > 1:
+            #the workers return the overflow pages of the pages they decode
+            pages = self._readDBPagesInPool(pages, self.opt['jobs'])
+        overflowpages = set()
+        for page in pages:
+            overflowpages.update(self._pageOverflowPages(self.dbPages[page]))
+        self._markOverflowPages(overflowpages)
+
+    def _pageOverflowPages(self, dbpage):
+        #pages of the overflow chains of all cells, only the cell headers are parsed
+        overflowpages = set()
+        pageByte = dbpage["pageHeader"]["pageByte"]
+        if pageByte not in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
+            return overflowpages
+        for cellp in dbpage["cellPointer"]:
+            try:
+                if pageByte == LEAF_TABLE_BTREE_PAGE:
+                    overflowpagenum = self._parseLeafTableCellHeader(dbpage["page"], cellp, freespace=False)[7]
+                elif pageByte == LEAF_INDEX_BTREE_PAGE:
+                    overflowpagenum = self._parseLeafIndexCellHeader(dbpage["page"], cellp)[5]
+                else:
+                    overflowpagenum = self._parseInteriorIndexCellHeader(dbpage["page"], cellp)[5]
+            except (IndexError, ValueError, error):
+                continue
+            if overflowpagenum > 0:
+                overflowpages.update(self._readOverflowChain(overflowpagenum))
+        return overflowpages
+
     def isSqliteDB(self):
 
         if self.dbHeaderDict["signature"] == SQLITE_SIGNATURE:
@@ -197,21 +2509,90 @@ class SQLiteDBParser:
         except:
             return False
 
+    def hasWAL(self):
+        return self.wal is not None
+
+    def hasJournal(self):
+        return self.journal is not None
+
     def hasPtrMap(self):
         ret = False
-        if self.ptrMap.__len__() > 0:
+        if self.ptrMapPages is None:
+            self.ptrMapPages = list()
+            if self.autoVacuum and self.source.pageCount() >= 2:
+                self._readPointerMap()
+        if self.ptrMapPages.__len__() > 0:
             ret = True
         return ret
 
-    def _lPagesWithoutRoot(self):
+    def isPtrMapPage(self, pageNr):
+        #pointer map pages repeat every usable size/5 + 1 pages
+        return self.autoVacuum and pageNr >= 2 and (pageNr - 2) % (self.source.usableSize // 5 + 1) == 0
+
+    def _buildParentIndex(self):
+        #child page -> parent page, built in one pass over the interior pages
+        self.parentIndex = dict()
+        if self.hasPtrMap():
+            #the pointer map holds the parent of every non-root b-tree page
+            types = self.ptrMapTypes
+            parents = self.ptrMapParents
+            for page in range(len(types)):
+                if types[page] == PTRMAP_BTREE:
+                    self.parentIndex[page] = parents[page]
+            return
         for page in self.dbPages:
+            if self.dbPages[page]["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
+                for child in self.dbPages[page]["leafpages"]:
+                    self.parentIndex.setdefault(child, page)
+            elif self.dbPages[page]["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
+                for child in self._readLeafPageList(self.dbPages[page]):
+                    self.parentIndex.setdefault(child, page)
+
+    def _getPageRoot(self, pageNr):
+        #root page of the b-tree a page belongs to, walked up through the
+        #parent index, None for orphan pages
+        if self.rootPages is None:
+            self.rootPages = set([1] + [self.dbSchema[table]["rootpage"] for table in self.dbSchema
+                                        if self.dbSchema[table]['type'] in ('table', 'index') and isinstance(self.dbSchema[table]["rootpage"], int)])
+        seen = set()
+        while pageNr not in self.rootPages:
+            if pageNr == -1 or pageNr in seen:
+                return None
+            seen.add(pageNr)
+            pageNr = self._findLPageinRPage(pageNr)
+        return pageNr
+
+    def _lPagesWithoutRoot(self):
+        #leaf pages on the freelist are carved first, the other unreferenced
+        #leaf pages are only searched if the freelist walk was not consistent
+        self._buildParentIndex()
+        #page 1 is the root page of sqlite_master
+        rootpages = set([1])
+        for table in self.dbSchema:
+            if isinstance(self.dbSchema[table]["rootpage"], int):
+                rootpages.add(self.dbSchema[table]["rootpage"])
+        freepages = set()
+        for page in self.freelistLeafPages:
+            if self.dbPages[page]["pageHeader"]["pageByte"] in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE) \
+                    and self._findLPageinRPage(page) == -1:
+                freepages.add(page)
+        freepages = freepages - rootpages
+
+        self.lPagesWithoutRoot = sorted(freepages)
+        if not self.freelistConsistent:
+            leafpages = set()
+            for page in self.dbPages:
+                if self.dbPages[page]["pageHeader"]["pageByte"] in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE) \
+                        and self._findLPageinRPage(page) == -1:
+                    leafpages.add(page)
+            self.lPagesWithoutRoot += sorted(leafpages - rootpages - freepages)
+
+        for page in self.lPagesWithoutRoot:
             schemalist = list()
-            if self.dbPages[page]["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE:
-                if self._findLPageinRPage(self.dbPages[page]["pageNr"]) == -1:
-                    if self.dbPages[page]["pageHeader"]["cellQty"] > 0:
-                        schemalist = self._findMatchingSchema(self.dbPages[page]["celldata"])
-                        #add page to leafpages for root pages in schemalist
-                        self._addLeafPage2RootPage(self.dbPages[page]["pageNr"], schemalist)
+            if self.dbPages[page]["pageHeader"]["cellQty"] > 0:
+                schemalist = self._findMatchingSchema(self.dbPages[page])
+                #add page to leafpages for root pages in schemalist
+                self._addLeafPage2RootPage(self.dbPages[page]["pageNr"], schemalist)
 
     def _addLeafPage2RootPage(self, pageNr, schemalist):
 
@@ -225,75 +2606,79 @@ class SQLiteDBParser:
                 except:
                     pass
 
-    def _findMatchingSchema(self, celldata):
-        #compare number of columns with schema of tables
-        #col type are not checked at the moment ;-(
-        num_of_cols = celldata[0].__len__()
-        possibleschemalist = list()
-        for schema in self.dbSchema:
-            if not self.dbSchema[schema]['type'] == 'table':
+    def _buildSignatureIndex(self):
+        '''
+        Leaf page type -> column count -> list of (root page, storage class
+        mask per column), built once from dbSchema. Rowid tables are stored in
+        table b-trees, indexes and WITHOUT ROWID tables in index b-trees.
+        '''
+        index = {LEAF_TABLE_BTREE_PAGE: dict(), LEAF_INDEX_BTREE_PAGE: dict()}
+        for table in self.dbSchema:
+            if not self.dbSchema[table]['type'] in ('table', 'index') or not self.dbSchema[table].get("schema"):
                 continue
-            if num_of_cols == self.dbSchema[schema]["schema"].__len__():
-                possibleschemalist.append(self.dbSchema[schema]["rootpage"])
-        return possibleschemalist
-
-    def _findLPageinRPage(self, pageNr):
-        for page in self.dbPages:
-            if self.dbPages[page]["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
-                try:
-                    if pageNr in self.dbPages[page]["leafpages"]:
-                        return self.dbPages[page]["pageNr"]
-                except:
-                    pass
-        return -1
+            masks = tuple([AFFINITY_CLASSES[columnAffinity(column[1])] for column in self.dbSchema[table]["schema"]])
+            if self.dbSchema[table]['type'] == 'table' and not self.dbSchema[table]['withoutRowid']:
+                pageByte = LEAF_TABLE_BTREE_PAGE
+            else:
+                pageByte = LEAF_INDEX_BTREE_PAGE
+            index[pageByte].setdefault(len(masks), []).append((self.dbSchema[table]["rootpage"], masks))
+        return index
 
-    def _findSQLCmd(self, buf):
-        open = 0
-        start = 0
-        end = 0
-        i = 0
-        bindata = False
+    def _findMatchingSchema(self, dbpage):
+        '''
+        Returns the root page of the table or index that matches the records
+        of a leaf page best, as a list with one or no entry. Every record
+        scores one point per column whose serial type fits the column affinity,
+        for the tables with the same column count.
+        '''
+        if self.signatureIndex is None:
+            self.signatureIndex = self._buildSignatureIndex()
+        pageByte = dbpage["pageHeader"]["pageByte"]
+        if pageByte not in self.signatureIndex:
+            return list()
+        signatures = self.signatureIndex[pageByte]
+
+        scores = dict()
+        page = dbpage["page"]
+        for cellp in dbpage["cellPointer"]:
+            try:
+                if pageByte == LEAF_TABLE_BTREE_PAGE:
+                    serialtypes = self._parseLeafTableCellHeader(page, cellp, freespace=False)[0]
+                else:
+                    serialtypes = self._parseLeafIndexCellHeader(page, cellp)[0]
+            except (IndexError, ValueError, error):
+                continue
+            candidates = signatures.get(len(serialtypes))
+            if not candidates:
+                continue
+            classes = [serialTypeClass(serialtype) for serialtype in serialtypes]
+            for rootpage, masks in candidates:
+                score = 0
+                for cls, mask in zip(classes, masks):
+                    if cls & mask:
+                        score += 1
+                scores[rootpage] = scores.get(rootpage, 0) + score
+
+        best = None
+        for rootpage, masks in [candidate for candidates in signatures.values() for candidate in candidates]:
+            if scores.get(rootpage, 0) > scores.get(best, 0):
+                best = rootpage
+        if best is None:
+            return list()
+        return [best]
 
-        buf = buf.replace('\n','')
-        try:
-            if chr(buf[0]):
-                bindata = True
-        except:
-            bindata = False
-
-        while i < buf.__len__():
-            if not bindata:
-                if buf[i] == '(':
-                    if start == 0:
-                        start = i
-                    open += 1
-                if buf[i] == ')':
-                    open -= 1
-                    if open == 0:
-                        end = i
-                        break
-            else:
-                if chr(buf[i]) == '(':
-                    if start == 0:
-                        start = i
-                    open += 1
-                if chr(buf[i]) == ')':
-                    open -= 1
-                    if open == 0:
-                        end = i
-                        break
-            i += 1
-        if end <= start:
-            return "ERROR"
-        else:
-            return buf[start+1:end]
+    def _findLPageinRPage(self, pageNr):
+        #parent page of a b-tree page from the parent index, -1 if it has none
+        if self.hasPtrMap() and pageNr < len(self.ptrMapTypes) and self.ptrMapTypes[pageNr] == PTRMAP_BTREE:
+            return self.ptrMapParents[pageNr]
+        return self.parentIndex.get(pageNr, -1)
 
     def _setSchemaForRootPages(self):
 
         for table in self.dbSchema:
             if not isinstance(self.dbSchema[table]["rootpage"], int):
                 continue
-            if not self.dbSchema[table]['type'] == 'table':
+            if not self.dbSchema[table]['type'] in ('table', 'index'):
                 continue
             colheader = list()
             tblinfo = dict()
@@ -314,11 +2699,6 @@ class SQLiteDBParser:
                 tblinfo[self.dbSchema[table]["name"]] = colheader
         return tblinfo
 
-    def _getPageOffsets(self):
-
-        for offset in range(0, len(self.data), self.dbHeaderDict["pageSize"]):
-            self.pageOffsets.append(offset)
-
     def _lookUpTable(self, tbl_name):
 
         for table in self.dbSchema:
@@ -326,44 +2706,103 @@ class SQLiteDBParser:
                 return self.dbSchema[table]["rootpage"]
         return None
 
-    def _readallDBPages(self):
-        pageSize = self.dbHeaderDict["pageSize"]
-        pageNr = 0
-
-        pageDict = {}
-        for offset in self.pageOffsets:
-            dbpage = {}
-            pageNr += 1
-
-            dbpage = self._readDBPage(pageNr, offset)
-            pageDict[pageNr] = dbpage
-            self.dbPages = pageDict
-            offset += pageSize
+    def _readDBPagesInPool(self, pages, jobs):
+        '''
+        Decodes cells, freeblocks and unallocated area of pages in a pool of
+        jobs processes. The workers map the file themselves and only send
+        back the decoded records, the extents of freeblocks and unallocated
+        space and the overflow pages of the cells, the results are merged in
+        page order. Pages decoded before are skipped and returned.
+        '''
+        decoded = [pageNr for pageNr in pages if self.dbPages.isLoaded(pageNr) and self.dbPages[pageNr].isLoaded("celldata")]
+        pages = sorted(set(pages) - set(decoded))
+        if not pages:
+            return decoded
+        chunk = max(64, len(pages) // (jobs * 8) + 1)
+        pageranges = [pages[first:first + chunk] for first in range(0, len(pages), chunk)]
+        workeroptions = Values({'infile': self.opt['sqlitedb'], 'debug': False, 'bin2out': False, 'bin2file': False,
+                                'freespace': self.opt['freespace'], 'unallocated': self.opt['unallocated'],
+                                'deleted': self.opt['deleted'], 'jobs': 1, 'wal': self.opt['wal'], 'journal': None,
+                                'signatures': None, 'cache': None})
+
+        with Pool(jobs, _initPageWorker, (workeroptions, self.parentIndex)) as pool:
+            for results, overflowpages in pool.imap(_decodePageRange, pageranges):
+                for pageNr, celldata, fs_celldata, fs_offsets, unallocated in results:
+                    self._importDBPage(self.dbPages[pageNr], celldata, fs_celldata, fs_offsets, unallocated)
+                self._markOverflowPages(overflowpages)
+        return decoded
+
+    def _tablePages(self, page):
+        #pages whose records _iterTableRecords yields for a table
+        if page["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
+            pages = list(IndexBTreeCursor(self, page["pageNr"]).pages())
+        elif self.hasLeafPages(page) == True:
+            pages = [page["pageNr"]] + list(TableBTreeCursor(self, page["pageNr"]).leafPages())
+        else:
+            pages = [page["pageNr"]]
+        if self.opt['deleted'] and self.hasDeleted(page) == True:
+            pages += page["deletedpages"]
+        return pages
+
+    def _exportDBPage(self, dbpage):
+        #compact, picklable result of a page decoded by a worker
+        return (dbpage["pageNr"], list(dbpage["celldata"]), dbpage["fs_celldata"], dbpage["fs_offsets"],
+                self._getPageUnallocatedExtent(dbpage))
+
+    def _schemaKey(self):
+        #page size and schema, records decoded under another key do not apply
+        schema = repr([(name, self.dbSchema[name]) for name in sorted(self.dbSchema)])
+        return repr((self.source.pageSize, self.source.usableSize, hashlib.sha1(schema.encode('utf-8')).hexdigest()))
+
+    def _exportAnalysis(self):
+        #results of _analyzeDBPages kept by the cache
+        deletedpages = dict()
+        for table in self.dbSchema:
+            rootpage = self.dbSchema[table]["rootpage"]
+            if isinstance(rootpage, int) and rootpage in self.dbPages and self.dbPages[rootpage].isLoaded("deletedpages"):
+                deletedpages[rootpage] = self.dbPages[rootpage]["deletedpages"]
+        return self.parentIndex, sorted(self.overflowpages), self.overflowComplete, self.lPagesWithoutRoot, deletedpages
+
+    def _importAnalysis(self, parentIndex, overflowpages, overflowComplete, lPagesWithoutRoot, deletedpages):
+        self.parentIndex = parentIndex
+        self._markOverflowPages(overflowpages)
+        self.overflowComplete = overflowComplete
+        self.lPagesWithoutRoot = lPagesWithoutRoot
+        for rootpage, pages in deletedpages.items():
+            self.dbPages[rootpage]["deletedpages"] = pages
+
+    def _importDBPage(self, dbpage, celldata, fs_celldata, fs_offsets, unallocated):
+        page = dbpage["page"]
+        dbpage["celldata"] = celldata
+        dbpage["fs_celldata"] = fs_celldata
+        dbpage["fs_offsets"] = fs_offsets
+        dbpage["freespace"] = [page[offset:offset + size] if size > 0 else '' for offset, size in fs_offsets]
+        dbpage["unallocated"] = page[unallocated[0]:unallocated[1]]
+
+    def _readDBPage(self, pageNr, page=None):
+        if page is None:
+            page = self.source.page(pageNr)
+        return DBPage(self, pageNr, page)
 
-    def _readDBPage(self, pageNr, offset):
+    def _readDBPageHeader(self, dbpage, pageNr, page):
 
-        pageSize = self.dbHeaderDict["pageSize"]
         pageHeader = []
         counter = 0
-        dbpage = {}
-        page = self.data[offset: offset + pageSize]
-
-        if pageNr == 2 and self.dbHeaderDict["incremental_vacuum"] > 0:
-            #in this case, the page is a pointer map
-            self._readPointerMap(page)
 
-        pageHeader = self._parsePageHeader(page, pageNr)
+        if self.isPtrMapPage(pageNr):
+            #no b-tree header, the page is not searched for cells
+            pageHeader = PageHeader()
+        else:
+            pageHeader = self._parsePageHeader(page, pageNr)
         dbpage["page"] = page
         dbpage["pageNr"] = pageNr
-        dbpage["pageOffset"] = offset
+        dbpage["pageOffset"] = self.source.pageOffset(pageNr)
         dbpage["pageHeader"] = pageHeader
         dbpage["isRootPage"] = False
 
-        dbpage["celldata"] = list()
-        dbpage["deleteddata"] = list()
-
-        dbpage["fs_celldata"] = list()
-        if dbpage["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
+        if self.isPtrMapPage(pageNr):
+            dbpage["pageType"] = "pointer map"
+        elif dbpage["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
             dbpage["pageType"] = "interior index b-tree"
             if pageNr == 2:
                 counter += 1
@@ -375,51 +2814,42 @@ class SQLiteDBParser:
             dbpage["pageType"] = "leaf index b-tree"
         elif dbpage["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE:
             dbpage["pageType"] = "leaf table b-tree"
-        elif pageNr == 2 and self.dbHeaderDict["incremental_vacuum"] > 0:
-            dbpage["pageType"] = "pointer map"
         else:
             dbpage["pageType"] = "Unknown"
             if pageNr == 2 and (dbpage["pageType"] in (3,4)):
                 counter += 1
+        if pageNr in self.overflowpages:
+            dbpage["pageType"] = "Overflow Page"
         dbpage["cellPointer"] = self._readPageCellPointer(page, dbpage["pageHeader"], pageNr)
 
+    def _readDBPageLeafPages(self, dbpage):
 #            if pageNr > 1 and dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
         if dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
-            dbpage["leafpages"] = self._readLeafPageList(dbpage, offset)
+            dbpage["leafpages"] = self._readLeafPageList(dbpage)
             dbpage["hasLeafPages"] = True
 
+    def _readDBPageCells(self, dbpage):
+        dbpage["celldata"] = list()
 #            if (dbpage["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE) and (dbpage["pageHeader"]["cellQty"] > 0):
         if ((dbpage["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE) or (dbpage["pageHeader"]["pageByte"] == LEAF_INDEX_BTREE_PAGE) \
                     or (dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE) or (dbpage["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE)) and (dbpage["pageHeader"]["cellQty"] > 0):
-            dbpage["celldata"] = self._readPageCells(dbpage, offset)
-
-        dbpage["unallocated"] = self._readPageUnallocated(dbpage)
-        dbpage["freespace"], dbpage["fs_celldata"] = self._readPageFreeSpace(dbpage)
+            #records are decoded when they are read, see CellList
+            dbpage["celldata"] = CellList(self, dbpage["page"], dbpage["pageHeader"]["pageByte"], dbpage["cellPointer"])
 
-        return dbpage
-
-    def _readPageCells(self, dbpage, offset):
-        celldatalist = list()
-        for cp in range(0,(dbpage["pageHeader"]["cellQty"]*2),2):
-            celldata = list()
-            start = cp
-            end = cp + 2
-            cellp = unpack('>H', dbpage["cellPointer"][start:end])[0]
-            cellstart = offset + cellp
-            celldata, payloadlen = self._parseCell(self.data, cellstart, dbpage["pageHeader"]["pageByte"])
-            celldatalist.append(celldata)
+    def _readDBPageFreeSpace(self, dbpage):
+        dbpage["freespace"], dbpage["fs_celldata"], dbpage["fs_offsets"] = self._readPageFreeSpace(dbpage)
 
-        return celldatalist
+    def _readDBPageUnallocated(self, dbpage):
+        dbpage["unallocated"] = self._readPageUnallocated(dbpage)
 
-    def _readLeafPageList(self, dbpage, offset):
+    def _readLeafPageList(self, dbpage):
         leafpagelist = list()
-        offset = offset
-        for cp in range(0,(dbpage["pageHeader"]["cellQty"]*2),2):
-            start = cp
-            end = cp + 2
-            cellp = unpack('>h', dbpage["cellPointer"][start:end])[0]
-            cellstart = offset + cellp
-            leftchildpointer = unpack('>L', self.data[cellstart:cellstart+4])[0]
+        for cellp in dbpage["cellPointer"]:
+            try:
+                leftchildpointer = unpack('>L', dbpage["page"][cellp:cellp+4])[0]
+            except error:
+                #cell pointer outside of the page
+                continue
             #key = _getVarIntOfs(data, offset+4)
             leafpagelist.append(leftchildpointer)
         leafpagelist.append(dbpage["pageHeader"]["rmpointer"])
@@ -428,19 +2858,28 @@ class SQLiteDBParser:
     def _readPageFreeSpace(self, dbpage):
         fbOffset = dbpage["pageHeader"]["fbOffset"]
         freeblocklist = list()
+        freeblockoffsets = list()
         fs_data = list()
         fs_celldata = list()
         #fs_record = ''
         rs_offset = 2
+        if fbOffset > 0:
+            rootpage = self._getPageRoot(dbpage["pageNr"])
+            if rootpage is None:
+                #orphan pages are carved with the signature of the table their cells match
+                rootpage = next(iter(self._findMatchingSchema(dbpage)), None)
+            carver = self._getCarver(dbpage["pageHeader"]["pageByte"], rootpage)
         while fbOffset > 0:
             try:
                 start, size = unpack('>hh', dbpage["page"][fbOffset: fbOffset + 4])
+                fs_data = list()
                 if size > 0:
                     freeblock = dbpage["page"][fbOffset: fbOffset + size]
-                    fs_data, payloadlen  = self._parseFreeSpaceCell(freeblock, 4, dbpage["pageHeader"]["pageByte"])
+                    fs_data = carver.carve(freeblock)
                 else:
                     freeblock = ''
                 freeblocklist.append(freeblock)
+                freeblockoffsets.append((fbOffset, len(freeblock)))
                 fs_celldata.append(fs_data)
                 if (fbOffset != start) and (start > 0):
                     fbOffset = start
@@ -451,144 +2890,147 @@ class SQLiteDBParser:
                 '''
             except:
                 fbOffset = 0
-        return freeblocklist, fs_celldata
+        return freeblocklist, fs_celldata, freeblockoffsets
 
-    def _parseFreeSpaceCell(self, data, offset, cellformat):
+    def _getCarver(self, pageByte, rootpage=None):
         '''
-        Work in progress
-        :rtype: list
+        Returns the FreeblockCarver for leaf pages of type pageByte of the
+        table or index with root page rootpage, it checks the records against
+        the signature of that table. Without a root page or a signature for
+        it nothing is carved.
         '''
-
-        fs_celldata = list()
-        #fs_record, payloadlen = self._parseCell(data, offset, cellformat)
-        cellheader, payloadheaderlen, dataoffset, payloadlen, recordnum, payloadsizeincell, overflowpageoffset,overflowpagenum = self._parseLeafTableCellHeader(data, offset, freespace=True)
-        payload = data[dataoffset:]
-        if (overflowpagenum > 0) and (overflowpagenum is not None):
-            payload += self._getoverflowdata(overflowpagenum)
-        data = payload
-        dataoffset = 0
-        for field in cellheader:
-            dataoffset = int(dataoffset)
-            if field[0] == "NULL":
-                fs_celldata.append(recordnum)
-            elif field[0] == "ST_INT8":
-                fs_celldata.append(ord(unpack(">c",data[dataoffset:dataoffset+1])[0]))
-                dataoffset+=field[1]
-            elif field[0] == "ST_INT16":
-                fs_celldata.append(unpack(">h",data[dataoffset:dataoffset+2])[0])
-                dataoffset+=field[1]
-            elif field[0] == "ST_INT24":
-                fs_celldata.append("-")
-                dataoffset+=field[1]
-            elif field[0] == "ST_INT32":
-                fs_celldata.append(unpack(">i",data[dataoffset:dataoffset+4])[0])
-                dataoffset+=field[1]
-            elif field[0] == "ST_INT48":
-                fs_celldata.append(unpack(">i",data[dataoffset:dataoffset+6])[0])
-                dataoffset+=field[1]
-                #fs_celldata.append("ST_INT48 - NOT IMPLEMENTED!") # NOT IMPLEMENTED YET!
-                #dataoffset+=field[1]
-            elif field[0] == "ST_INT64":
-                fs_celldata.append(unpack(">q",data[dataoffset:dataoffset+8])[0])
-                dataoffset+=8
-            elif field[0] == "ST_FLOAT":
-                fs_celldata.append(unpack(">d",data[dataoffset:dataoffset+8])[0])
-                dataoffset+=8
-            elif field[0] == "ST_C0":
-                fs_celldata.append("-")
-            elif field[0] == "ST_C1":
-                fs_celldata.append("-")
-            elif field[0] == "ST_BLOB":
-                cell = data[dataoffset:dataoffset+int(field[1])]
-                fs_celldata.append(cell)
-                dataoffset+=field[1]
-            elif field[0] == "ST_TEXT":
-                try:
-                    fs_celldata.append(data[dataoffset:dataoffset+int(field[1])].decode('UTF-8'))
-                except:
-                    try:
-                        fs_celldata.append(str(data[dataoffset:dataoffset+int(field[1])]))
-                    except:
-                        pass
-
-                dataoffset+=field[1]
-            else:
-                pass
-                #print(field[0])
-
-        return fs_celldata, payloadlen
+        try:
+            return self.carvers[(pageByte, rootpage)]
+        except KeyError:
+            pass
+        if self.signatureIndex is None:
+            self.signatureIndex = self._buildSignatureIndex()
+        if rootpage == 1 and pageByte == LEAF_TABLE_BTREE_PAGE:
+            signatures = [SQLITE_MASTER_SIGNATURE]
+        else:
+            candidates = [candidate for candidates in self.signatureIndex.get(pageByte, {}).values() for candidate in candidates]
+            signatures = [masks for candidate, masks in candidates if candidate == rootpage][:1]
+        carver = self.carvers[(pageByte, rootpage)] = FreeblockCarver(self.recordDecoder, signatures, pageByte == LEAF_INDEX_BTREE_PAGE)
+        return carver
 
     def _readPageUnallocated(self, dbpage):
+        start, end = self._getPageUnallocatedExtent(dbpage)
+        return dbpage["page"][start:end]
+
+    def _getPageUnallocatedExtent(self, dbpage):
         if dbpage["pageNr"] == 1 and dbpage["pageHeader"]["pageByte"] != INTERIOR_TABLE_BTREE_PAGE:
             start = 108 + dbpage["pageHeader"]["cellQty"] * 2
         elif dbpage["pageNr"] == 1 and dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
             start = 112 + dbpage["pageHeader"]["cellQty"] * 2
-        elif dbpage["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
+        elif dbpage["pageHeader"]["pageByte"] in (INTERIOR_TABLE_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
             start = 12 + dbpage["pageHeader"]["cellQty"] * 2
         else:
             start = 8 + dbpage["pageHeader"]["cellQty"] * 2
 
-        end = dbpage["pageHeader"]["cellOffset"] - start
-        return dbpage["page"][start:end]
+        #the cell content area starts at cellOffset, 0 means 65536
+        end = dbpage["pageHeader"]["cellOffset"] or 65536
+        end = max(start, min(end, self.source.usableSize))
+        return start, end
 
     def _readPageCellPointer(self, page, pageHeader, pageNr):
-        cellPointer = 0
+        #big endian cell offsets as array('H'), 2 bytes per cell
+        cellPointer = array('H')
         if pageHeader["cellQty"] > 0:
             if pageNr == 1 and pageHeader["pageByte"] != INTERIOR_TABLE_BTREE_PAGE:
                 start = 108
             elif pageNr == 1 and pageHeader["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
                 start = 112
-            elif pageHeader["pageByte"] == INTERIOR_TABLE_BTREE_PAGE:
+            elif pageHeader["pageByte"] in (INTERIOR_TABLE_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
                 start = 12
             else:
                 start = 8
             end = start + (pageHeader["cellQty"] * 2)
-            cellPointer = page[start:end]
+            cellPointer.frombytes(page[start:start + (len(page[start:end]) & ~1)])
+            if sys.byteorder == 'little':
+                cellPointer.byteswap()
         return cellPointer
 
-    def _readPointerMap(self, page):
-        ptrMapLen = 5
-        offset = 0
-        ptrmapdict = dict()
-        counter = 0
-        while offset < (self.dbHeaderDict["pageSize"]- ptrMapLen):
-            hdr = unpack(self._ptrmapfrmt, page[offset:offset+ptrMapLen])
-            if hdr[0] == 0 and hdr[1] == 0:
-                break                       #no more pointers will follow
-            '''
-            0x01 0x00 0x00 0x00 0x00
-                This record relates to a B-tree root page which obviously does not have a parent page, hence the page number being indicated as zero.
-            0x02 0x00 0x00 0x00 0x00
-                This record relates to a free page, which also does not have a parent page.
-            0x03 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
-                This record relates to the first page in an overflow chain. The parent page number is the number of the B-Tree page containing the B-Tree cell to which the overflow chain belongs.
-            0x04 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
-                This record relates to a page that is part of an overflow chain, but not the first page in that chain. The parent page number is the number of the previous page in the overflow chain linked-list.
-            0x05 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
-                This record relates to a page that is part of a table or index B-Tree structure, and is not an overflow page or root page. The parent page number is the number of the page containing the parent tree node in the B-Tree structure.
-            '''
-            counter += 1
-            ptrmapdict = dict(zip(self._ptrmaphdrkeys,list(hdr)))
-            self.ptrMap.append(ptrmapdict)
-            offset += ptrMapLen
+    def _readPointerMap(self):
+        '''
+        Reads all pointer map pages into two arrays indexed by page number:
+        ptrMapTypes holds the entry type, ptrMapParents the parent page.
+        Every pointer map page holds usable size/5 entries of 5 bytes for the
+        pages that follow it.
+        '''
+        pageCount = self.source.pageCount()
+        entries = self.source.usableSize // 5
+        ptrmapfrmt = Struct('>' + self._ptrmapfrmt * entries)
+        self.ptrMapPages = list(range(2, pageCount + 1, entries + 1))
+        self.ptrMapTypes = array('B', bytes(pageCount + 1))
+        self.ptrMapParents = array('I', [0]) * (pageCount + 1)
+        '''
+        0x01 0x00 0x00 0x00 0x00
+            This record relates to a B-tree root page which obviously does not have a parent page, hence the page number being indicated as zero.
+        0x02 0x00 0x00 0x00 0x00
+            This record relates to a free page, which also does not have a parent page.
+        0x03 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
+            This record relates to the first page in an overflow chain. The parent page number is the number of the B-Tree page containing the B-Tree cell to which the overflow chain belongs.
+        0x04 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
+            This record relates to a page that is part of an overflow chain, but not the first page in that chain. The parent page number is the number of the previous page in the overflow chain linked-list.
+        0x05 0xVV 0xVV 0xVV 0xVV (where VV indicates a variable)
+            This record relates to a page that is part of a table or index B-Tree structure, and is not an overflow page or root page. The parent page number is the number of the page containing the parent tree node in the B-Tree structure.
+        '''
+
+        for ptrmappage in self.ptrMapPages:
+            count = min(entries, pageCount - ptrmappage)
+            page = self.source.page(ptrmappage)
+            if count <= 0 or len(page) < ptrmapfrmt.size:
+                break
+            values = ptrmapfrmt.unpack_from(page)
+            first = ptrmappage + 1
+            self.ptrMapTypes[first:first + count] = array('B', values[0:2 * count:2])
+            self.ptrMapParents[first:first + count] = array('I', values[1:2 * count:2])
 
     def _readDBFile(self):
         try:
-            f=open(self.opt['sqlitedb'],"rb")
-            self.data = f.read()
+            self.source = DBPageSource(self.opt['sqlitedb'])
         except:
             print ("File not Found")
-            self.data = None
+            self.source = None
+
+    def _readWALFile(self):
+        try:
+            wal = WALFile(self.opt['wal'])
+        except (OSError, ValueError) as e:
+            print("WAL file not used: %s" %str(e))
+            return
+        pageSize = unpack('>H', self.source.read(16, 2))[0] if self.source.size >= 21 else 0
+        if pageSize == 1:
+            pageSize = 65536
+        if pageSize != wal.pageSize:
+            print("WAL file not used: page size %i does not match the database" %wal.pageSize)
+            wal.close()
+            return
+        #the overlay reads the db header through pages, page 1 is often not in the WAL
+        self.source.setPageSize(pageSize, self.source.read(20, 1)[0])
+        self.wal = wal
+        self.source = WALOverlaySource(self.source, wal)
+
+    def _readJournalFile(self):
+        try:
+            journal = JournalFile(self.opt['journal'], self.source.pageSize)
+        except (OSError, ValueError) as e:
+            print("Journal file not used: %s" %str(e))
+            return
+        if journal.pageSize != self.source.pageSize:
+            print("Journal file not used: page size %i does not match the database" %journal.pageSize)
+            journal.close()
+            return
+        self.journal = journal
 
     def _parsePageHeader(self, page, pageNr):
-        pageDict = dict ()
         if pageNr == 1:
             pageHeader = unpack(self._lbtreefrmt, page[100:108])
         else:
             pageHeader = unpack(self._lbtreefrmt, page[:8])
         pageByte, fbOffset, cellQty, cellOffset, freebytes = pageHeader
 
-        if pageByte == INTERIOR_TABLE_BTREE_PAGE:
+        if pageByte in (INTERIOR_TABLE_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
            if pageNr == 1:
                rmpointer = unpack(self._ibtreefrmt, page[108:112])[0]
            else:
@@ -596,35 +3038,18 @@ class SQLiteDBParser:
         else:
             rmpointer = None
 
-        pageHeader = list(pageHeader)
-        pageHeader.append(rmpointer)
-        pageDict = dict(zip(self._btreehdrkeys, pageHeader))
-        return pageDict
+        return PageHeader(pageByte, fbOffset, cellQty, cellOffset, freebytes, rmpointer)
 
     def _parseDBHeader(self):
         self.dbHeaderDict = dict(zip(self._dbhdrkeys,list(self._unpackDBHeader())))
+        self.recordDecoder = RecordDecoder(TEXT_ENCODINGS.get(self.dbHeaderDict.get("database_text_encoding"), 'utf-8'))
 
     def _parseDBSchema(self, pageNum):
-        # based on https://github.com/n0fate/walitean
-        TABLE = b'table'
-        CREATETABLE = b'CREATE TABLE'
-        buf = b''
-        dbschema = {}
         columnsdic = {}
-        tables = []
-        dbtable = {}
-        page = self.dbPages[int(pageNum)]
-        tables = page["celldata"]
-        if self.hasLeafPages(page) == True:
-            for leafpage in page["leafpages"]:
-                if leafpage < self.dbHeaderDict["in_header_database_size"]:
-                    if self.hasCelldata(self.dbPages[leafpage]):
-                        tables += self.dbPages[leafpage]["celldata"]
+        tables = [row for pageNr, cellOffset, rowid, row in TableBTreeCursor(self, int(pageNum))]
 
         for table in tables:
-            columnlst = []
             dbtable = {}
-            strcolumns = None
             if not table[0] in sql_type:
                 continue
             dbtable['type'] = table[0]
@@ -633,55 +3058,64 @@ class SQLiteDBParser:
 
 
             if dbtable['type'] == 'table':
-                strcolumns = self._findSQLCmd(table[4])
-                if strcolumns == "ERROR":
+                if not isinstance(table[4], str):
                     continue
-                l = strcolumns.find('UNIQUE (')
-                r = strcolumns.find(')')
-                if l > 0 and r > l:
-                    strcolumns = strcolumns[:l-1] + strcolumns[r+1:]
-
-#                if strcolumns[0] == ' ':    # remove byte if first byte is space
-#                    strcolumns = strcolumns[1:]
-                strcolumns = strcolumns.lstrip(' ')
-                strcolumns = strcolumns.rstrip(' ')
-                strcolumns = strcolumns.replace(' REFERENCES','')
-                for column in strcolumns.split(','):
-                    column = column.lstrip(' ')
-                    column = column.replace('"','')
-                    if column == '':
-                        continue
-                    if column[0] == ' ':
-                        column = column[1:]
-                    if str(column).startswith('PRIMARY') or str(column).startswith('UNIQUE'):
-                        continue
-                    try:
-                        column.index('UNIQUE (')
-                        continue
-                    except ValueError:
-                        pass
-                    columninfo = []
-                    columnname = ""
-                    columntype = ""
-                    if len(column.split(' ')) >= 2:
-                        columnname = column.split(' ')[0]
-                        columntype = column.split(' ')[1]
-                        columninfo.append(columnname)
-                        columninfo.append(columntype)
-                    if columninfo.__len__() != 0:
-                        columnlst.append(columninfo)
-
-                if len(columnlst):
-                    dbtable['schema'] = columnlst
-                else:
-                    dbtable['schema'] = []
+                create = parseCreateTable(table[4])
+                columns = [list(column) for column in create.columns]
+                if create.withoutRowid:
+                    #the records of a WITHOUT ROWID table start with the primary key columns
+                    keycolumns = [column for name in create.primaryKey for column in columns if column[0].upper() == name.upper()]
+                    columns = keycolumns + [column for column in columns if column not in keycolumns]
+                dbtable['schema'] = columns
+                dbtable['rowidAlias'] = create.rowidAlias
+                dbtable['withoutRowid'] = create.withoutRowid
+                dbtable['primaryKey'] = create.primaryKey
+                dbtable['uniqueKeys'] = create.uniqueKeys
+            elif dbtable['type'] == 'index':
+                dbtable['table'] = table[2]
+                dbtable['sql'] = table[4]
 
             columnsdic[dbtable['name']] = dbtable
+
+        #the columns of an index depend on the table, which may follow it
+        for dbtable in columnsdic.values():
+            if dbtable['type'] == 'index':
+                dbtable['schema'] = self._getIndexSchema(dbtable, columnsdic.get(dbtable['table']))
         return columnsdic
 
+    def _getIndexSchema(self, dbindex, dbtable):
+        '''
+        Columns of the records of an index b-tree: the indexed columns followed
+        by the rowid or, for WITHOUT ROWID tables, by the primary key columns
+        that are not indexed. Automatic indexes are looked up in the PRIMARY
+        KEY and UNIQUE constraints of the table.
+        '''
+        if dbtable is None or 'schema' not in dbtable:
+            return []
+        names = list()
+        if isinstance(dbindex.get('sql'), str):
+            names = parseCreateIndex(dbindex['sql'])
+        elif dbindex['name'].startswith('sqlite_autoindex_'):
+            #sqlite_autoindex_<table>_<n> is the n-th constraint with an index
+            try:
+                names = dbtable['uniqueKeys'][int(dbindex['name'].rsplit('_', 1)[1]) - 1]
+            except (ValueError, IndexError):
+                return []
+        if not names:
+            return []
+
+        types = dict([(column[0].upper(), column[1]) for column in dbtable['schema']])
+        schema = [[name, types.get(name.upper(), '')] for name in names]
+        if dbtable['withoutRowid']:
+            indexed = set([name.upper() for name in names])
+            schema.extend([[name, types.get(name.upper(), '')] for name in dbtable['primaryKey'] if name.upper() not in indexed])
+        else:
+            schema.append(['rowid', 'INTEGER'])
+        return schema
+
     def _unpackDBHeader(self):
         try:
-            dbheader = unpack(self._dbhdrfrmt, self.data[:100])
+            dbheader = unpack(self._dbhdrfrmt, self.source.read(0, 100))
         except:
             dbheader = "No valid SQLite database"
         return dbheader
@@ -691,11 +3125,7 @@ class SQLiteDBParser:
         return ''.join([ch for ch in chunk if ord(ch) > 31 and ord(ch) < 126 or ord(ch) ==9])
 
     def _remove_non_printable(self, chunk):
-        ret = ""
-        for ch in chunk:
-            if ch > 31 and ch < 126 or ch == 9:
-                ret = ret + chr(ch)
-        return ret.strip()
+        return bytes(chunk).translate(None, NON_PRINTABLE).decode('ascii').strip()
 
     def _makeTmpDir(self):
         try:
@@ -704,32 +3134,36 @@ class SQLiteDBParser:
             tmpdir = ""
         return tmpdir
 
-    def _writeBinary (self,name, data):
+    def _writeBinary (self, row, data):
 
         try:
-            ext = self._filetype(data[0:12])
-            destname = self.tmpdir + "/" + str(name) + "." + ext
-            with open(destname, 'wb') as output_file:
-                output_file.write(data)
-            output_file.close()
+            destname = self.blobWriter.write(row, data)
         except:
             destname = ""
 
         return destname
 
+    def finish(self):
+        '''
+        Stores the decoded pages in the cache. Waits until the BLOBs of -B are
+        written, prints the directory and the number of BLOBs and unique files.
+        '''
+        if self.cache is not None:
+            if self.analyzed:
+                try:
+                    self.cache.save(self)
+                except sqlite3.Error as e:
+                    print("Cache not saved: %s" %str(e))
+            self.cache.close()
+        if self.blobWriter is None:
+            return
+        self.rowWriter.flush()
+        self.blobWriter.close()
+        print("BLOBs: %i written to %s as %i files, %i errors" %(len(self.blobWriter.manifest), self.tmpdir,
+              len(self.blobWriter.files), self.blobWriter.errors))
+
     def _filetype(self, header):
-        if ((header[:4] == JPGHEADER) and (header[6:] != JPGIDENT)) or ((header[:4] == EXIFHEADER) and (header[6:] != EXIFIDENT)):
-            return 'jpg'
-        elif (header[0:MA4HEADERLEN] == MA4HEADER):
-            return 'ma4'
-        elif (header[0:MOVHEADERLEN] == MOVHEADER):
-            return 'mov'
-        elif (header[0:BPLISTHEADERLEN] == BPLISTHEADER):
-            return 'bplist'
-        elif (header[0:MP3HEADERLEN] == MP3HEADER):
-            return 'mp3'
-        else:
-            return 'bin'
+        return self.signatureMatcher.kind(bytes(header)) or 'bin'
 
     def printDBheader(self):
 
@@ -781,6 +3215,8 @@ class SQLiteDBParser:
         print("sqlite_version_number:".ljust(35, ' ') + "%8s (%s)" %(str(self.dbHeaderDict["sqlite_version_number"]),str(self.dbHeaderDict["sqlite_version_number"]).replace("00","0").replace("0",".")))
 
         if self.opt['debug']:
+            self._analyzeDBPages()
+            self._collectOverflowPages()
             print('\n##################################################################################\n')
             #print("%4i %10s %45s %8s %23s %5s" %(i,str(pageNr), str(tbl_name), str(tbl_type), str(pageType), str(col_count)))
             for page in self.dbPages:
@@ -813,43 +3249,40 @@ class SQLiteDBParser:
                 if self.dbPages[page]["pageHeader"]["cellQty"] > 0 and self.dbPages[page]['pageType'] != "Overflow Page":
                     print("\n\t{0:23s} {1:>5s}".format("Cell pointer array:", "")) #str(self.dbPages[page]["pageHeader"]["cellQty"])))
 
-                    for cp in range(0,(self.dbPages[page]["pageHeader"]["cellQty"]*2),2):
-                        start = cp
-                        end = cp + 2
-                        cellp = unpack('>H', self.dbPages[page]["cellPointer"][start:end])[0]
-                        cellstart = self.dbPages[page]['pageOffset'] + cellp
+                    for cellp in self.dbPages[page]["cellPointer"]:
+                        pagedata = self.dbPages[page]["page"]
                         print("\t\t{0:23s} {1:>5s}".format("Cell pointer:", str(cellp)))
+                        if cellp + 4 > len(pagedata):
+                            print("\t\t\tCell pointer outside of page")
+                            continue
 
                         if (self.dbPages[page]["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE):
-                            cellheader, payloadheaderlen, dataoffset, payloadlen, recordnum, payloadsizeincell, overflowpageoffset,overflowpagenum = self._parseLeafTableCellHeader(self.data, cellstart, freespace=False)
+                            cellheader, payloadheaderlen, dataoffset, payloadlen, recordnum, payloadsizeincell, overflowpageoffset,overflowpagenum = self._parseLeafTableCellHeader(pagedata, cellp, freespace=False)
                             print("\t\t\t{0:15s} {1:>5s}".format("Payload length:", str(payloadlen)))
                             print("\t\t\t{0:15s} {1:>5s}".format("Row ID:", str(recordnum)))
                             print("\t\t\tPayload")
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Payload header len:", str(payloadheaderlen)))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Data offset:", str(dataoffset)))
-                            for cell in cellheader:
-                                #print("\t\t\t\t{0:22s} {1:>8s} {2:12s} {3:>8s}".format("Cell type:", str(cell[0]), "Cell size:", str(cell[1])))
-                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", str(cell[0]), str(cell[1])))
+                            for serialtype in cellheader:
+                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", *map(str, serialTypeInfo(serialtype))))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Overflow page offset:", str(overflowpageoffset)))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Overflow page num:", str(overflowpagenum)))
                         elif (self.dbPages[page]["pageHeader"]["pageByte"] == LEAF_INDEX_BTREE_PAGE):
-                            cellheader,payloadheaderlen,dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseLeafIndexCellHeader(self.data, self.dbPages[page]['pageOffset'])
+                            cellheader,payloadheaderlen,dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseLeafIndexCellHeader(pagedata, cellp)
                             print("\t\t\t{0:15s} {1:>5s}".format("Payload length:", str(payloadlen)))
                             print("\t\t\tPayload")
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Payload header len:", str(payloadheaderlen)))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Data offset:", str(dataoffset)))
-                            for cell in cellheader:
-                                #print("\t\t\t\t{0:22s} {1:>8s} {2:12s} {3:>8s}".format("Cell type:", str(cell[0]), "Cell size:", str(cell[1])))
-                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", str(cell[0]), str(cell[1])))
+                            for serialtype in cellheader:
+                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", *map(str, serialTypeInfo(serialtype))))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Overflow page offset:", str(overflowpageoffset)))
                             print("\t\t\t\t{0:22s} {1:>8s}".format("Overflow page num:", str(overflowpagenum)))
                         elif (self.dbPages[page]["pageHeader"]["pageByte"] == INTERIOR_TABLE_BTREE_PAGE):
-                            cellheader, dataoffset, pagechildnum, recordnum = self._parseInteriorTableCellHeader(self.data,cellstart)
+                            cellheader, dataoffset, pagechildnum, recordnum = self._parseInteriorTableCellHeader(pagedata, cellp)
                             print("\t\t\t{0:15s} {1:>8s}".format("Left child:", str(pagechildnum)))
                             print("\t\t\t{0:15s} {1:>8s}".format("Row ID:", str(recordnum)))
-                            for cell in cellheader:
-                                #print("\t\t\t\t{0:22s} {1:>8s} {2:12s} {3:>8s}".format("Cell type:", str(cell[0]), "Cell size:", str(cell[1])))
-                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", str(cell[0]), str(cell[1])))
+                            for serialtype in cellheader:
+                                print("\t\t\t\t{0:22s} {1:>8s} ({2:s})".format("Cell type:", *map(str, serialTypeInfo(serialtype))))
 
 
 
@@ -861,16 +3294,31 @@ class SQLiteDBParser:
                     print("Deleted pages: %s" %(self.dbPages[page]['deletedpages']))
                 print('\n++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++\n')
 
+    def printWALInfo(self):
+        wal = self.wal
+        print("WAL file:".ljust(35, ' ') + str(wal.filename))
+        print("WAL format version:".ljust(35, ' ') + "%8s" %str(wal.version))
+        print("WAL page size:".ljust(35, ' ') + "%8s" %str(wal.pageSize))
+        print("WAL checkpoint sequence:".ljust(35, ' ') + "%8s" %str(wal.checkpoint))
+        print("WAL salts:".ljust(35, ' ') + "%08x %08x" %(wal.salt1, wal.salt2))
+        print("WAL frames:".ljust(35, ' ') + "%8s" %str(len(wal.frames)))
+        print("WAL valid frames:".ljust(35, ' ') + "%8s" %str(len([frame for frame in wal.frames if frame.valid])))
+        print("WAL commits:".ljust(35, ' ') + "%8s" %str(len(wal.commits())))
+        print("WAL last commit frame:".ljust(35, ' ') + "%8s" %str(wal.lastCommit))
+        print("WAL pages:".ljust(35, ' ') + "%8s" %str(len(wal.pageFrames)))
+        if self.opt['debug'] == True:
+            print("%8s %8s %8s %17s %5s" %("Frame", "Page", "Commit", "Salts", "Valid"))
+            for frame in wal.frames:
+                print("%8i %8i %8i %08x %08x %5s" %(frame.frameNr, frame.pageNr, frame.commit, frame.salt1, frame.salt2, str(frame.valid)))
+
     def printPtrMap(self):
 
-        if self.ptrMap.__len__() > 0:
+        if self.hasPtrMap():
             print("Database has a pointer map...")
-            pos = 0
-            for ptrmap in self.ptrMap:
-                idx = ptrmap['pageNr']
-                rp = ptrmap['pageType']
-                print("idx: %s\tpage: %s\troot page: %s" %(str(pos),str(pos+3),str(rp)))
-                pos += 1
+            for pageNr in range(len(self.ptrMapTypes)):
+                if self.ptrMapTypes[pageNr] == 0:
+                    continue
+                print("page: %s\ttype: %s\tparent page: %s" %(str(pageNr), PTRMAP_TYPES.get(self.ptrMapTypes[pageNr], str(self.ptrMapTypes[pageNr])), str(self.ptrMapParents[pageNr])))
 
     def printDBSchema(self):
         print("Parsed database schema...")
@@ -880,15 +3328,18 @@ class SQLiteDBParser:
             print("(%i) Table: %s" %(i,str(dbtable)))
             print("\tTable name: %s" %str(self.dbSchema[dbtable]['name']))
             print("\tRoot page: %s" %str(self.dbSchema[dbtable]['rootpage']))
-            if self.dbSchema[dbtable]['type']== 'table':
+            if self.dbSchema[dbtable]['type'] in ('table', 'index'):
                 print("\tSchema:")
                 for key, value in self.dbSchema[dbtable]['schema']:
                     print("\t\t %s:\t%s" %(str(key),str(value)))
 
     def printDBData(self):
 
+        self._analyzeDBPages()
+        self._collectOverflowPages()
+
         for ipage in self.dbPages:
-            if ipage == 1 or self.dbPages[ipage]['pageType'] == "Overflow Page":
+            if ipage == 1 or self.dbPages[ipage]['pageType'] in ("Overflow Page", "pointer map"):
                 continue
 
             self.printTable(number=ipage)
@@ -901,6 +3352,7 @@ class SQLiteDBParser:
 
         if name == None and number == None:
             return
+        self._analyzeDBPages()
         if name is not None:
             number = self._lookUpTable(name)
         if number is not None:
@@ -911,234 +3363,259 @@ class SQLiteDBParser:
 
         if page is None:
             return
+        writer = self.rowWriter
         if self.isRootPage(page) == True:
             try:
-                tblname, colheader = page["schema"].popitem()
+                tblname, colheader = next(iter(page["schema"].items()))
                 schema = self.dbSchema[tblname]['schema']
             except:
                 tblname = "???"
                 colheader = "???"
-            print("PageNr: %s\tTable name: %s" %(str(page["pageNr"]),str(tblname)))
+            writer.write("PageNr: %s\tTable name: %s" %(str(page["pageNr"]),str(tblname)))
             hdr = "Page;Type;"
             hdr += ";".join(map(str,colheader))
             hdr += ";MD5 hash"
-            print(hdr)
+            writer.write(hdr)
+
+        if self.opt['jobs'] > 1:
+            self._readDBPagesInPool(self._tablePages(page), self.opt['jobs'])
+        for record in self._iterTableRecords(page):
+            writer.write(self._formatRecord(record, tblname, schema))
+        writer.flush()
+
+    def exportDBData(self, exporter):
+        '''
+        Exports the records of every table to its own file.
+        '''
+        self._analyzeDBPages()
+        if self.opt['jobs'] > 1:
+            #one pool for the pages of all tables
+            self._readDBPagesInPool(range(1, self.source.pageCount() + 1), self.opt['jobs'])
+        for table in self.dbSchema:
+            if self.dbSchema[table]['type'] == 'table':
+                self.exportTable(exporter, name=self.dbSchema[table]['name'])
+
+    def exportTable(self, exporter, name=None, number=None):
+        '''
+        Exports the cell records of a table (C, FC, DC and DFC) through
+        exporter. The raw freeblock and unallocated areas are not exported.
+        '''
+        page = None
+        tblname = None
+
+        self._analyzeDBPages()
+        if name is not None:
+            number = self._lookUpTable(name)
+        try:
+            page = self.dbPages[int(number)]
+        except:
+            page = None
+        if page is None or self.isRootPage(page) == False:
+            return
+        tblname = next(iter(page["schema"]))
+        if self.opt['jobs'] > 1:
+            self._readDBPagesInPool(self._tablePages(page), self.opt['jobs'])
+
+        exporter.open(tblname, self.dbSchema[tblname]['schema'])
+        try:
+            for record in self._iterTableRecords(page):
+                if record.kind not in RAW_KINDS:
+                    exporter.write(record)
+        finally:
+            exporter.close()
+
+    def printJournal(self):
+        '''
+        Prints the records of the b-tree page images in the rollback journal.
+        Images equal to the page in the database file or to an image already
+        printed are skipped, so only pages that differ are decoded.
+        '''
+        writer = self.rowWriter
+        seen = set()
+        pageCount = self.source.pageCount()
+
+        for jrecord in self.journal.records():
+            if jrecord.pageNr < 1:
+                continue
+            if jrecord.pageNr <= pageCount and jrecord.page == self.source.page(jrecord.pageNr):
+                continue
+            digest = hashlib.md5(jrecord.page).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            self._printPageImage(jrecord.pageNr, jrecord.page, "J", "PageNr: %s\tJournal offset: %s\tChecksum valid: %s"
+                                 %(str(jrecord.pageNr), str(jrecord.offset), str(jrecord.valid)))
+        writer.flush()
+
+    def printWALHistory(self):
+        '''
+        Prints the records of the older page images in the WAL frames, these
+        are the versions of a page before its last commit and the frames not
+        committed or of an older generation of the log. Images equal to the
+        current page or to an image already printed are skipped.
+        '''
+        wal = self.wal
+        seen = set()
+        pageCount = self.source.pageCount()
+
+        for pageNr in sorted(wal.pageFrames):
+            if pageNr < 1:
+                continue
+            current = self.source.page(pageNr) if pageNr <= pageCount else None
+            for frame in wal.versions(pageNr):
+                image = wal.frameData(frame)
+                if image == current:
+                    continue
+                digest = hashlib.md5(image).digest()
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                self._printPageImage(pageNr, image, "W", "PageNr: %s\tWAL frame: %s\tCommit: %s\tValid: %s"
+                                     %(str(pageNr), str(frame.frameNr), str(frame.commit), str(frame.valid)))
+        self.rowWriter.flush()
+
+    def _printPageImage(self, pageNr, image, prefix, title):
+        #records of a b-tree page image that is not the current version of the page
+        writer = self.rowWriter
+        dbpage = self._readDBPage(pageNr, image)
+        pageByte = dbpage["pageHeader"]["pageByte"]
+        if pageByte not in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE, INTERIOR_TABLE_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
+            return
+        rows = ()
+        if pageByte == LEAF_TABLE_BTREE_PAGE:
+            rows = list(TableBTreeCursor(self, pageNr).leafRows(pageNr, dbpage=dbpage))
+        elif pageByte == LEAF_INDEX_BTREE_PAGE:
+            rows = list(IndexBTreeCursor(self, pageNr).pageRows(pageNr, dbpage=dbpage))
+
+        tblname = "???"
+        colheader = "???"
+        schema = {}
+        alias = None
+        tblinfo = self._getSchemaForRootPage(pageNr)
+        if not tblinfo and rows:
+            for rootpage in self._findMatchingSchema(dbpage):
+                tblinfo = self._getSchemaForRootPage(rootpage)
+                break
+        if tblinfo:
+            tblname, colheader = next(iter(tblinfo.items()))
+            schema = self.dbSchema[tblname].get('schema', {})
+            alias = self.dbSchema[tblname].get('rowidAlias')
+
+        writer.write(title + "\tTable name: %s" %str(tblname))
+        writer.write("Page;Type;" + ";".join(map(str,colheader)) + ";MD5 hash")
+        for record in self._iterPageRecords(dbpage, prefix, rows, alias):
+            writer.write(self._formatRecord(record, tblname, schema))
 
+    def _iterTableRecords(self, page):
+        '''
+        Yields the RowRecords of a table page in output order: the page itself,
+        its leaf pages and, with -D, the deleted pages assigned to it.
+        '''
+        alias = self._getRowidAlias(page)
         #if the page has leafpages, the page cells contain only the pointer to the leafpages
-        if self.hasCelldata(page) == True:
-            rownum = 0
-            for row in page["celldata"]:
-                rownum += 1
-                rowdata = str(page["pageNr"]) + ";C"
-                md5 = ''
-                i=0
-                for cell in row:
-                    fname = ''
-                    try:
-                        if (schema[i][1] == "BLOB"):
-                            if (self.opt['bin2out']):
-                                rowdata += ";'" + str(cell) + "'"
-                            else:
-                                rowdata += ";"
-                            if (self.opt['bin2file']):
-                                fname = self._writeBinary(tblname+"_"+str(page["pageNr"])+"_"+str(rownum)+"_"+str(i), cell)
-                                if (fname != "") and not self.opt['bin2out']:
-                                    rowdata += "'" + fname + "'"
-                        else:
-                            rowdata += ";'" + str(cell) + "'"
-                    except:
-                        rowdata += ";'" + str(cell) + "'"
-                    i+=1
-                md5 = hashlib.md5()
-                rd = ''.join(str(v) for v in row)
-                md5.update(rd.encode('utf-8'))
-                print(rowdata + ";" +str(md5.hexdigest()))
-        if self.opt['freespace']:
-            for freespace in page["freespace"]:
-                if self.opt['debug'] == True:
-                    if self.opt['verbose'] == True:
-                        print(str(page["pageNr"]) + ";F;'';" + "'" + freespace + "'")
-                    else:
-                        print(str(page["pageNr"]) + ";F;'';" + "'" + self._remove_non_printable(freespace) + "'")
+        if page["pageHeader"]["pageByte"] == INTERIOR_INDEX_BTREE_PAGE:
+            cursor = IndexBTreeCursor(self, page["pageNr"])
+            for pageNr in cursor.pages():
+                for record in self._iterPageRecords(self.dbPages[pageNr], "", cursor.pageRows(pageNr)):
+                    yield record
+        elif self.hasLeafPages(page) == True:
+            for record in self._iterPageRecords(page, "", ()):
+                yield record
+            cursor = TableBTreeCursor(self, page["pageNr"])
+            for leafpage in cursor.leafPages():
+                for record in self._iterPageRecords(self.dbPages[leafpage], "", cursor.leafRows(leafpage), alias):
+                    yield record
+        else:
+            for record in self._iterPageRecords(page, "", self._iterPageRows(page), alias):
+                yield record
 
-                for element in page["fs_celldata"]:
+        if self.opt['deleted'] and self.hasDeleted(page) == True:
+            for deletedpage in page["deletedpages"]:
+                dbpage = self.dbPages[deletedpage]
+                for record in self._iterPageRecords(dbpage, "D", self._iterPageRows(dbpage), alias):
+                    yield record
+
+    def _getRowidAlias(self, dbpage):
+        #column of the INTEGER PRIMARY KEY of the table the page belongs to, the
+        #record stores NULL there and the value is the rowid
+        pageNr = dbpage["pageNr"]
+        for depth in range(TableBTreeCursor.MAX_DEPTH):
+            page = self.dbPages[pageNr]
+            if page.isLoaded("schema"):
+                return self.dbSchema[next(iter(page["schema"]))].get('rowidAlias')
+            pageNr = self._findLPageinRPage(pageNr)
+            if pageNr == -1:
+                return None
+        return None
+
+    def _iterPageRows(self, dbpage):
+        #(pageNr, cell offset, rowid, row) of the cells of a single page
+        if dbpage["pageHeader"]["pageByte"] == LEAF_TABLE_BTREE_PAGE:
+            return TableBTreeCursor(self, dbpage["pageNr"]).leafRows(dbpage["pageNr"])
+        if dbpage["pageHeader"]["pageByte"] in (LEAF_INDEX_BTREE_PAGE, INTERIOR_INDEX_BTREE_PAGE):
+            return IndexBTreeCursor(self, dbpage["pageNr"]).pageRows(dbpage["pageNr"])
+        return ((dbpage["pageNr"], None, None, row) for row in dbpage["celldata"])
+
+    def _iterPageRecords(self, dbpage, prefix, rows, alias=None):
+        '''
+        Yields the RowRecords of one page: its cells, with -F the records
+        carved from freeblocks and with -U the unallocated area. prefix is "D"
+        for deleted pages. alias is the column that holds the rowid.
+        '''
+        pageNr = dbpage["pageNr"]
+        rownum = 0
+        for rowpage, cellOffset, rowid, row in rows:
+            rownum += 1
+            if alias is not None and rowid is not None and alias < len(row) and row[alias] is None:
+                #rows decoded by the page workers are shared, fill in a copy
+                row = list(row)
+                row[alias] = rowid
+            yield RowRecord(pageNr, prefix + "C", rownum, cellOffset, rowid, row)
+
+        if self.opt['freespace'] and self.hasFreespace(dbpage) == True:
+            for (fbOffset, size), freespace, records in zip(dbpage["fs_offsets"], dbpage["freespace"], dbpage["fs_celldata"]):
+                if self.opt['debug'] == True:
+                    yield RowRecord(pageNr, prefix + "F", None, fbOffset, None, (freespace,))
+                for offset, rowid, row in records:
                     rownum += 1
-                    rowdata = str(page["pageNr"]) + ";FC"
-                    i=0
-                    for cell in row:
-                        rowdata += ";"
-                        try:
-                            if (schema[i][1] == "BLOB"):
-                                if (self.opt['bin2out']):
-                                    rowdata += "'" + str(cell) + "'"
-                                #else:
-                                #    rowdata += ";"
-                                if (self.opt['bin2file']):
-                                    fname = self._writeBinary(tblname+"_"+str(page["pageNr"])+"_"+str(rownum)+"_"+str(i), cell)
-                                    if (fname != "") and not self.opt['bin2out']:
-                                        rowdata += "'" + fname + "'"
-                            else:
-                                rowdata += "'" + str(cell) + "'"
-                        except:
-                            rowdata += "'" + str(cell) + "'"
-                        i+=1
-                    md5 = hashlib.md5()
-                    rd = ''.join(str(v) for v in row)
-                    md5.update(rd.encode('utf-8'))
-                    print(rowdata + ";" +str(md5.hexdigest()))
-        if self.opt['unallocated']:
+                    if alias is not None and rowid is not None and alias < len(row) and row[alias] is None:
+                        row = list(row)
+                        row[alias] = rowid
+                    yield RowRecord(pageNr, prefix + "FC", rownum, fbOffset + offset, rowid, row)
+
+        if self.opt['unallocated'] and self.hasUnallocated(dbpage) == True:
+            start, end = self._getPageUnallocatedExtent(dbpage)
+            yield RowRecord(pageNr, prefix + "U", None, start, None, (dbpage["unallocated"],))
+
+    def _formatRecord(self, record, tblname, schema):
+        if record.kind in RAW_KINDS:
             if self.opt['verbose'] == True:
-                print(str(page["pageNr"]) + ";U;'';" + "'" + page["unallocated"] + "'")
+                data = str(bytes(record.values[0]))
             else:
-                data = self._remove_non_printable(page["unallocated"])
-                if data != "":
-                    print(str(page["pageNr"]) + ";U;'';" + "'" + data + "'")
-
-        if self.hasLeafPages(page) == True:
-            for leafpage in page["leafpages"]:
-                if self.hasCelldata(self.dbPages[leafpage]) == True:
-                    rownum = 0
-                    for row in self.dbPages[leafpage]["celldata"]:
-                        rownum += 1
-                        rowdata = str(leafpage) + ";C"
-                        i=0
-                        for cell in row:
-                            rowdata += ";"
-                            try:
-                                if (schema[i][1] == "BLOB"):
-                                    if (self.opt['bin2out']):
-                                        rowdata += "'" + str(cell) + "'"
-                                    #else:
-                                    #    rowdata += ";"
-                                    if (self.opt['bin2file']):
-                                        fname = self._writeBinary(tblname+"_"+str(leafpage)+"_"+str(rownum)+"_"+str(i), cell)
-                                        if (fname != "") and not self.opt['bin2out']:
-                                            rowdata += "'" + fname + "'"
-                                else:
-                                    rowdata += "'" + str(cell) + "'"
-                            except:
-                                rowdata += "'" + str(cell) + "'"
-                            i+=1
-                        md5 = hashlib.md5()
-                        rd = ''.join(str(v) for v in row)
-                        md5.update(rd.encode('utf-8'))
-                        print(rowdata + ";" +str(md5.hexdigest()))
-                if self.opt['freespace'] and self.hasFreespace(self.dbPages[leafpage]) == True:
-                    rownum = 0
-
-                    for freespace in self.dbPages[leafpage]["freespace"]:
-                        if self.opt['debug'] == True:
-                            if self.opt['verbose'] == True:
-                                print(str(leafpage) + ";F;'';" + "'" + str(freespace) + "'")
-                            else:
-                                print(str(leafpage) + ";F;'';" + "'" + self._remove_non_printable(freespace) + "'")
-
-                        for element in self.dbPages[leafpage]["fs_celldata"]:
-                            rownum += 1
-                            rowdata = str(leafpage) + ";FC"
-                            i=0
-                            for cell in element:
-                                rowdata += ";"
-                                try:
-                                    if (schema[i][1] == "BLOB"):
-                                        if (self.opt['bin2out']):
-                                            rowdata += "'" + str(cell) + "'"
-                                        #else:
-                                        #    rowdata += ";"
-                                        if (self.opt['bin2file']):
-                                            fname = self._writeBinary(tblname+"_"+str(leafpage)+"_"+str(rownum)+"_"+str(i), cell)
-                                            if (fname != "") and not self.opt['bin2out']:
-                                                rowdata += "'" + fname + "'"
-                                    else:
-                                        rowdata += "'" + str(cell) + "'"
-                                except:
-                                    rowdata += "'" + str(cell) + "'"
-                                i+=1
-                            md5 = hashlib.md5()
-                            rd = ''.join(str(v) for v in element)
-                            md5.update(rd.encode('utf-8'))
-                            print(rowdata + ";" +str(md5.hexdigest()))
-                if self.opt['unallocated'] and self.hasUnallocated(self.dbPages[leafpage]) == True:
-                    if self.opt['verbose'] == True:
-                        print(str(leafpage) + ";U;'';" + "'" + self.dbPages[leafpage]["unallocated"] + "'")
-                    else:
-                        data = self._remove_non_printable(self.dbPages[leafpage]["unallocated"])
-                        if data != "":
-                            print(str(leafpage) + ";U;'';" + "'" + data + "'")
-
-        if self.opt['deleted'] and self.hasDeleted(page) == True:
-            for deletedpage in page["deletedpages"]:
-                if self.hasCelldata(self.dbPages[deletedpage]) == True:
-                    rownum = 0
-                    for row in self.dbPages[deletedpage]["celldata"]:
-                        rownum += 1
-                        rowdata = str(deletedpage) + ";DC"
-                        i=0
-                        for cell in row:
-                            rowdata += ";"
-                            try:
-                                if (schema[i][1] == "BLOB"):
-                                    if (self.opt['bin2out']):
-                                        rowdata += "'" + str(cell) + "'"
-                                    #else:
-                                    #    rowdata += ";"
-                                    if (self.opt['bin2file']):
-                                        fname = self._writeBinary(tblname+"_"+str(deletedpage)+"_"+str(rownum)+"_"+str(i), cell)
-                                        if (fname != "") and not self.opt['bin2out']:
-                                            rowdata += "'" + fname + "'"
-                                else:
-                                    rowdata += "'" + str(cell) + "'"
-                            except:
-                                rowdata += "'" + str(cell) + "'"
-                            i+=1
-                        md5 = hashlib.md5()
-                        rd = ''.join(str(v) for v in row)
-                        md5.update(rd.encode('utf-8'))
-                        print(rowdata + ";" +str(md5.hexdigest()))
-
-                if self.opt['freespace'] and self.hasFreespace(self.dbPages[deletedpage]) == True:
-
-                    for freespace in self.dbPages[deletedpage]["freespace"]:
-                        if self.opt['debug'] == True:
-
-
-                            if self.opt['verbose'] == True:
-                                print(str(deletedpage) + ";DF;'';" + "'" + freespace + "'")
-                            else:
-                                print(str(deletedpage) + ";DF;'';" + "'" + self._remove_non_printable(freespace) + "'")
-
-                        for element in self.dbPages[deletedpage]["fs_celldata"]:
-                            rownum += 1
-                            rowdata = str(deletedpage) + ";DFC"
-                            i=0
-                            for cell in element:
-                                rowdata += ";"
-                                try:
-                                    if (schema[i][1] == "BLOB"):
-                                        if (self.opt['bin2out']):
-                                            rowdata += "'" + str(cell) + "'"
-                                        #else:
-                                        #    rowdata += ";"
-                                        if (self.opt['bin2file']):
-                                            fname = self._writeBinary(tblname+"_"+str(deletedpage)+"_"+str(rownum)+"_"+str(i), cell)
-                                            if (fname != "") and not self.opt['bin2out']:
-                                                rowdata += "'" + fname + "'"
-                                    else:
-                                        rowdata += "'" + str(cell) + "'"
-                                except:
-                                    rowdata += "'" + str(cell) + "'"
-                                i+=1
-                            md5 = hashlib.md5()
-                            rd = ''.join(str(v) for v in element)
-                            md5.update(rd.encode('utf-8'))
-                            print(rowdata + ";" +str(md5.hexdigest()))
-                if self.opt['unallocated'] and self.hasUnallocated(self.dbPages[deletedpage]) == True:
-                    if self.opt['verbose'] == True:
-                        print(str(deletedpage) + ";DU;'';" + "'" + self.dbPages[deletedpage]["unallocated"] + "'")
-                    else:
-                        data = self._remove_non_printable(self.dbPages[deletedpage]["unallocated"])
-                        if data != "":
-                            print(str(deletedpage) + ";DU;'';" + "'" + data + "'")
+                data = self._remove_non_printable(record.values[0])
+                if data == "" and record.kind.endswith("U"):
+                    return None
+            return str(record.pageNr) + ";" + record.kind + ";'';'" + data + "'"
+
+        values = [str(cell) for cell in record.values]
+        rowdata = [str(record.pageNr), record.kind]
+        rowdata.extend(["'" + value + "'" for value in values])
+        i = 0
+        for column in schema:
+            if i >= len(values):
+                break
+            if column[1] == "BLOB":
+                field = ""
+                if (self.opt['bin2out']):
+                    field = "'" + values[i] + "'"
+                if (self.opt['bin2file']):
+                    fname = self._writeBinary((tblname, record.pageNr, record.kind, record.rownum, column[0]), record.values[i])
+                    if (fname != "") and not self.opt['bin2out']:
+                        field += "'" + fname + "'"
+                rowdata[i + 2] = field
+            i += 1
+        rowdata.append(hashlib.md5(''.join(values).encode('utf-8')).hexdigest())
+        return ";".join(rowdata)
 
     def _lookUpTable(self, tbl_name):
 
@@ -1151,14 +3628,14 @@ class SQLiteDBParser:
 
         i=0
         print("Nr".center(6) + "Page Num".center(10) + "Table Name".center(46) + "Table Type".center(10) + "Page Type".center(25) + "Cols".center(6))
-        for dbtable in sorted(self.dbSchema, key=lambda table: table[2]):
+        for dbtable in sorted(self.dbSchema, key=lambda table: str(self.dbSchema[table]['rootpage']).zfill(10)):
             i+=1
             tbl_name = self.dbSchema[dbtable]['name']
             tbl_type = self.dbSchema[dbtable]['type']
             if tbl_type == "table":
                 tbl_type = "TABLE"
             pageNr = self.dbSchema[dbtable]['rootpage']
-            if pageNr == "-" or pageNr is None or pageNr == '0':
+            if pageNr == "-" or pageNr is None or pageNr == '0' or pageNr == 0:
                 pageNr = ""
                 pageType = ""
             else:
@@ -1172,7 +3649,295 @@ class SQLiteDBParser:
             print("%4i %10s %45s %8s %23s %5s" %(i,str(pageNr), str(tbl_name), str(tbl_type), str(pageType), str(col_count)))
 
     def printDBMap(self):
-        pass
+        '''
+        Prints one line per page: type, cell count, first freeblock, fragmented
+        bytes, size of the unallocated area and number of printable bytes in
+        it, followed by the page count per type. Page cells are not decoded,
+        with numpy the headers of all pages are read in bulk by PageScanner.
+        With -d the printable runs of the unallocated areas are printed too.
+        '''
+        if numpy is not None:
+            scan = PageScanner(self.source).scan()
+            scan = dict([(name, values if name == 'runs' else values.tolist()) for name, values in scan.items()])
+        else:
+            scan = self._scanPages()
+        self._readFreelist()
+        pagetypes = {INTERIOR_INDEX_BTREE_PAGE: "interior index b-tree", INTERIOR_TABLE_BTREE_PAGE: "interior table b-tree",
+                     LEAF_INDEX_BTREE_PAGE: "leaf index b-tree", LEAF_TABLE_BTREE_PAGE: "leaf table b-tree"}
+        freelist = dict([(page, "freelist trunk page") for page in self.freelistTrunkPages])
+        freelist.update([(page, "freelist leaf page") for page in self.freelistLeafPages])
+        runs = dict()
+        if self.opt['debug'] == True:
+            for pageNr, offset, length in scan['runs']:
+                runs.setdefault(pageNr, []).append((offset, length))
+
+        writer = self.rowWriter
+        counts = OrderedDict()
+        writer.write("Page map...")
+        writer.write("%8s  %-22s %6s %9s %5s %11s %9s" %("Page", "Page type", "Cells", "Freeblock", "Frag", "Unallocated", "Printable"))
+        for i in range(len(scan['pageByte'])):
+            pageNr = i + 1
+            if self.isPtrMapPage(pageNr):
+                pagetype = "pointer map"
+            elif pageNr in freelist:
+                pagetype = freelist[pageNr]
+            else:
+                pagetype = pagetypes.get(scan['pageByte'][i], "other")
+            counts[pagetype] = counts.get(pagetype, 0) + 1
+            if scan['isBTree'][i] and pagetype != "pointer map":
+                writer.write("%8i  %-22s %6i %9i %5i %11i %9i" %(pageNr, pagetype, scan['cellQty'][i], scan['fbOffset'][i], scan['freebytes'][i],
+                             scan['unallocatedEnd'][i] - scan['unallocatedStart'][i], scan['printable'][i]))
+            else:
+                writer.write("%8i  %-22s" %(pageNr, pagetype))
+            for offset, length in runs.get(pageNr, ()):
+                writer.write("\t%6i: %s" %(offset, self._remove_non_printable(self.source.page(pageNr)[offset:offset + length])))
+        writer.write("Page types...")
+        for pagetype, count in counts.items():
+            writer.write("%-22s %8i" %(pagetype, count))
+        writer.flush()
+
+    def _scanPages(self):
+        #the PageScanner fields computed page by page, used without numpy
+        scan = dict([(name, []) for name in ('pageByte', 'isBTree', 'cellQty', 'fbOffset', 'freebytes', 'rmpointer',
+                                             'unallocatedStart', 'unallocatedEnd', 'printable', 'runs')])
+        for pageNr in range(1, self.source.pageCount() + 1):
+            page = self.source.page(pageNr)
+            header = self._parsePageHeader(page, pageNr)
+            isBTree = header["pageByte"] in PageScanner.BTREE_PAGE_TYPES
+            start = end = printable = 0
+            if isBTree:
+                start, end = self._getPageUnallocatedExtent({"pageNr": pageNr, "pageHeader": header})
+                for match in PRINTABLE_RUN.finditer(page, start, end):
+                    scan['runs'].append((pageNr, match.start(), match.end() - match.start()))
+                    printable += match.end() - match.start()
+            scan['pageByte'].append(header["pageByte"])
+            scan['isBTree'].append(isBTree)
+            scan['cellQty'].append(header["cellQty"] if isBTree else 0)
+            scan['fbOffset'].append(header["fbOffset"] if isBTree else 0)
+            scan['freebytes'].append(header["freebytes"] if isBTree else 0)
+            scan['rmpointer'].append(header["rmpointer"] or 0)
+            scan['unallocatedStart'].append(start)
+            scan['unallocatedEnd'].append(end)
+            scan['printable'].append(printable)
+        return scan
+
+    def carveDB(self, minRun=4):
+        '''
+        Streams the CarvedHit of file signatures and printable strings in the
+        unallocated area and freeblocks of b-tree pages and in freelist pages,
+        page by page. Cells are not decoded.
+        '''
+        carver = SignatureCarver(self.signatureMatcher, minRun)
+        for pageNr, area, page, start, end in self._freeAreas():
+            for hit in carver.carve(pageNr, area, page, start, end):
+                yield hit
+
+    def _freeAreas(self):
+        #(pageNr, area, page, start, end) of the free areas of all pages
+        self._readFreelist()
+        leaves = set(self.freelistLeafPages)
+        trunks = set(self.freelistTrunkPages)
+        usable = self.source.usableSize
+        for pageNr in range(1, self.source.pageCount() + 1):
+            page = self.source.page(pageNr)
+            if pageNr in leaves:
+                yield pageNr, 'P', page, 0, usable
+            elif pageNr in trunks:
+                #the leaf page numbers are followed by unused bytes
+                leafQty = min(unpack('>I', page[4:8])[0], usable // 4 - 2)
+                yield pageNr, 'P', page, 8 + 4 * leafQty, usable
+            elif not self.isPtrMapPage(pageNr):
+                header = self._parsePageHeader(page, pageNr)
+                if header["pageByte"] not in PageScanner.BTREE_PAGE_TYPES:
+                    continue
+                start, end = self._getPageUnallocatedExtent({"pageNr": pageNr, "pageHeader": header})
+                yield pageNr, 'U', page, start, end
+                for offset, size in self._freeblockExtents(page, header["fbOffset"], end):
+                    yield pageNr, 'F', page, offset + 4, offset + size
+
+    def _freeblockExtents(self, page, fbOffset, start):
+        #(offset, size) of the freeblock chain, freeblocks are in ascending order behind start
+        extents = list()
+        usable = self.source.usableSize
+        while start <= fbOffset <= usable - 4:
+            nextblock, size = unpack('>HH', page[fbOffset:fbOffset + 4])
+            if size < 4 or fbOffset + size > usable:
+                break
+            extents.append((fbOffset, size))
+            if nextblock <= fbOffset:
+                break
+            fbOffset = nextblock
+        return extents
+
+    def printCarved(self):
+        '''
+        Prints the file signatures and printable strings carved from the free
+        areas of all pages, followed by the number of hits per kind. The
+        printable strings are printed with -d.
+        '''
+        writer = self.rowWriter
+        counts = OrderedDict()
+        writer.write("Carved...")
+        writer.write("%8s %6s %6s %4s  %-8s" %("Page", "Offset", "Length", "Area", "Kind"))
+        for hit in self.carveDB():
+            counts[hit.kind] = counts.get(hit.kind, 0) + 1
+            if hit.kind == 'text' and self.opt['debug'] != True:
+                continue
+            line = "%8i %6i %6i %4s  %-8s" %(hit.pageNr, hit.offset, hit.length, hit.area, hit.kind)
+            if hit.kind == 'text':
+                line += " " + self._remove_non_printable(self.source.page(hit.pageNr)[hit.offset:hit.offset + hit.length])
+            writer.write(line)
+        writer.write("Carved kinds...")
+        for kind, count in counts.items():
+            writer.write("%-22s %8i" %(kind, count))
+        writer.flush()
+
+    def printDiff(self, path):
+        '''
+        Compares the database with the manifest of a previous run in path and
+        writes the manifest of this run to it. All pages are hashed in bulk,
+        a page is decoded and carved only if its hash, its role or one of its
+        overflow pages changed, the records of the other pages are the ones
+        in the manifest. Prints the changed pages and the new, changed and
+        deleted rows and newly carved records of the changed pages. Deleted
+        pages are the freelist leaf pages.
+        '''
+        manifest = DiffManifest(path)
+        algorithm, hashes = self._pageHashes()
+        key = repr((DiffManifest.VERSION, algorithm, self._schemaKey()))
+        old = manifest.pages(key)
+        pageCount = len(hashes)
+        changed = set([pageNr for pageNr in range(1, pageCount + 1) if pageNr not in old or old[pageNr][0] != hashes[pageNr - 1]])
+        roles = self._diffPageRoles(old, changed)
+
+        pages = list()
+        replaced = set([pageNr for pageNr in old if pageNr > pageCount])
+        records = list()
+        for pageNr in range(1, pageCount + 1):
+            prefix, table, alias, cursor = roles.get(pageNr, ("", "", None, None))
+            role = prefix + ":" + table if prefix else table
+            previous = old.get(pageNr)
+            if previous is not None and pageNr not in changed and previous[1] == role and changed.isdisjoint(previous[2]):
+                pages.append((pageNr, hashes[pageNr - 1], role, previous[2].tobytes()))
+                continue
+            replaced.add(pageNr)
+            if not table:
+                pages.append((pageNr, hashes[pageNr - 1], role, None))
+                continue
+            dbpage = self.dbPages[pageNr]
+            if isinstance(cursor, IndexBTreeCursor):
+                rows = cursor.pageRows(pageNr)
+            elif isinstance(cursor, TableBTreeCursor):
+                rows = cursor.leafRows(pageNr)
+            else:
+                rows = self._iterPageRows(dbpage)
+            schema = self.dbSchema[table]['schema']
+            for record in self._iterPageRecords(dbpage, prefix, rows, alias):
+                if record.kind not in RAW_KINDS:
+                    line = self._formatRecord(record, table, schema)
+                    records.append((pageNr, table, record.kind, record.rowid, line[line.rfind(";") + 1:], line))
+            overflow = array('I', sorted(self._pageOverflowPages(dbpage)))
+            pages.append((pageNr, hashes[pageNr - 1], role, overflow.tobytes()))
+
+        writer = self.rowWriter
+        if old:
+            self._writeDiff(old, roles, replaced, manifest.records(replaced), records)
+        else:
+            writer.write("No manifest of a previous run with the same schema in %s" %path)
+        writer.write("Pages hashed: %i, decoded: %i, records decoded: %i" %(pageCount, len(replaced), len(records)))
+        writer.flush()
+        manifest.save(key, pages, replaced, records)
+        manifest.close()
+
+    def _pageHashes(self):
+        #(algorithm, hash of every page), 64 bit sums with numpy or CRC-32
+        if numpy is not None:
+            return 'wsum64', PageScanner(self.source).hashes().view(numpy.int64).tolist()
+        return 'crc32', [zlib.crc32(self.source.page(pageNr)) for pageNr in range(1, self.source.pageCount() + 1)]
+
+    def _diffPageRoles(self, old, changed):
+        '''
+        Returns pageNr -> (prefix, table, rowid alias, cursor) for the leaf
+        pages of every table and the freelist leaf pages matched to a table.
+        Only the interior pages are read, a freelist page is matched again
+        only if it changed or was not a deleted page before.
+        '''
+        roles = dict()
+        pageCount = self.source.pageCount()
+        for table in self.dbSchema:
+            rootpage = self.dbSchema[table]['rootpage']
+            if self.dbSchema[table]['type'] != 'table' or not isinstance(rootpage, int) or not 0 < rootpage <= pageCount:
+                continue
+            alias = self.dbSchema[table].get('rowidAlias')
+            pageByte = self.dbPages[rootpage]["pageHeader"]["pageByte"]
+            if pageByte == INTERIOR_INDEX_BTREE_PAGE:
+                cursor = IndexBTreeCursor(self, rootpage)
+                leafpages = cursor.pages()
+            elif pageByte == INTERIOR_TABLE_BTREE_PAGE:
+                cursor = TableBTreeCursor(self, rootpage)
+                leafpages = cursor.leafPages()
+            else:
+                cursor = None
+                leafpages = [rootpage]
+            for pageNr in leafpages:
+                roles[pageNr] = ("", table, alias, cursor)
+
+        self._readFreelist()
+        for pageNr in self.freelistLeafPages:
+            if pageNr in roles:
+                continue
+            previous = old.get(pageNr)
+            if previous is not None and pageNr not in changed and previous[1].startswith("D:"):
+                table = previous[1][2:]
+            else:
+                table = ""
+                dbpage = self.dbPages[pageNr]
+                if dbpage["pageHeader"]["pageByte"] in (LEAF_TABLE_BTREE_PAGE, LEAF_INDEX_BTREE_PAGE) and dbpage["pageHeader"]["cellQty"] > 0:
+                    for rootpage in self._findMatchingSchema(dbpage):
+                        table = next(iter(self.dbPages[rootpage]["schema"]))
+                if table and self.dbSchema[table]['type'] != 'table':
+                    table = ""
+            roles[pageNr] = ("D", table, self.dbSchema[table].get('rowidAlias') if table else None, None)
+        return roles
+
+    def _writeDiff(self, old, roles, replaced, oldrecords, records):
+        #page and record delta of the replaced pages, rows are matched by table and rowid
+        writer = self.rowWriter
+        writer.write("Changed pages...")
+        writer.write("Page;Status;Role;Previous role")
+        for pageNr in sorted(replaced):
+            if pageNr not in old:
+                status, previous = "new", ""
+            elif pageNr not in roles and pageNr > self.source.pageCount():
+                status, previous = "removed", old[pageNr][1]
+            else:
+                status, previous = "changed", old[pageNr][1]
+            prefix, table = roles.get(pageNr, ("", ""))[:2]
+            writer.write("%i;%s;%s;%s" %(pageNr, status, prefix + ":" + table if prefix else table, previous))
+
+        oldrows = dict()
+        newrows = dict()
+        carved = set()
+        for rows, recordlist in ((oldrows, oldrecords), (newrows, records)):
+            for pageNr, table, kind, rowid, digest, line in recordlist:
+                if kind == "C":
+                    rows[(table, rowid if rowid is not None else digest)] = (digest, line)
+                elif rows is oldrows:
+                    carved.add((table, digest))
+        writer.write("Changed records...")
+        writer.write("Status;Table;Page;Type;Values;MD5 hash")
+        for rowkey, (digest, line) in newrows.items():
+            if rowkey not in oldrows:
+                writer.write("new;%s;%s" %(rowkey[0], line))
+            elif oldrows[rowkey][0] != digest:
+                writer.write("changed;%s;%s" %(rowkey[0], line))
+                writer.write("previous;%s;%s" %(rowkey[0], oldrows[rowkey][1]))
+        for rowkey, (digest, line) in oldrows.items():
+            if rowkey not in newrows:
+                writer.write("deleted;%s;%s" %(rowkey[0], line))
+        for pageNr, table, kind, rowid, digest, line in records:
+            if kind != "C" and (table, digest) not in carved:
+                writer.write("carved;%s;%s" %(table, line))
 
     '''
     Funtions borrowed from SQLiteZer
@@ -1202,67 +3967,67 @@ class SQLiteDBParser:
         Pass byte string to decode.
         Returns VarInt value.
         """
-        varintlen = len(bytestring)
-        varintval = bytestringpos = 0
-
-        for i in reversed(range(0,varintlen)):
-            if (i == 0):
-                byteval = ord(bytestring[bytestringpos])
-                varintval+=byteval
-            else:
-                byteval = ord(bytestring[bytestringpos])
-                varintval+=(byteval - 128)*(2**(i*7))
-            bytestringpos+=1
-
-        return varintval,varintlen
+        varintval, varintlen = readVarint(bytestring, 0)
+        return varintval, len(bytestring)
 
     def _getVarIntOfs(self, data, offset):
         """
-        Decode Huffman-coded two's compliment integers used for storing 64-bit
-        variable-length integers. Implements Mike Harrington's example technique
-        for decoding SQLite VarInts (https://mobileforensics.wordpress.com/2011/
-        09/17/huffman-coding-in-sqlite-a-primer-for-mobile-forensics/). SQLite
-        spec allows for between 1-9 byte runs per VarInt - this method should
-        scale to that size, despite such huge values being rare in practice.
+        Decode the variable-length integers used by SQLite for 64-bit values.
+        SQLite spec allows for between 1-9 byte runs per VarInt, see
+        readVarint.
 
         Pass starting byte offset to decode.
         Returns tuple(VarInt value and the VarInt length).
         """
+        return readVarint(data, offset)
 
-        varintlen = varintval = 0
-        of = offset
-        while True:
-            if((ord(data[offset:offset+1])&(1<<7))!=0):
-                varintlen+=1
-                offset+=1
-            else:
-                varintlen+=1
-                break
-        offset = int(of)
-        for i in reversed(range(0,varintlen)):
-            if (i == 0):
-                byteval = ord(data[offset:offset+1])
-                varintval+=byteval
-            else:
-                byteval = ord(data[offset:offset+1])
-                offset +=1
-                varintval+=(byteval - 128)*(2**(i*7))
-
-        return varintval,varintlen
+    def _readOverflowChain(self, pageNr):
+        '''
+        Returns the page numbers of the overflow chain starting at pageNr.
+        Only the next page pointers are read.
+        '''
+        pageNr = int(pageNr)
+        try:
+            return self.overflowChains[pageNr]
+        except KeyError:
+            pass
+        chain = list()
+        seen = set()
+        pagenum = pageNr
+        pageCount = self.source.pageCount()
+        while pagenum > 1 and pagenum <= pageCount and pagenum not in seen:
+            seen.add(pagenum)
+            chain.append(pagenum)
+            pagenum = unpack('>I', self.source.page(pagenum)[0:4])[0]
+        chain = tuple(chain)
+        self.overflowChains[pageNr] = chain
+        return chain
 
     def _getoverflowdata(self, pageNr):
+        '''
+        Returns the payload stored in the overflow chain starting at pageNr.
+        The page contents are joined once, recently used chains are cached.
+        '''
+        pageNr = int(pageNr)
+        try:
+            overflowdata = self.overflowCache.pop(pageNr)
+            self.overflowCache[pageNr] = overflowdata
+            return overflowdata
+        except KeyError:
+            pass
+
+        usableSize = self.source.usableSize
+        chain = self._readOverflowChain(pageNr)
+        self._markOverflowPages(chain)
+        overflowdata = b''.join([self.source.page(pagenum)[4:usableSize] for pagenum in chain])
 
-        overlfowdata = b''
-        pagenum = int(pageNr)-1
-        while pagenum > 0 and pagenum < self.dbHeaderDict['in_header_database_size']:
-            self.overflowpages.append(pagenum+1)
-            offset = pagenum * self.dbHeaderDict['pageSize']
-            next_pagenum = unpack('>I', self.data[offset:offset+4])[0] - 1
-            start = offset + 4
-            end = offset + self.dbHeaderDict['pageSize'] - self.dbHeaderDict['unused_reserved_space']
-            overlfowdata += self.data[start:end]
-            pagenum = int(next_pagenum)
-        return overlfowdata
+        if len(overflowdata) <= OVERFLOW_CACHE_SIZE:
+            self.overflowCache[pageNr] = overflowdata
+            self.overflowCacheSize += len(overflowdata)
+            while self.overflowCacheSize > OVERFLOW_CACHE_SIZE:
+                head, data = self.overflowCache.popitem(last=False)
+                self.overflowCacheSize -= len(data)
+        return overflowdata
 
     def _parseCell(self, data, offset, cellformat):
         """
@@ -1287,164 +4052,35 @@ class SQLiteDBParser:
             #end = int(round(self._getPayloadSizeInCell(payloadlen)))
             payload = data[dataoffset:dataoffset + payloadsizeincell]
             if (overflowpagenum > 0) and (overflowpagenum is not None):
-                payload += self._getoverflowdata(overflowpagenum)
-            data = payload
-            dataoffset = 0
-            for field in cellheader:
-                dataoffset = int(dataoffset)
-                if field[0] == "NULL":
-                    celldatalist.append(recordnum)
-                elif field[0] == "ST_INT8":
-                    celldatalist.append(ord(unpack(">c",data[dataoffset:dataoffset+1])[0]))
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT16":
-                    celldatalist.append(unpack(">h",data[dataoffset:dataoffset+2])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT24":
-                    celldatalist.append("-")
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT32":
-                    celldatalist.append(unpack(">i",data[dataoffset:dataoffset+4])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT48":
-                    celldatalist.append(self._unpack48(data[dataoffset:dataoffset + 6]))
-                    dataoffset+=field[1]
-                    #celldatalist.append("ST_INT48 - NOT IMPLEMENTED!") # NOT IMPLEMENTED YET!
-                    #dataoffset+=field[1]
-                elif field[0] == "ST_INT64":
-                    celldatalist.append(unpack(">q",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_FLOAT":
-                    celldatalist.append(unpack(">d",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_C0":
-                    celldatalist.append("0")
-                elif field[0] == "ST_C1":
-                    celldatalist.append("1")
-                elif field[0] == "ST_BLOB":
-                    cell = data[dataoffset:dataoffset+int(field[1])]
-                    celldatalist.append(cell)
-                    dataoffset+=field[1]
-                elif field[0] == "ST_TEXT":
-                    try:
-                        celldatalist.append(data[dataoffset:dataoffset+int(field[1])].decode('UTF-8'))
-                    except:
-                        try:
-                            celldatalist.append(str(data[dataoffset:dataoffset+int(field[1])]))
-                        except:
-                            pass
-
-                    dataoffset+=field[1]
-                else:
-                    pass
-                    #print(field[0])
-        elif (cellformat == LEAF_INDEX_BTREE_PAGE):
-            cellheader,payloadheaderlen,dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseLeafIndexCellHeader(data, offset)
-            for field in cellheader:
-                dataoffset = int(dataoffset)
-                if field[0] == "NULL":
-                    celldatalist.append("-")
-                elif field[0] == "ST_INT8":
-                    celldatalist.append(ord(unpack(">c",data[dataoffset:dataoffset+1])[0]))
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT16":
-                    celldatalist.append(unpack(">h",data[dataoffset:dataoffset+2])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT24":
-                    celldatalist.append("-")
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT32":
-                    celldatalist.append(unpack(">i",data[dataoffset:dataoffset+4])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT48":
-                    celldatalist.append(self._unpack48(data[dataoffset:dataoffset + 6]))
-                    dataoffset+=field[1]
-                    #celldatalist.append("ST_INT48 - NOT IMPLEMENTED!") # NOT IMPLEMENTED YET!
-                    #dataoffset+=field[1]
-                elif field[0] == "ST_INT64":
-                    celldatalist.append(unpack(">q",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_FLOAT":
-                    celldatalist.append(unpack(">d",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_C0":
-                    celldatalist.append("-")
-                elif field[0] == "ST_C1":
-                    celldatalist.append("-")
-                elif field[0] == "ST_BLOB":
-                    celldatalist.append(data[dataoffset:dataoffset+int(field[1])])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_TEXT":
-                    try:
-                        celldatalist.append(data[dataoffset:dataoffset+int(field[1])].decode('UTF-8'))
-                    except:
-                        try:
-                            celldatalist.append(str(data[dataoffset:dataoffset+int(field[1])]))
-                        except:
-                            pass
-
-                    dataoffset+=field[1]
-                else:
-                    pass
-                    #print(field[0])
+                payload = bytes(payload) + self._getoverflowdata(overflowpagenum)
+            celldatalist = self.recordDecoder.decode(cellheader, payload, 0)
+        elif (cellformat == LEAF_INDEX_BTREE_PAGE) or (cellformat == INTERIOR_INDEX_BTREE_PAGE):
+            #interior index cells hold keys too, after the left child pointer
+            if cellformat == LEAF_INDEX_BTREE_PAGE:
+                cellheader,payloadheaderlen,dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseLeafIndexCellHeader(data, offset)
+            else:
+                cellheader,payloadheaderlen,dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseInteriorIndexCellHeader(data, offset)
+            payload = data[dataoffset - payloadheaderlen:overflowpageoffset]
+            if overflowpagenum > 0:
+                payload = bytes(payload) + self._getoverflowdata(overflowpagenum)
+            celldatalist = self.recordDecoder.decode(cellheader, payload, payloadheaderlen)
         elif (cellformat == INTERIOR_TABLE_BTREE_PAGE):
             cellheader, dataoffset, pagechildnum, recordnum = self._parseInteriorTableCellHeader(data, offset)
             celldatalist.append(pagechildnum)
             celldatalist.append(recordnum)
-        elif (cellformat == INTERIOR_INDEX_BTREE_PAGE):
-            cellheader,payloadheaderlen, dataoffset,payloadlen,overflowpageoffset,overflowpagenum = self._parseLeafIndexCellHeader(data, offset)
-            '''
-            for field in cellheader:
-                dataoffset = int(dataoffset)
-                if field[0] == "NULL":
-                    celldatalist.append("-")
-                elif field[0] == "ST_INT8":
-                    celldatalist.append(ord(unpack(">c",data[dataoffset:dataoffset+1])[0]))
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT16":
-                    celldatalist.append(unpack(">h",data[dataoffset:dataoffset+2])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT24":
-                    celldatalist.append("-")
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT32":
-                    celldatalist.append(unpack(">i",data[dataoffset:dataoffset+4])[0])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT48":
-                    celldatalist.append(self.unpack48(data[dataoffset:dataoffset+6]))
-                    dataoffset+=field[1]
-                elif field[0] == "ST_INT64":
-                    celldatalist.append(unpack(">q",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_FLOAT":
-                    celldatalist.append(unpack(">d",data[dataoffset:dataoffset+8])[0])
-                    dataoffset+=8
-                elif field[0] == "ST_C0":
-                    celldatalist.append("-")
-                elif field[0] == "ST_C1":
-                    celldatalist.append("-")
-                elif field[0] == "ST_BLOB":
-                    celldatalist.append(data[dataoffset:dataoffset+int(field[1])])
-                    dataoffset+=field[1]
-                elif field[0] == "ST_TEXT":
-                    try:
-                        celldatalist.append(data[dataoffset:dataoffset+int(field[1])].decode('UTF-8'))
-                    except:
-                        try:
-                            celldatalist.append(str(data[dataoffset:dataoffset+int(field[1])]))
-                        except:
-                            pass
-
-                    dataoffset+=field[1]
-                else:
-                    print(field[0])
-                '''
         else:
             pass
 
         return celldatalist, payloadlen
 
-    def _getPayloadSizeInCell(self, payloadWholeSize):
+    def _getMaxLocal(self, index=False):
+        #largest payload stored without overflow pages, smaller in index b-trees
+        usableSize = self.dbHeaderDict["pageSize"] - self.dbHeaderDict["unused_reserved_space"]
+        if index:
+            return ((usableSize - 12) * 64 // 255) - 23
+        return usableSize - 35
+
+    def _getPayloadSizeInCell(self, payloadWholeSize, index=False):
         """
         @note
         See: README.org - Track overflow pages
@@ -1453,10 +4089,9 @@ class SQLiteDBParser:
         Local payload size for this cell.
         """
         payloadSize = payloadWholeSize
-        usableSize = self.dbHeaderDict["pageSize"]
-        maxLocal = usableSize - 35
-        #not really sure if int or round
-        minLocal = int(((usableSize - 12) * 32 / 255)) - 23
+        usableSize = self.dbHeaderDict["pageSize"] - self.dbHeaderDict["unused_reserved_space"]
+        maxLocal = self._getMaxLocal(index)
+        minLocal = ((usableSize - 12) * 32 // 255) - 23
         if payloadSize <= maxLocal:
             return payloadSize
         localSize = minLocal + ((payloadSize - minLocal) % (usableSize - 4))
@@ -1503,41 +4138,11 @@ class SQLiteDBParser:
             if (payloadlen > (self.dbHeaderDict["pageSize"] - self.dbHeaderDict["unused_reserved_space"] - 35)):
                 overflowpagenum = unpack(">I",data[overflowpageoffset:overflowpageoffset+4])[0]
 
-            if (overflowpagenum <= 1) or (overflowpagenum >= self.dbHeaderDict['in_header_database_size']):
+            if (overflowpagenum <= 1) or (overflowpagenum > self.source.pageCount()):
                 overflowpagenum = 0
 
         # Payload Fields
-        while offset < (payloadheaderlenofs):
-            fieldtype,length = self._getVarIntOfs(data, offset)
-            # Determine Serial Type
-            if fieldtype == 0:
-                headerlist.append(("NULL",0))
-            elif fieldtype == 1:
-                headerlist.append(("ST_INT8",1))
-            elif fieldtype == 2:
-                headerlist.append(("ST_INT16",2))
-            elif fieldtype == 3:
-                headerlist.append(("ST_INT24",3))
-            elif fieldtype == 4:
-                headerlist.append(("ST_INT32",4))
-            elif fieldtype == 5:
-                headerlist.append(("ST_INT48",6))
-            elif fieldtype == 6:
-                headerlist.append(("ST_INT64",8))
-            elif fieldtype == 7:
-                headerlist.append(("ST_FLOAT",8))
-            elif fieldtype == 8:
-                headerlist.append(("ST_C0",0))
-            elif fieldtype == 9:
-                headerlist.append(("ST_C1",0))
-            elif fieldtype > 11:
-                if (fieldtype%2) == 0:
-                    headerlist.append(("ST_BLOB",(fieldtype-12)/2))
-                else:
-                    headerlist.append(("ST_TEXT",(fieldtype-13)/2))
-            else:
-                headerlist.append(("Reserved: %s" % str(fieldtype),0))
-            offset+=length
+        headerlist, offset = self._parseSerialTypes(data, offset, payloadheaderlenofs)
 
         return headerlist, payloadheaderlen, offset, payloadlen, recordnum, (payloadsizeincell-payloadheaderlen), overflowpageoffset, overflowpagenum
 
@@ -1556,45 +4161,16 @@ class SQLiteDBParser:
         offset+=length
 
         # Overflow Page Number
-        overflowpageoffset += self._getPayloadSizeInCell(payloadlen)
-        overflowpageoffset = int(overflowpageoffset)
-        if (payloadlen > (self.dbHeaderDict["pageSize"] - self.dbHeaderDict["unused_reserved_space"] - 35)):
+        overflowpageoffset += self._getPayloadSizeInCell(payloadlen, index=True)
+        if (payloadlen > self._getMaxLocal(index=True)):
             overflowpagenum = unpack(">I",data[overflowpageoffset:overflowpageoffset+4])[0]
+            if (overflowpagenum <= 1) or (overflowpagenum > self.source.pageCount()):
+                overflowpagenum = 0
         else:
             overflowpagenum = 0
 
         # Payload Fields
-        while offset < (payloadheaderlenofs):
-            fieldtype,length = self._getVarIntOfs(data, offset)
-            # Determine Serial Type
-            if fieldtype == 0:
-                headerlist.append(("NULL",0))
-            elif fieldtype == 1:
-                headerlist.append(("ST_INT8",1))
-            elif fieldtype == 2:
-                headerlist.append(("ST_INT16",2))
-            elif fieldtype == 3:
-                headerlist.append(("ST_INT24",3))
-            elif fieldtype == 4:
-                headerlist.append(("ST_INT32",4))
-            elif fieldtype == 5:
-                headerlist.append(("ST_INT48",6))
-            elif fieldtype == 6:
-                headerlist.append(("ST_INT64",8))
-            elif fieldtype == 7:
-                headerlist.append(("ST_FLOAT",8))
-            elif fieldtype == 8:
-                headerlist.append(("ST_C0",0))
-            elif fieldtype == 9:
-                headerlist.append(("ST_C1",0))
-            elif fieldtype > 11:
-                if (fieldtype%2) == 0:
-                    headerlist.append(("ST_BLOB",(fieldtype-12)/2))
-                else:
-                    headerlist.append(("ST_TEXT",(fieldtype-13)/2))
-            else:
-                headerlist.append(("Reserved: %s" % str(fieldtype),0))
-            offset+=length
+        headerlist, offset = self._parseSerialTypes(data, offset, payloadheaderlenofs)
 
         return headerlist, payloadheaderlen, offset, payloadlen, overflowpageoffset, overflowpagenum
 
@@ -1618,6 +4194,13 @@ class SQLiteDBParser:
 
         return headerlist, offset, pagechildleftnum[0], recordnum
 
+    def _parseSerialTypes(self, data, offset, end):
+        """
+        Returns the serial types of a record header between offset and end and
+        the offset of the record content.
+        """
+        return readSerialTypes(data, offset, end)
+
     def _parseInteriorIndexCellHeader(self, data,offset):
 
         headerlist = list()
@@ -1626,6 +4209,7 @@ class SQLiteDBParser:
         # pagenumleftchild length
         pagechildleftnum = unpack(">I",data[offset:offset+4])
         offset+=4
+        overflowpageoffset+=4
 
         # Payload length
         payloadlen,length = self._getVarIntOfs(data, offset)
@@ -1637,45 +4221,16 @@ class SQLiteDBParser:
         offset+=length
 
         # Overflow Page Number
-        overflowpageoffset += self._getPayloadSizeInCell(payloadlen)
-        overflowpageoffset = int(overflowpageoffset)
-        if (payloadlen > (self.dbHeaderDict["pageSize"] - self.dbHeaderDict["unused_reserved_space"] - 35)):
+        overflowpageoffset += self._getPayloadSizeInCell(payloadlen, index=True)
+        if (payloadlen > self._getMaxLocal(index=True)):
             overflowpagenum = unpack(">I",data[overflowpageoffset:overflowpageoffset+4])[0]
+            if (overflowpagenum <= 1) or (overflowpagenum > self.source.pageCount()):
+                overflowpagenum = 0
         else:
             overflowpagenum = 0
 
         # Payload Fields
-        while offset < (payloadheaderlenofs):
-            fieldtype,length = self._getVarIntOfs(data, offset)
-            # Determine Serial Type
-            if fieldtype == 0:
-                headerlist.append(("NULL",0))
-            elif fieldtype == 1:
-                headerlist.append(("ST_INT8",1))
-            elif fieldtype == 2:
-                headerlist.append(("ST_INT16",2))
-            elif fieldtype == 3:
-                headerlist.append(("ST_INT24",3))
-            elif fieldtype == 4:
-                headerlist.append(("ST_INT32",4))
-            elif fieldtype == 5:
-                headerlist.append(("ST_INT48",6))
-            elif fieldtype == 6:
-                headerlist.append(("ST_INT64",8))
-            elif fieldtype == 7:
-                headerlist.append(("ST_FLOAT",8))
-            elif fieldtype == 8:
-                headerlist.append(("ST_C0",0))
-            elif fieldtype == 9:
-                headerlist.append(("ST_C1",0))
-            elif fieldtype > 11:
-                if (fieldtype%2) == 0:
-                    headerlist.append(("ST_BLOB",(fieldtype-12)/2))
-                else:
-                    headerlist.append(("ST_TEXT",(fieldtype-13)/2))
-            else:
-                headerlist.append(("Reserved: %s" % str(fieldtype),0))
-            offset+=length
+        headerlist, offset = self._parseSerialTypes(data, offset, payloadheaderlenofs)
 
         return headerlist, payloadheaderlen, offset, payloadlen, overflowpageoffset, overflowpagenum
 
@@ -1683,9 +4238,30 @@ class SQLiteDBParser:
     End of SQLiteZer functions
     '''
 
-    def _unpack48(self, x):
-        return int.from_bytes(x, byteorder='big')
 
+#######################################################################################
+#
+# Page decoding worker processes (--jobs)
+#
+#######################################################################################
+_workerParser = None
+
+def _initPageWorker(options, parentIndex):
+    global _workerParser
+    #every worker maps the database file itself, the parent index is taken
+    #from the analysis so the freeblocks are carved with the table's signature
+    _workerParser = SQLiteDBParser(options)
+    _workerParser.parentIndex = parentIndex
+
+def _decodePageRange(pagerange):
+    results = list()
+    overflowpages = set()
+    for pageNr in pagerange:
+        #decoded pages are not kept in the worker's page cache
+        dbpage = _workerParser._readDBPage(pageNr)
+        results.append(_workerParser._exportDBPage(dbpage))
+        overflowpages.update(_workerParser._pageOverflowPages(dbpage))
+    return results, overflowpages
 
 def checkPythonVersion():
 #    print(__import__("sys").version)
@@ -1726,9 +4302,19 @@ def main(argv):
     parser.add_option("-s", "--schema", action ="store_true", dest = "printschema", help = "Optional")
     parser.add_option("-i", "--info", action ="store_true", dest = "printinfo", help = "Optional")
     parser.add_option("-b", "--bin2out", action ="store_true", dest = "bin2out", help = "Optional")
-    parser.add_option("-B", "--bin2file", action ="store_true", dest = "bin2file", help = "Optional")
+    parser.add_option("-B", "--bin2file", action ="store_true", dest = "bin2file", help = "Optional, write BLOBs to files named by their SHA-256 with a manifest")
     parser.add_option("-a", "--all", action ="store_true", dest = "printall", help = "Optional")
-    parser.add_option("-m", "--map", action ="store_true", dest = "printmap", help = "Optional")
+    parser.add_option("-m", "--map", action ="store_true", dest = "printmap", help = "Optional, print a map of all pages, faster with numpy")
+    parser.add_option("-C", "--carve", action ="store_true", dest = "carve", help = "Optional, carve file signatures and strings from free space")
+    parser.add_option("--signature", action = "append", dest = "signatures", help = "Optional, extra file signature for -C and -B, repeatable", metavar = "KIND:HEX")
+    parser.add_option("--diff", dest = "diff", help = "Optional, print the pages and records changed since the run that wrote the manifest FILE and update it", metavar = "FILE")
+    parser.add_option("--cache", dest = "cache", help = "Optional, keep decoded pages in a cache file in DIR for later runs", metavar = "DIR")
+    parser.add_option("-w", "--wal", dest = "wal", help = "Optional, apply the committed frames of a WAL file", metavar = "sms.db-wal")
+    parser.add_option("--wal-history", action ="store_true", dest = "walhistory", help = "Optional, with -w print records of the older page versions in the WAL")
+    parser.add_option("-J", "--journal", dest = "journal", help = "Optional, print records of the page images in a rollback journal", metavar = "sms.db-journal")
+    parser.add_option("-j", "--jobs", type = "int", dest = "jobs", default = 1, help = "Optional, decode pages in N processes", metavar = "N")
+    parser.add_option("-e", "--export", dest = "export", choices = sorted(EXPORT_FORMATS), help = "Optional, write table rows to files in FORMAT: " + ", ".join(sorted(EXPORT_FORMATS)), metavar = "FORMAT")
+    parser.add_option("-o", "--outdir", dest = "outdir", default = ".", help = "Optional, directory for exported files", metavar = "DIR")
 
 
     group = OptionGroup(parser, "Print table", "Print dedicated table. Lookup a table name or number with option -l")
@@ -1752,6 +4338,15 @@ def main(argv):
         options.freespace = True
         options.deleted = True
         options.unallocated = True
+    if options.diff:
+        #the diff covers the records carved from freeblocks
+        options.freespace = True
+
+    try:
+        options.signatures = [parseSignature(spec) for spec in options.signatures or ()]
+    except ValueError as e:
+        print("Invalid signature: %s" %str(e))
+        sys.exit(0)
 
     if checkPythonVersion() != 3:
         print("SQLiteDBParser requires python version 3...")
@@ -1780,28 +4375,58 @@ def main(argv):
         print ("File %s is not a regular sqlite database" %str(options.infile))
         sys.exit(0)
 
+    exporter = None
+    if options.export:
+        try:
+            exporter = EXPORT_FORMATS[options.export](options.outdir, options.infile)
+        except (ImportError, OSError) as e:
+            print("Export not possible: %s" %str(e))
+            sys.exit(0)
+
     if options.printall:
         sqliteDB.printDBheader()
+        if sqliteDB.hasWAL() == True:
+            sqliteDB.printWALInfo()
         if sqliteDB.hasPtrMap() == True:
             sqliteDB.printPtrMap()
         sqliteDB.printDBSchema()
-        sqliteDB.printDBData()
+        if exporter is None:
+            sqliteDB.printDBData()
+    if exporter is not None and options.printtable != True:
+        sqliteDB.exportDBData(exporter)
     if options.printinfo:
         sqliteDB.printDBheader()
+        if sqliteDB.hasWAL() == True:
+            sqliteDB.printWALInfo()
     if options.printschema:
         sqliteDB.printDBSchema()
     if options.listtables:
         sqliteDB.listAllTables()
-    if options.printtable == True:
-        if options.tablename == None and options.tablenum == None:
-            return
-        if options.tablename:
-            sqliteDB.printTable(name=options.tablename)
-        if options.tablenum:
-            sqliteDB.printTable(number=options.tablenum)
+    #without a table name or number -p prints nothing and ends the run
+    printtable = options.printtable == True and (options.tablename != None or options.tablenum != None)
+    if printtable:
+        if exporter is not None:
+            sqliteDB.exportTable(exporter, name=options.tablename, number=options.tablenum)
+        else:
+            if options.tablename:
+                sqliteDB.printTable(name=options.tablename)
+            if options.tablenum:
+                sqliteDB.printTable(number=options.tablenum)
         pass
-    if options.printmap == True:
-        sqliteDB.printDBMap()
+    if exporter is not None:
+        exporter.finish()
+    if options.printtable != True or printtable:
+        if sqliteDB.hasJournal() == True:
+            sqliteDB.printJournal()
+        if options.walhistory == True and sqliteDB.hasWAL() == True:
+            sqliteDB.printWALHistory()
+        if options.printmap == True:
+            sqliteDB.printDBMap()
+        if options.carve == True:
+            sqliteDB.printCarved()
+        if options.diff:
+            sqliteDB.printDiff(options.diff)
+    sqliteDB.finish()
 
 if __name__ == '__main__':
     main(sys.argv[1:])
\ No newline at end of file
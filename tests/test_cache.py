@@ -0,0 +1,90 @@
+import os, shutil, sqlite3, subprocess, sys, tempfile, unittest
+from optparse import Values
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import SQLiteDBParser
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SQLiteDBParser.py')
+
+def openParser(db, cachedir):
+    return SQLiteDBParser(Values({'infile': db, 'debug': False, 'bin2out': False, 'bin2file': False,
+                                  'freespace': False, 'unallocated': False, 'deleted': False, 'jobs': 1,
+                                  'wal': None, 'journal': None, 'signatures': None, 'cache': cachedir}))
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachedir = os.path.join(self.tmpdir, 'cache')
+        self.db = os.path.join(self.tmpdir, 'sms.db')
+        con = sqlite3.connect(self.db)
+        con.execute('PRAGMA page_size=1024')
+        con.execute('CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT)')
+        con.executemany('INSERT INTO t(s) VALUES (?)', [('row%04i' %i,) for i in range(500)])
+        #a row with overflow pages, the marker is far behind the local part of the cell
+        con.execute('INSERT INTO t(s) VALUES (?)', ('x' * 3000 + 'MARKER' + 'x' * 100,))
+        con.commit()
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def runScript(self, *args):
+        result = subprocess.run([sys.executable, SCRIPT, '-f', self.db, '-p', '-N', 't'] + list(args),
+                                stdout=subprocess.PIPE, universal_newlines=True, cwd=self.tmpdir)
+        return result.stdout
+
+    def cachedPages(self):
+        #pages taken from the cache by the next run
+        parser = openParser(self.db, self.cachedir)
+        try:
+            parser._analyzeDBPages()
+            return set(parser.cache.cachedPages)
+        finally:
+            parser.cache.close()
+
+    def assertCached(self):
+        #a cached run prints the same as one without the cache
+        self.assertEqual(self.runScript('--cache', self.cachedir), self.runScript())
+
+    def test_unchanged(self):
+        self.assertCached()
+        self.assertEqual(len(os.listdir(self.cachedir)), 1)
+        self.assertTrue(self.cachedPages())
+        self.assertCached()
+
+    def test_changed_page(self):
+        self.assertCached()
+        cached = self.cachedPages()
+        con = sqlite3.connect(self.db)
+        con.execute("UPDATE t SET s = 'changed' WHERE id = 250")
+        con.commit()
+        con.close()
+        self.assertNotEqual(self.cachedPages(), cached)
+        self.assertIn("'changed'", self.runScript('--cache', self.cachedir))
+        self.assertCached()
+
+    def test_changed_overflow_page(self):
+        self.assertCached()
+        #only the overflow page changes, its leaf page is decoded again
+        with open(self.db, 'r+b') as f:
+            data = f.read()
+            f.seek(data.index(b'MARKER'))
+            f.write(b'NEWVAL')
+        output = self.runScript('--cache', self.cachedir)
+        self.assertIn('NEWVAL', output)
+        self.assertNotIn('MARKER', output)
+
+    def test_changed_schema(self):
+        self.assertCached()
+        con = sqlite3.connect(self.db)
+        con.execute('ALTER TABLE t ADD COLUMN n INTEGER')
+        con.execute('UPDATE t SET n = 7 WHERE id = 1')
+        con.commit()
+        con.close()
+        self.assertEqual(self.cachedPages(), set())
+        self.assertIn(";n;", self.runScript('--cache', self.cachedir))
+        self.assertCached()
+
+if __name__ == '__main__':
+    unittest.main()
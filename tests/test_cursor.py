@@ -0,0 +1,79 @@
+import os, shutil, sqlite3, sys, tempfile, unittest
+from optparse import Values
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import SQLiteDBParser, TableBTreeCursor, LEAF_TABLE_BTREE_PAGE
+
+def openParser(db):
+    return SQLiteDBParser(Values({'infile': db, 'debug': False, 'bin2out': False, 'bin2file': False,
+                                  'freespace': False, 'unallocated': False, 'deleted': False, 'jobs': 1,
+                                  'wal': None, 'journal': None, 'signatures': None, 'cache': None}))
+
+class TableBTreeCursorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        db = os.path.join(cls.tmpdir, 'cursor.db')
+        con = sqlite3.connect(db)
+        #small pages for a tree with several levels
+        con.execute('PRAGMA page_size=512')
+        con.execute('CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT)')
+        #every third rowid, starting with negative ones
+        cls.stored = [i * 3 - 300 for i in range(3000)]
+        con.executemany('INSERT INTO t VALUES (?, ?)', [(rowid, 'v%i' %rowid) for rowid in cls.stored])
+        con.commit()
+        con.close()
+        cls.db = db
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def setUp(self):
+        self.parser = openParser(self.db)
+        self.cursor = TableBTreeCursor(self.parser, self.parser.dbSchema['t']['rootpage'])
+
+    def rowids(self, records):
+        return [rowid for pageNr, cellp, rowid, row in records]
+
+    def storedBetween(self, first, last):
+        return [rowid for rowid in self.stored if (first is None or rowid >= first) and (last is None or rowid <= last)]
+
+    def test_iterate(self):
+        records = list(self.cursor)
+        self.assertEqual(self.rowids(records), self.stored)
+        self.assertEqual(records[0][3], [None, 'v-300'])
+
+    def test_seek(self):
+        for rowid in (self.stored[0], -3, 0, 4500, self.stored[-1]):
+            pageNr, cellp, found, row = self.cursor.seek(rowid)
+            self.assertEqual(found, rowid)
+            self.assertEqual(row, [None, 'v%i' %rowid])
+            self.assertEqual(self.parser.dbPages[pageNr]["pageHeader"]["pageByte"], LEAF_TABLE_BTREE_PAGE)
+
+    def test_seek_missing(self):
+        for rowid in (self.stored[0] - 1, 1, 4501, self.stored[-1] + 1):
+            self.assertIsNone(self.cursor.seek(rowid))
+
+    def test_seek_reads_one_path(self):
+        loaded = lambda: [pageNr for pageNr in range(1, self.parser.source.pageCount() + 1) if self.parser.dbPages.isLoaded(pageNr)]
+        before = set(loaded())
+        self.cursor.seek(4500)
+        #the interior pages on the path and one leaf page
+        self.assertLess(len(set(loaded()) - before), 6)
+
+    def test_range(self):
+        for first, last in ((-10, 10), (1, 2), (4499, 4505), (None, -250), (8900, None), (100, 2000), (5, 1)):
+            self.assertEqual(self.rowids(self.cursor.range(first, last)), self.storedBetween(first, last))
+
+    def test_leaf_pages(self):
+        pages = list(self.cursor.leafPages())
+        self.assertEqual(len(pages), len(set(pages)))
+        self.assertGreater(len(pages), 10)
+        #only the leaf pages which may hold the range
+        self.assertLessEqual(len(list(self.cursor.leafPages(0, 30))), 2)
+        self.assertEqual(list(self.cursor.leafPages(None, self.stored[0])), pages[:1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os, shutil, sqlite3, subprocess, sys, tempfile, unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SQLiteDBParser.py')
+
+class DiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmpdir, 'sms.db')
+        self.manifest = os.path.join(self.tmpdir, 'sms.manifest')
+        self.execute('PRAGMA page_size=1024',
+                     'CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT)',
+                     'CREATE TABLE u(a TEXT, b TEXT)',
+                     "INSERT INTO u VALUES ('u1', 'x')")
+        con = sqlite3.connect(self.db)
+        con.executemany('INSERT INTO t(s) VALUES (?)', [('row%04i' %i,) for i in range(300)])
+        con.commit()
+        con.close()
+        self.first = self.runDiff()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def execute(self, *statements):
+        con = sqlite3.connect(self.db)
+        #deleted records stay in the freeblocks
+        con.execute('PRAGMA secure_delete=0')
+        for statement in statements:
+            con.execute(statement)
+        con.commit()
+        con.close()
+
+    def runDiff(self):
+        result = subprocess.run([sys.executable, SCRIPT, '-f', self.db, '--diff', self.manifest],
+                                stdout=subprocess.PIPE, universal_newlines=True, cwd=self.tmpdir)
+        return result.stdout.splitlines()
+
+    def pageStatus(self, lines):
+        #page number -> (status, role) of the "Changed pages" section
+        start = lines.index("Page;Status;Role;Previous role") + 1
+        end = lines.index("Changed records...")
+        return dict([(int(line.split(";")[0]), tuple(line.split(";")[1:3])) for line in lines[start:end]])
+
+    def recordStatus(self, lines):
+        #(status, table, first value) of the "Changed records" section
+        start = lines.index("Status;Table;Page;Type;Values;MD5 hash") + 1
+        return set([tuple(line.split(";")[0:2]) + (line.split(";")[4],) for line in lines[start:-1]])
+
+    def test_first_run(self):
+        self.assertTrue(self.first[0].startswith("No manifest of a previous run"))
+
+    def test_unchanged(self):
+        lines = self.runDiff()
+        self.assertEqual(self.pageStatus(lines), {})
+        self.assertEqual(self.recordStatus(lines), set())
+        self.assertTrue(lines[-1].startswith("Pages hashed:") and " decoded: 0," in lines[-1])
+
+    def test_classification(self):
+        self.execute("UPDATE t SET s = 'upd' WHERE id = 10",
+                     "DELETE FROM t WHERE id = 20",
+                     "INSERT INTO t(s) VALUES ('fresh')")
+        records = self.recordStatus(self.runDiff())
+        self.assertIn(('changed', 't', "'10'"), records)
+        self.assertIn(('previous', 't', "'10'"), records)
+        self.assertIn(('new', 't', "'301'"), records)
+        self.assertIn(('deleted', 't', "'20'"), records)
+        #the deleted row is carved from the freeblock it left behind
+        self.assertIn(('carved', 't', "'None'"), records)
+        self.assertEqual(len([record for record in records if record[0] != 'carved']), 4)
+        #untouched tables do not show up
+        self.assertFalse([record for record in records if record[1] == 'u'])
+
+        #the next diff starts from this run
+        self.assertEqual(self.recordStatus(self.runDiff()), set())
+
+    def test_new_pages(self):
+        self.execute("INSERT INTO u SELECT 'grow' || id, s FROM t")
+        lines = self.runDiff()
+        self.assertIn('new', [status for status, role in self.pageStatus(lines).values()])
+        records = self.recordStatus(lines)
+        self.assertEqual(set([record[:2] for record in records]), set([('new', 'u')]))
+        self.assertEqual(len(records), 300)
+
+    def test_deleted_pages(self):
+        self.execute("DELETE FROM t WHERE id > 100")
+        lines = self.runDiff()
+        #leaf pages on the freelist change their role to a deleted page of the table
+        self.assertIn(('changed', 'D:t'), self.pageStatus(lines).values())
+        records = self.recordStatus(lines)
+        self.assertEqual(len([record for record in records if record[0] == 'deleted']), 200)
+        self.assertTrue([record for record in records if record[0] == 'carved'])
+        #the records of the deleted pages are known to the next diff
+        self.assertEqual(self.recordStatus(self.runDiff()), set())
+
+if __name__ == '__main__':
+    unittest.main()
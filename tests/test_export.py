@@ -0,0 +1,104 @@
+import csv, json, os, shutil, sqlite3, subprocess, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import CSVExporter, JSONLinesExporter, RowRecord
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SQLiteDBParser.py')
+
+SCHEMA = [('id', 'INTEGER'), ('name', 'TEXT'), ('data', 'BLOB')]
+RECORDS = [RowRecord(2, 'C', 0, 1000, 1, [1, 'käse', b'\x00\xff']),
+           RowRecord(2, 'C', 1, 980, 2, [2, None, None]),
+           #a carved record with more values than the schema has columns
+           RowRecord(2, 'FC', 0, 700, None, [None, 'x', memoryview(b'ab'), 4.5])]
+
+class ExporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.outdir = os.path.join(self.tmpdir, 'out')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def export(self, exporter, tblname='t'):
+        exporter.open(tblname, SCHEMA)
+        for record in RECORDS:
+            exporter.write(record)
+        exporter.close()
+        exporter.finish()
+        self.assertEqual(len(exporter.files), 1)
+        return exporter.files[0]
+
+    def test_csv(self):
+        filename = self.export(CSVExporter(self.outdir))
+        self.assertEqual(filename, os.path.join(self.outdir, 't.csv'))
+        with open(filename, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows, [['page', 'kind', 'offset', 'id', 'name', 'data'],
+                                ['2', 'C', '1000', '1', 'käse', '00ff'],
+                                ['2', 'C', '980', '2', '', ''],
+                                ['2', 'FC', '700', '', 'x', '6162', '4.5']])
+
+    def test_jsonl(self):
+        filename = self.export(JSONLinesExporter(self.outdir))
+        self.assertEqual(filename, os.path.join(self.outdir, 't.jsonl'))
+        with open(filename, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertIn('käse', lines[0])
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(rows, [{'page': 2, 'kind': 'C', 'offset': 1000, 'id': 1, 'name': 'käse', 'data': '00ff'},
+                                {'page': 2, 'kind': 'C', 'offset': 980, 'id': 2, 'name': None, 'data': None},
+                                {'page': 2, 'kind': 'FC', 'offset': 700, 'id': None, 'name': 'x', 'data': '6162', 'col3': 4.5}])
+        #provenance columns come first
+        self.assertEqual(list(json.loads(lines[2]).keys())[:3], ['page', 'kind', 'offset'])
+
+    def test_file_names(self):
+        filename = self.export(CSVExporter(self.outdir), tblname='my table/../x')
+        self.assertEqual(os.path.dirname(filename), self.outdir)
+        self.assertEqual(os.path.basename(filename), 'my_table_.._x.csv')
+
+class ExportCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.db = os.path.join(self.tmpdir, 'sms.db')
+        con = sqlite3.connect(self.db)
+        con.execute('PRAGMA secure_delete=0')
+        con.execute('CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT, b BLOB)')
+        con.execute('CREATE TABLE u(a TEXT)')
+        con.executemany('INSERT INTO t(s, b) VALUES (?, ?)', [('row%i' %i, bytes([i])) for i in range(50)])
+        con.execute("INSERT INTO u VALUES ('only')")
+        con.execute('DELETE FROM t WHERE id = 10')
+        con.commit()
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def runExport(self, fmt, *args):
+        outdir = os.path.join(self.tmpdir, fmt)
+        subprocess.run([sys.executable, SCRIPT, '-f', self.db, '-e', fmt, '-o', outdir] + list(args),
+                       stdout=subprocess.PIPE, universal_newlines=True, cwd=self.tmpdir)
+        return outdir
+
+    def test_all_tables(self):
+        outdir = self.runExport('csv')
+        self.assertEqual(sorted(os.listdir(outdir)), ['t.csv', 'u.csv'])
+        with open(os.path.join(outdir, 't.csv'), newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len([row for row in rows if row['kind'] == 'C']), 49)
+        row = [row for row in rows if row['s'] == 'row5'][0]
+        #the rowid alias is exported with the rowid
+        self.assertEqual((row['id'], row['b']), ('6', '05'))
+
+    def test_deleted_rows(self):
+        outdir = self.runExport('jsonl', '-p', '-N', 't', '-F')
+        self.assertEqual(os.listdir(outdir), ['t.jsonl'])
+        with open(os.path.join(outdir, 't.jsonl'), encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        #raw freeblock bytes are not exported, carved records are
+        self.assertEqual(set([row['kind'] for row in rows]), set(['C', 'FC']))
+        self.assertIn('row9', [row['s'] for row in rows if row['kind'] == 'FC'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os, sys, unittest
+from array import array
+from struct import pack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import RecordDecoder
+
+def textType(value):
+    return 13 + 2 * len(value)
+
+def blobType(value):
+    return 12 + 2 * len(value)
+
+class RecordDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = RecordDecoder()
+
+    def test_serial_types(self):
+        serialtypes = array('B', [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, textType(b'abc'), blobType(b'\x00\xff')])
+        content = (pack('>b', -1) + pack('>h', 300) + (-70000).to_bytes(3, 'big', signed=True) + pack('>i', 2**31 - 1)
+                   + (2**40).to_bytes(6, 'big', signed=True) + pack('>q', -2**63) + pack('>d', 1.5) + b'abc' + b'\x00\xff')
+        values = self.decoder.decode(serialtypes, content)
+        self.assertEqual(values, [None, -1, 300, -70000, 2**31 - 1, 2**40, -2**63, 1.5, 0, 1, 'abc', b'\x00\xff'])
+
+    def test_content_offset_and_null_value(self):
+        values = self.decoder.decode(array('B', [0, 1]), b'xx\x05', offset=2, nullvalue='')
+        self.assertEqual(values, ['', 5])
+
+    def test_long_strings(self):
+        #serial types of more than 121 byte strings do not fit into one byte
+        text = b'x' * 200
+        values = self.decoder.decode(array('q', [1, textType(text)]), b'\x07' + text)
+        self.assertEqual(values, [7, text.decode()])
+
+    def test_text_encoding(self):
+        decoder = RecordDecoder('utf-16-le')
+        text = 'käse'.encode('utf-16-le')
+        self.assertEqual(decoder.decode(array('B', [textType(text)]), text), ['käse'])
+
+    def test_truncated_record(self):
+        #carved records may be cut off, the columns before the cut are kept
+        values = self.decoder.decode(array('B', [1, textType(b'abc'), 6]), b'\x01abc\x00\x00')
+        self.assertEqual(values, [1, 'abc'])
+
+    def test_plan_per_layout(self):
+        #records only differing in string lengths share a plan
+        for text in (b'', b'a', b'abc', b'x' * 200):
+            serialtypes = array('q' if textType(text) > 127 else 'B', [1, textType(text), blobType(text)])
+            self.assertEqual(self.decoder.decode(serialtypes, b'\x01' + text + text), [1, text.decode(), text])
+        self.assertEqual(len(self.decoder._plans), 1)
+
+        self.decoder.decode(array('B', [2, textType(b'a'), blobType(b'')]), b'\x00\x01a')
+        self.decoder.decode(array('B', [1, blobType(b'a'), textType(b'')]), b'\x01a')
+        self.assertEqual(len(self.decoder._plans), 3)
+
+    def test_plan_cache_flush(self):
+        decoder = RecordDecoder()
+        decoder.MAX_PLANS = 2
+        for serialtypes in ([1], [2], [1, 1]):
+            decoder.decode(array('B', serialtypes), b'\x00' * 4)
+        self.assertEqual(len(decoder._plans), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import tokenizeSQL, parseCreateTable, parseCreateIndex
+
+class TokenizerTest(unittest.TestCase):
+
+    def test_quoted_names_and_strings(self):
+        tokens = tokenizeSQL('''"a ""b""" `c``d` [e f] 'it''s' ''')
+        self.assertEqual(tokens, [('name', 'a "b"'), ('name', 'c`d'), ('name', 'e f'), ('string', "it's")])
+
+    def test_comments(self):
+        tokens = tokenizeSQL('a -- x, y\n/* (b, */ c /* open')
+        self.assertEqual(tokens, [('word', 'a'), ('word', 'c')])
+
+    def test_numbers_and_ops(self):
+        self.assertEqual(tokenizeSQL('(0x1F, -1.5e3)'), [('op', '('), ('number', '0x1F'), ('op', ','), ('op', '-'),
+                                                         ('number', '1.5e3'), ('op', ')')])
+
+class CreateTableTest(unittest.TestCase):
+
+    def test_quoted_identifiers(self):
+        table = parseCreateTable('CREATE TABLE "my table"("first col" TEXT, `second` INT, [third] BLOB, "a""b")')
+        self.assertEqual(table.columns, (('first col', 'TEXT'), ('second', 'INT'), ('third', 'BLOB'), ('a"b', '')))
+
+    def test_nested_parentheses(self):
+        table = parseCreateTable("CREATE TABLE t(a DECIMAL(10, 2) CHECK (a > (1 + 2)), b VARCHAR(20) DEFAULT 'x, (y', "
+                                 "c UNSIGNED BIG INT, CHECK (a IN (1, 2)))")
+        self.assertEqual(table.columns, (('a', 'DECIMAL(10,2)'), ('b', 'VARCHAR(20)'), ('c', 'UNSIGNED BIG INT')))
+
+    def test_constraints(self):
+        table = parseCreateTable('CREATE TABLE t(a TEXT NOT NULL COLLATE NOCASE UNIQUE, b INTEGER REFERENCES p(id), '
+                                 'c CONSTRAINT c_pk PRIMARY KEY, UNIQUE (b, c), FOREIGN KEY (b) REFERENCES p(id))')
+        self.assertEqual(table.columns, (('a', 'TEXT'), ('b', 'INTEGER'), ('c', '')))
+        self.assertEqual(table.primaryKey, ('c',))
+        self.assertEqual(table.uniqueKeys, (('a',), ('c',), ('b', 'c')))
+        self.assertIsNone(table.rowidAlias)
+
+    def test_rowid_alias(self):
+        self.assertEqual(parseCreateTable('CREATE TABLE t(a TEXT, id INTEGER PRIMARY KEY)').rowidAlias, 1)
+        self.assertEqual(parseCreateTable('CREATE TABLE t(id integer, a, PRIMARY KEY (id))').rowidAlias, 0)
+        self.assertIsNone(parseCreateTable('CREATE TABLE t(id INT PRIMARY KEY)').rowidAlias)
+        self.assertIsNone(parseCreateTable('CREATE TABLE t(id INTEGER PRIMARY KEY DESC)').rowidAlias)
+
+    def test_without_rowid(self):
+        table = parseCreateTable('CREATE TABLE t(k TEXT PRIMARY KEY, v, UNIQUE (v)) WITHOUT ROWID')
+        self.assertTrue(table.withoutRowid)
+        self.assertEqual(table.primaryKey, ('k',))
+        #the primary key is the table b-tree itself
+        self.assertEqual(table.uniqueKeys, (('v',),))
+        table = parseCreateTable('CREATE TABLE t(id INTEGER PRIMARY KEY, v) WITHOUT ROWID')
+        self.assertTrue(table.withoutRowid)
+        self.assertIsNone(table.rowidAlias)
+        self.assertFalse(parseCreateTable("CREATE TABLE t(a DEFAULT 'WITHOUT ROWID')").withoutRowid)
+
+    def test_no_columns(self):
+        self.assertEqual(parseCreateTable('CREATE VIRTUAL TABLE f USING fts5(a, b)').columns, ())
+        self.assertEqual(parseCreateTable('CREATE TABLE t AS SELECT 1 AS a').columns, ())
+
+class CreateIndexTest(unittest.TestCase):
+
+    def test_columns(self):
+        self.assertEqual(parseCreateIndex('CREATE UNIQUE INDEX i ON t("a b" DESC, c COLLATE NOCASE ASC)'), ('a b', 'c'))
+
+    def test_expressions(self):
+        self.assertEqual(parseCreateIndex('CREATE INDEX i ON t(lower(a), b + 1) WHERE b > 0'), ('lower(a)', 'b+1'))
+
+if __name__ == '__main__':
+    unittest.main()
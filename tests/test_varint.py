@@ -0,0 +1,77 @@
+import os, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from SQLiteDBParser import readVarint, readSerialTypes
+
+def varint(value):
+    #SQLite varint encoding, 9 bytes for values that need more than 56 bits
+    value &= 0xffffffffffffffff
+    if value >= 1 << 56:
+        data = [value & 0xff]
+        value >>= 8
+        for i in range(8):
+            data.insert(0, (value & 0x7f) | 0x80)
+            value >>= 7
+        return bytes(data)
+    data = [value & 0x7f]
+    value >>= 7
+    while value:
+        data.insert(0, (value & 0x7f) | 0x80)
+        value >>= 7
+    return bytes(data)
+
+class VarintTest(unittest.TestCase):
+
+    def test_lengths(self):
+        for value, length in ((0, 1), (0x7f, 1), (0x80, 2), (0x3fff, 2), (0x4000, 3),
+                              ((1 << 49) - 1, 7), ((1 << 56) - 1, 8), (1 << 56, 9), ((1 << 63) - 1, 9)):
+            data = varint(value)
+            self.assertEqual(len(data), length)
+            self.assertEqual(readVarint(data, 0), (value, length))
+
+    def test_nine_bytes(self):
+        #the 9th byte holds all 8 bits
+        self.assertEqual(readVarint(b'\x80' * 8 + b'\xff', 0), (0xff, 9))
+        self.assertEqual(readVarint(b'\x81' + b'\x80' * 7 + b'\x00', 0), (1 << 57, 9))
+
+    def test_negative(self):
+        #9 byte varints are two's complement, e.g. negative rowids
+        self.assertEqual(readVarint(b'\xff' * 9, 0), (-1, 9))
+        self.assertEqual(readVarint(varint(-2**63), 0), (-2**63, 9))
+
+    def test_offset(self):
+        data = b'\x00\x00' + varint(300) + b'\x7f'
+        self.assertEqual(readVarint(data, 2), (300, 2))
+        self.assertEqual(readVarint(memoryview(data), 4), (0x7f, 1))
+
+    def test_truncated(self):
+        with self.assertRaises(IndexError):
+            readVarint(b'\x81\x81', 0)
+
+class SerialTypesTest(unittest.TestCase):
+
+    def test_one_byte_types(self):
+        #no byte has the high bit set
+        header = b'\x04\x00\x01\x0d\x7f'
+        serialtypes, offset = readSerialTypes(header, 1, len(header))
+        self.assertEqual(serialtypes.typecode, 'B')
+        self.assertEqual(list(serialtypes), [0, 1, 13, 127])
+        self.assertEqual(offset, len(header))
+
+    def test_varint_types(self):
+        header = b'\x00' + b'\x01' + varint(128) + varint(13 + 2 * 10000) + b'\x07'
+        serialtypes, offset = readSerialTypes(memoryview(header + b'content'), 1, len(header))
+        self.assertEqual(serialtypes.typecode, 'q')
+        self.assertEqual(list(serialtypes), [1, 128, 13 + 2 * 10000, 7])
+        self.assertEqual(offset, len(header))
+
+    def test_boundaries(self):
+        header = b'\x01\x02' + varint(200)
+        #the header may end at the end of the data
+        self.assertEqual(list(readSerialTypes(header, 0, len(header))[0]), [1, 2, 200])
+        self.assertEqual(len(readSerialTypes(header, 2, 2)[0]), 0)
+        with self.assertRaises(IndexError):
+            readSerialTypes(header, 0, len(header) + 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os, shutil, sqlite3, subprocess, sys, tempfile, unittest
+from struct import unpack
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SQLiteDBParser.py')
+
+def walPages(walfile):
+    with open(walfile, 'rb') as f:
+        data = f.read()
+    pageSize = unpack('>I', data[8:12])[0]
+    frameSize = 24 + pageSize
+    return [unpack('>I', data[offset:offset + 4])[0] for offset in range(32, len(data) - frameSize + 1, frameSize)]
+
+class WALTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        db = os.path.join(self.tmpdir, 'live.db')
+        con = sqlite3.connect(db)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA wal_autocheckpoint=0')
+        con.execute('CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT)')
+        con.executemany('INSERT INTO t(s) VALUES (?)', [('row%i' %i,) for i in range(200)])
+        con.commit()
+        con.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        #no schema change, page 1 is not written to the WAL
+        con.execute("INSERT INTO t(s) VALUES ('walonly')")
+        con.execute('DELETE FROM t WHERE id < 5')
+        con.commit()
+        #copy while the connection is open, closing it checkpoints the WAL
+        self.db = os.path.join(self.tmpdir, 'sms.db')
+        self.wal = self.db + '-wal'
+        shutil.copy(db, self.db)
+        shutil.copy(db + '-wal', self.wal)
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_wal_without_page1(self):
+        self.assertNotIn(1, walPages(self.wal))
+        result = subprocess.run([sys.executable, SCRIPT, '-f', self.db, '-w', self.wal, '-p', '-N', 't'],
+                                stdout=subprocess.PIPE, universal_newlines=True, cwd=self.tmpdir)
+        self.assertNotIn('not a regular sqlite database', result.stdout)
+        self.assertIn("'walonly'", result.stdout)
+
+class WALHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        db = os.path.join(self.tmpdir, 'live.db')
+        con = sqlite3.connect(db)
+        con.execute('PRAGMA journal_mode=WAL')
+        con.execute('PRAGMA wal_autocheckpoint=0')
+        con.execute('CREATE TABLE t(id INTEGER PRIMARY KEY, s TEXT)')
+        for value in ('first', 'second', 'third'):
+            con.execute('INSERT OR REPLACE INTO t(id, s) VALUES (1, ?)', (value,))
+            con.commit()
+        self.db = os.path.join(self.tmpdir, 'sms.db')
+        self.wal = self.db + '-wal'
+        shutil.copy(db, self.db)
+        shutil.copy(db + '-wal', self.wal)
+        con.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_older_versions(self):
+        result = subprocess.run([sys.executable, SCRIPT, '-f', self.db, '-w', self.wal, '--wal-history'],
+                                stdout=subprocess.PIPE, universal_newlines=True, cwd=self.tmpdir)
+        self.assertIn("2;WC;'1';'first'", result.stdout)
+        self.assertIn("2;WC;'1';'second'", result.stdout)
+        #the committed version is printed by -p, not as history
+        self.assertNotIn("'third'", result.stdout)
+
+if __name__ == '__main__':
+    unittest.main()